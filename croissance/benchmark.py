@@ -0,0 +1,288 @@
+"""
+Benchmarks for choosing between execution modes, run using e.g.
+
+    python -m croissance.benchmark executors --curves 96 --workers 4
+    python -m croissance.benchmark precision --curves 96
+    python -m croissance.benchmark resolution --curves 24 --points-per-hour 120
+    python -m croissance.benchmark kernels
+"""
+
+import argparse
+import sys
+import time
+
+import numpy
+import pandas
+
+from croissance.estimation import (
+    GrowthEstimationParameters,
+    GrowthPhase,
+    estimate_growth,
+    jit,
+)
+from croissance.execution import ProcessExecutor, ThreadExecutor, WorkUnit
+
+
+def synthetic_curve(
+    hours: float = 24.0,
+    points_per_hour: float = 4.0,
+    mu: float = 0.5,
+    n0: float = 0.05,
+    noise: float = 0.002,
+    seed: int = 0,
+):
+    """
+    Returns a logistic growth curve with gaussian noise, starting at ``n0``.
+    """
+    rng = numpy.random.default_rng(seed)
+    index = numpy.arange(0.0, hours, 1.0 / points_per_hour)
+    growth = 0.01 * numpy.exp(mu * index)
+    values = n0 + growth / (1 + growth / 2.0) + rng.normal(0.0, noise, len(index))
+
+    return pandas.Series(index=index, data=values)
+
+
+def synthetic_plate(curves: int = 96, hours: float = 24.0, points_per_hour=4.0):
+    """Returns a list of ``(name, curve)`` pairs with varying growth rates."""
+    return [
+        (
+            "W{}".format(idx),
+            synthetic_curve(
+                hours=hours,
+                points_per_hour=points_per_hour,
+                mu=0.2 + 0.6 * idx / max(1, curves),
+                seed=idx,
+            ),
+        )
+        for idx in range(curves)
+    ]
+
+
+def _estimate(values):
+    name, curve = values
+
+    return estimate_growth(curve, params=GrowthEstimationParameters(), name=name)
+
+
+def benchmark_executors(args):
+    plate = synthetic_plate(args.curves, args.hours, args.points_per_hour)
+    units = [WorkUnit(name, (name, curve)) for name, curve in plate]
+
+    print("executor\tworkers\tseconds\tcurves/s")
+    for name, executor_class in (
+        ("process", ProcessExecutor),
+        ("thread", ThreadExecutor),
+    ):
+        for workers in args.workers:
+            with executor_class(workers=workers) as executor:
+                started = time.perf_counter()
+                for result in executor.map(_estimate, units):
+                    if result.error is not None:
+                        raise RuntimeError(result.error)
+                elapsed = time.perf_counter() - started
+
+            print(
+                "{}\t{}\t{:.2f}\t{:.1f}".format(
+                    name, workers, elapsed, len(units) / elapsed
+                )
+            )
+
+
+def benchmark_precision(args):
+    plate = synthetic_plate(args.curves, args.hours, args.points_per_hour)
+
+    results = {}
+    print("dtype\tseconds\tcurves/s\tinput MiB\tresults MiB")
+    for dtype in ("float64", "float32"):
+        params = GrowthEstimationParameters()
+        params.dtype = dtype
+
+        curves = [(name, curve.astype(dtype)) for name, curve in plate]
+        input_size = sum(curve.memory_usage(index=False) for _, curve in curves)
+
+        started = time.perf_counter()
+        results[dtype] = [
+            estimate_growth(curve, params=params, name=name) for name, curve in curves
+        ]
+        elapsed = time.perf_counter() - started
+
+        # Memory held by annotated curves, which are kept until output is written
+        results_size = sum(
+            result.series.memory_usage(index=False)
+            + result.outliers.memory_usage(index=False)
+            for result in results[dtype]
+        )
+
+        print(
+            "{}\t{:.2f}\t{:.1f}\t{:.2f}\t{:.2f}".format(
+                dtype,
+                elapsed,
+                len(curves) / elapsed,
+                input_size / 2**20,
+                results_size / 2**20,
+            )
+        )
+
+    slopes, snrs, mismatches = [], [], 0
+    for double, single in zip(results["float64"], results["float32"]):
+        double = GrowthPhase.pick_best(double.growth_phases, "rank")
+        single = GrowthPhase.pick_best(single.growth_phases, "rank")
+        if double is None or single is None:
+            mismatches += (double is None) != (single is None)
+            continue
+
+        slopes.append(abs(single.slope - double.slope) / abs(double.slope))
+        snrs.append(abs(single.SNR - double.SNR) / abs(double.SNR))
+
+    print()
+    print("Curves where only one precision found a growth phase: {}".format(mismatches))
+    if slopes:
+        print(
+            "Relative difference of slopes: median {:.2e}, max {:.2e}".format(
+                numpy.median(slopes), numpy.max(slopes)
+            )
+        )
+        print(
+            "Relative difference of SNRs: median {:.2e}, max {:.2e}".format(
+                numpy.median(snrs), numpy.max(snrs)
+            )
+        )
+
+
+def benchmark_resolution(args):
+    plate = synthetic_plate(args.curves, args.hours, args.points_per_hour)
+
+    results = {}
+    print("points/hour\tseconds\tcurves/s")
+    for coarse in [None] + args.coarse:
+        params = GrowthEstimationParameters()
+        params.coarse_points_per_hour = coarse
+
+        started = time.perf_counter()
+        results[coarse] = [
+            GrowthPhase.pick_best(
+                estimate_growth(curve, params=params, name=name).growth_phases, "rank"
+            )
+            for name, curve in plate
+        ]
+        elapsed = time.perf_counter() - started
+
+        print(
+            "{}\t{:.2f}\t{:.1f}".format(
+                coarse or args.points_per_hour, elapsed, len(plate) / elapsed
+            )
+        )
+
+    print()
+    for coarse in args.coarse:
+        slopes, mismatches = [], 0
+        for full, phase in zip(results[None], results[coarse]):
+            if full is None or phase is None:
+                mismatches += (full is None) != (phase is None)
+                continue
+
+            slopes.append(abs(phase.slope - full.slope) / abs(full.slope))
+
+        print(
+            "{} points/hour: {} curves where only one resolution found a growth "
+            "phase; relative difference of slopes: median {:.2e}, max {:.2e}".format(
+                coarse,
+                mismatches,
+                numpy.median(slopes) if slopes else numpy.nan,
+                numpy.max(slopes) if slopes else numpy.nan,
+            )
+        )
+
+
+def benchmark_kernels(args):
+    rng = numpy.random.default_rng(0)
+    windows = args.hours * 10
+    starts = rng.integers(0, args.hours, windows)
+    ends = starts + rng.integers(1, 40, windows)
+    order = numpy.lexsort((ends, starts, rng.random(windows)))
+    growth = rng.random(int(args.hours * args.points_per_hour)) > 0.3
+    segments = numpy.sort(rng.integers(0, args.hours, (windows, 2)), axis=1)
+
+    kernels = (
+        ("select_segments", jit.select_segments, (order, starts, ends, args.hours)),
+        ("find_runs", jit.find_runs, (growth,)),
+        ("knot_windows", jit.knot_windows, (segments[:, 0], segments[:, 1])),
+    )
+
+    print("Compiled backend: {}".format(jit.BACKEND))
+    print("kernel\tpython µs\tcompiled µs")
+    for name, kernel, arguments in kernels:
+        timings = []
+        for fn in (jit.python_function(kernel), kernel):
+            # The first call of a compiled kernel includes compilation
+            fn(*arguments)
+            started = time.perf_counter()
+            for _ in range(args.repeats):
+                fn(*arguments)
+            timings.append((time.perf_counter() - started) / args.repeats * 1e6)
+
+        print("{}\t{:.1f}\t{:.1f}".format(name, *timings))
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="python -m croissance.benchmark",
+        description="Benchmark growth estimation on synthetic growth curves",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    subparser = subparsers.add_parser(
+        "executors",
+        help="Compare the process and thread executors",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    subparser.set_defaults(func=benchmark_executors)
+    subparser.add_argument("--curves", type=int, default=96)
+    subparser.add_argument("--hours", type=float, default=24.0)
+    subparser.add_argument("--points-per-hour", type=float, default=4.0)
+    subparser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+
+    subparser = subparsers.add_parser(
+        "precision",
+        help="Compare the speed, memory use and accuracy of float32 and float64",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    subparser.set_defaults(func=benchmark_precision)
+    subparser.add_argument("--curves", type=int, default=96)
+    subparser.add_argument("--hours", type=float, default=24.0)
+    subparser.add_argument("--points-per-hour", type=float, default=4.0)
+
+    subparser = subparsers.add_parser(
+        "resolution",
+        help="Compare estimation on all points with coarse-to-fine estimation",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    subparser.set_defaults(func=benchmark_resolution)
+    subparser.add_argument("--curves", type=int, default=24)
+    subparser.add_argument("--hours", type=float, default=24.0)
+    subparser.add_argument("--points-per-hour", type=float, default=120.0)
+    subparser.add_argument("--coarse", type=float, nargs="+", default=[4.0, 12.0])
+
+    subparser = subparsers.add_parser(
+        "kernels",
+        help="Compare the plain Python and compiled (numba) versions of kernels",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    subparser.set_defaults(func=benchmark_kernels)
+    subparser.add_argument("--hours", type=int, default=24)
+    subparser.add_argument("--points-per-hour", type=float, default=4.0)
+    subparser.add_argument("--repeats", type=int, default=100)
+
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    args.func(args)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
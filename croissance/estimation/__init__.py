@@ -5,11 +5,17 @@ from operator import attrgetter
 import numpy
 import pandas
 
+from croissance.estimation.confidence import slope_confidence_interval
+from croissance.estimation.grid import sampling_grid
+from croissance.estimation.jit import find_runs
 from croissance.estimation.outliers import remove_outliers
+from croissance.estimation.prescreen import prescreen
+from croissance.estimation.pruning import prune_phase
 from croissance.estimation.ranking import rank_phases
 from croissance.estimation.regression import fit_exponential
+from croissance.estimation.resolution import decimate, refine_phase
 from croissance.estimation.smoothing.segments import segment_spline_smoothing
-from croissance.estimation.util import points_per_hour, savitzky_golay
+from croissance.estimation.util import savitzky_golay
 
 
 class RawGrowthPhase(namedtuple("RawGrowthPhase", ("start", "end"))):
@@ -22,7 +28,20 @@ class RawGrowthPhase(namedtuple("RawGrowthPhase", ("start", "end"))):
 
 class GrowthPhase(
     namedtuple(
-        "GrowthPhase", ("start", "end", "slope", "intercept", "n0", "SNR", "rank")
+        "GrowthPhase",
+        (
+            "start",
+            "end",
+            "slope",
+            "intercept",
+            "n0",
+            "SNR",
+            "rank",
+            "slope_lower",
+            "slope_upper",
+        ),
+        # Confidence intervals are only computed if requested
+        defaults=(None, None),
     )
 ):
     __slots__ = ()
@@ -33,15 +52,23 @@ class GrowthPhase(
 
     @staticmethod
     def pick_best(growth_phases, metric="duration"):
-        growth_phases = sorted(growth_phases, key=attrgetter(metric))
-        if growth_phases:
-            return growth_phases[-1]
+        # Equivalent to picking the last element after a (stable) sort, i.e. ties
+        # are resolved in favor of the last phase, but without the sort
+        key = attrgetter(metric)
+        best = None
+        for phase in growth_phases:
+            if best is None or key(phase) >= key(best):
+                best = phase
 
-        return None
+        return best
 
 
+# `rejected` describes why a curve was rejected by the pre-screen, if it was, while
+# `fitted` and `pruned` count candidate phases that were and were not fitted
 AnnotatedGrowthCurve = namedtuple(
-    "AnnotatedGrowthCurve", ("series", "outliers", "growth_phases")
+    "AnnotatedGrowthCurve",
+    ("series", "outliers", "growth_phases", "rejected", "fitted", "pruned"),
+    defaults=(None, 0, 0),
 )
 
 
@@ -51,11 +78,19 @@ class GrowthEstimationParameters:
         "constrain_n0",
         "n0",
         "curve_minimum_duration_hours",
+        "curve_minimum_signal_range",
+        "curve_minimum_log_ratio",
         "phase_minimum_signal_noise_ratio",
         "phase_minimum_duration_hours",
         "phase_minimum_slope",
+        "phase_prune_margin",
         "phase_rank_exclude_below",
         "phase_rank_weights",
+        "coarse_points_per_hour",
+        "confidence_level",
+        "confidence_method",
+        "bootstrap_samples",
+        "dtype",
     ]
 
     def __init__(self):
@@ -64,9 +99,15 @@ class GrowthEstimationParameters:
         self.n0 = 0.0
 
         self.curve_minimum_duration_hours = 5
+        # Curves failing these tests are rejected before smoothing; see `prescreen`
+        self.curve_minimum_signal_range = None
+        self.curve_minimum_log_ratio = None
         self.phase_minimum_signal_noise_ratio = 1.0
         self.phase_minimum_duration_hours = 1.5
         self.phase_minimum_slope = 0.005
+        # Candidate phases whose estimated slope or SNR is below this fraction of the
+        # minimum are skipped without fitting; see `prune_phase`. None to fit all
+        self.phase_prune_margin = None
 
         self.phase_rank_exclude_below = 33
         self.phase_rank_weights = {
@@ -76,6 +117,21 @@ class GrowthEstimationParameters:
             # TODO add 1 - start?
         }
 
+        # Curves sampled at more than twice this rate are smoothed and searched for
+        # growth phases at this rate, while phases are fitted using all points; None
+        # to always use all points
+        self.coarse_points_per_hour = None
+
+        # Confidence level of intervals for slopes (e.g. 0.95), computed from the
+        # covariance of the fit or from bootstrap resamples; None to disable
+        self.confidence_level = None
+        self.confidence_method = "covariance"
+        self.bootstrap_samples = 1000
+
+        # Dtype used for processing curves, e.g. "float32" to halve memory use at a
+        # small cost in accuracy; None to use the dtype of the input curve
+        self.dtype = None
+
 
 growth_estimation_defaults = GrowthEstimationParameters()
 
@@ -88,13 +144,10 @@ def estimate_growth(
 ) -> AnnotatedGrowthCurve:
     log = logging.getLogger(__name__)
     series = curve.dropna()
+    if params.dtype is not None:
+        series = series.astype(params.dtype, copy=False)
 
-    n_hours = int(
-        numpy.round(
-            points_per_hour(series) * max(1, params.curve_minimum_duration_hours)
-        )
-    )
-
+    n_hours = _window_size(series, params)
     if n_hours == 0:
         log.warning(
             "Fewer than one data-point per hour for %s. Use the command-line "
@@ -103,8 +156,12 @@ def estimate_growth(
         )
         return AnnotatedGrowthCurve(series, pandas.Series(dtype="float64"), [])
 
-    if n_hours % 2 == 0:
-        n_hours += 1
+    reason = prescreen(series, params)
+    if reason is not None:
+        log.debug("Rejected %s: %s", name, reason)
+        return AnnotatedGrowthCurve(
+            series, pandas.Series(dtype="float64"), [], rejected=reason
+        )
 
     series, outliers = remove_outliers(series, window=n_hours, std=3)
 
@@ -113,18 +170,29 @@ def estimate_growth(
         log.warning("Fewer than three positive data-points for %s", name)
         return AnnotatedGrowthCurve(series, outliers, [])
 
+    # Densely sampled curves are searched for growth phases at a lower resolution
+    coarse = params.coarse_points_per_hour
+    if coarse is not None and sampling_grid(series.index).points_per_hour > 2 * coarse:
+        search_series = decimate(series, coarse)
+        full_window, n_hours = n_hours, _window_size(search_series, params)
+    else:
+        search_series, coarse = series, None
+
     if params.segment_log_n0:
-        series_log_n0 = numpy.log(series - params.n0).dropna()
-        smooth_series = segment_spline_smoothing(series, series_log_n0)
+        series_log_n0 = numpy.log(search_series - params.n0).dropna()
+        smooth_series = segment_spline_smoothing(search_series, series_log_n0)
     else:
-        smooth_series = segment_spline_smoothing(series)
+        smooth_series = segment_spline_smoothing(search_series)
 
     if len(smooth_series) < n_hours:
         log.warning("Insufficient smoothed data for %s", name)
         return AnnotatedGrowthCurve(series, outliers, [])
 
-    phases = []
+    phases, fitted, pruned = [], 0, 0
     for phase in _find_growth_phases(smooth_series, window=n_hours):
+        if coarse is not None:
+            phase = RawGrowthPhase(*refine_phase(series, *phase, coarse, full_window))
+
         phase_series = series[phase.start : phase.end]
 
         # skip any growth phases that have not enough points for fitting
@@ -135,6 +203,12 @@ def estimate_growth(
         if phase.duration < max(0.0, params.phase_minimum_duration_hours):
             continue
 
+        # skip phases that are not expected to pass the slope and SNR limits
+        if prune_phase(phase_series, params):
+            pruned += 1
+            continue
+
+        fitted += 1
         slope, intercept, n0, snr, _fallback_linear_method = fit_exponential(
             phase_series, n0=params.n0 if params.constrain_n0 else None
         )
@@ -147,6 +221,13 @@ def estimate_growth(
         if snr < max(1.0, params.phase_minimum_signal_noise_ratio):
             continue
 
+        if _fallback_linear_method:
+            slope_lower, slope_upper = None, None
+        else:
+            slope_lower, slope_upper = slope_confidence_interval(
+                phase_series, slope, intercept, n0, params
+            )
+
         phases.append(
             GrowthPhase(
                 start=phase.start,
@@ -156,6 +237,8 @@ def estimate_growth(
                 n0=n0,
                 SNR=snr,
                 rank=None,
+                slope_lower=slope_lower,
+                slope_upper=slope_upper,
             )
         )
 
@@ -177,9 +260,17 @@ def estimate_growth(
             for phase in ranked_phases
             if phase.rank >= params.phase_rank_exclude_below
         ],
+        fitted=fitted,
+        pruned=pruned,
     )
 
 
+def _window_size(series, params):
+    grid = sampling_grid(series.index)
+
+    return grid.window_size(params.curve_minimum_duration_hours)
+
+
 def _find_growth_phases(curve: "pandas.Series", window):
     """
     Finds growth phases by locating regions in a series where both the first and
@@ -188,22 +279,10 @@ def _find_growth_phases(curve: "pandas.Series", window):
     first_derivative = savitzky_golay(curve, window, 3, deriv=1)
     second_derivative = savitzky_golay(curve, window, 3, deriv=2)
 
-    growth = pandas.Series(
-        index=curve.index,
-        data=(first_derivative.values > 0) & (second_derivative.values > 0),
-    )
-
-    istart, iend, phases = None, None, []
-    for i, v in zip(growth.index, growth.values):
-        if v:
-            if istart is None:
-                istart = i
-        elif istart is not None:
-            phases.append(RawGrowthPhase(istart, iend))
-            istart = None
-        iend = i
+    growth = (first_derivative.values > 0) & (second_derivative.values > 0)
+    firsts, lasts = find_runs(growth)
 
-    if istart is not None:
-        phases.append(RawGrowthPhase(istart, iend))
-
-    return phases
+    return [
+        RawGrowthPhase(start, end)
+        for start, end in zip(curve.index[firsts], curve.index[lasts])
+    ]
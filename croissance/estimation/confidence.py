@@ -0,0 +1,117 @@
+import numpy
+from scipy.stats import t as student_t
+
+
+def slope_confidence_interval(series, slope, intercept, n0, params):
+    """
+    Returns a ``(lower, upper)`` confidence interval for the slope of an exponential
+    fitted to a series by ``fit_exponential``, or ``(None, None)`` if intervals are
+    disabled or cannot be computed.
+
+    Intervals are computed either from the covariance matrix of the fit (the default),
+    or from a residual bootstrap in which all resamples are re-fitted together using a
+    vectorized Gauss-Newton solver, starting from the original fit.
+    """
+    level = params.confidence_level
+    if level is None or not slope > 0 or not numpy.isfinite(intercept):
+        return None, None
+
+    x = numpy.asarray(series.index, dtype=numpy.float64)
+    y = numpy.asarray(series.values, dtype=numpy.float64)
+
+    # The fit is re-parameterized as exp(log_a + slope * (x - center)) + n0, which is
+    # better conditioned than a * exp(slope * x) + n0 but has the same slope
+    center = x.mean()
+    x = x - center
+    theta = numpy.array([slope * (center - intercept), slope, n0])
+
+    # N0 is treated as fixed if constrained or at its lower bound of zero
+    fit_n0 = not params.constrain_n0 and n0 > 0
+    if len(y) <= 2 + fit_n0:
+        return None, None
+
+    if params.confidence_method == "bootstrap":
+        slopes = _bootstrap_slopes(x, y, theta, fit_n0, params.bootstrap_samples)
+        if len(slopes) < 2:
+            return None, None
+
+        alpha = (1 - level) / 2
+        lower, upper = numpy.quantile(slopes, (alpha, 1 - alpha))
+    else:
+        residuals = y - _exponential(x, theta[numpy.newaxis])[0]
+        dof = len(y) - 2 - fit_n0
+        jacobian = _jacobian(x, theta[numpy.newaxis], fit_n0)[0]
+        variance = residuals @ residuals / dof * _inverse_normal(jacobian)[1, 1]
+        if not numpy.isfinite(variance) or variance < 0:
+            return None, None
+
+        error = student_t.ppf((1 + level) / 2, dof) * numpy.sqrt(variance)
+        lower, upper = slope - error, slope + error
+
+    return float(lower), float(upper)
+
+
+def _exponential(x, theta):
+    return numpy.exp(theta[:, 0:1] + theta[:, 1:2] * x) + theta[:, 2:3]
+
+
+def _jacobian(x, theta, fit_n0):
+    growth = numpy.exp(theta[:, 0:1] + theta[:, 1:2] * x)
+    columns = [growth, growth * x]
+    if fit_n0:
+        columns.append(numpy.ones_like(growth))
+
+    return numpy.stack(columns, axis=-1)
+
+
+def _inverse_normal(jacobian):
+    # Columns are scaled to unit length before inverting J^T J
+    scale = numpy.linalg.norm(jacobian, axis=0)
+    scale[scale == 0] = 1.0
+    inverse = numpy.linalg.pinv(numpy.dot((jacobian / scale).T, jacobian / scale))
+
+    return inverse / numpy.outer(scale, scale)
+
+
+def _bootstrap_slopes(x, y, theta, fit_n0, samples, iterations=20, tolerance=1e-10):
+    """
+    Re-fits ``samples`` residual bootstrap resamples of ``y`` and returns the slopes of
+    the fits that converged.
+    """
+    parameters = 2 + fit_n0
+    fit = _exponential(x, theta[numpy.newaxis])[0]
+    # Residuals are inflated to account for the degrees of freedom used by the fit
+    residuals = (y - fit) * numpy.sqrt(len(y) / (len(y) - parameters))
+
+    # A fixed seed makes results reproducible
+    rng = numpy.random.default_rng(0)
+    resampled = fit + residuals[rng.integers(0, len(y), size=(samples, len(y)))]
+
+    thetas = numpy.repeat(theta[numpy.newaxis], samples, axis=0)
+    converged = numpy.zeros(samples, dtype=bool)
+    for _ in range(iterations):
+        jacobian = _jacobian(x, thetas, fit_n0)
+        error = resampled - _exponential(x, thetas)
+
+        # Normal equations of all resamples, solved in a single batch
+        scale = numpy.linalg.norm(jacobian, axis=1, keepdims=True)
+        scale[scale == 0] = 1.0
+        scaled = jacobian / scale
+        normal = numpy.einsum("snp,snq->spq", scaled, scaled)
+        gradient = numpy.einsum("snp,sn->sp", scaled, error)
+        try:
+            step = numpy.linalg.solve(normal, gradient[..., numpy.newaxis])[..., 0]
+        except numpy.linalg.LinAlgError:
+            return numpy.array([])
+
+        step /= scale[:, 0, :]
+        thetas[:, :parameters] += step
+
+        limit = tolerance * (1 + numpy.abs(thetas[:, :parameters]))
+        converged = numpy.all(numpy.abs(step) <= limit, axis=1)
+        if converged.all():
+            break
+
+    slopes = thetas[converged, 1]
+
+    return slopes[numpy.isfinite(slopes)]
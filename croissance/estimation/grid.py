@@ -0,0 +1,104 @@
+"""
+Sampling grids, i.e. the times at which curves were measured. Most curves in a file,
+and often all files from one instrument, share the same grid, so quantities that
+depend only on the grid are computed once per grid and cached process-wide.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy
+import pandas
+
+from croissance.estimation.util import points_per_hour
+
+
+class SamplingGrid:
+    def __init__(self, index):
+        self.index = index
+        self.points_per_hour = points_per_hour(pandas.Series(index=index, dtype=float))
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        """
+        Returns the value of ``compute(self.index)``, computed once per ``key``.
+        """
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+
+        value = compute(self.index)
+        with self._lock:
+            return self._cache.setdefault(key, value)
+
+    def window_size(self, minimum_duration_hours):
+        """
+        Returns the (odd) number of points spanning the minimum curve duration, or 0 if
+        there are fewer than one point per hour.
+        """
+
+        def _compute(_index):
+            n_hours = int(
+                numpy.round(self.points_per_hour * max(1, minimum_duration_hours))
+            )
+            if n_hours and n_hours % 2 == 0:
+                n_hours += 1
+
+            return n_hours
+
+        return self.get(("window_size", minimum_duration_hours), _compute)
+
+
+class _GridCache:
+    def __init__(self, maxsize):
+        self._grids = OrderedDict()
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+
+    def __call__(self, index):
+        key = grid_key(index)
+        with self._lock:
+            grid = self._grids.get(key)
+            if grid is not None:
+                self._grids.move_to_end(key)
+                return grid
+
+            grid = self._grids[key] = SamplingGrid(index)
+            if len(self._grids) > self._maxsize:
+                self._grids.popitem(last=False)
+
+            return grid
+
+    def clear(self):
+        with self._lock:
+            self._grids.clear()
+
+
+def grid_key(index):
+    """Returns a key identifying indexes with identical values and dtype."""
+    values = numpy.ascontiguousarray(index.values)
+    digest = hashlib.blake2b(values.tobytes(), digest_size=16).digest()
+
+    return (str(values.dtype), len(values), digest)
+
+
+# Returns the (cached) SamplingGrid of an index
+sampling_grid = _GridCache(maxsize=64)
+
+
+def group_by_grid(curves):
+    """
+    Groups an iterable of ``(name, curve)`` pairs by sampling grid, returning a list of
+    ``(grid, [(name, curve), ...])`` pairs in order of first appearance.
+    """
+    groups = {}
+    for name, curve in curves:
+        key = grid_key(curve.index)
+        if key not in groups:
+            groups[key] = (sampling_grid(curve.index), [])
+
+        groups[key][1].append((name, curve))
+
+    return list(groups.values())
@@ -0,0 +1,111 @@
+"""
+Kernels for inherently sequential loops, compiled using the optional `numba` package
+if it is installed; otherwise the same functions are run as plain Python. Set the
+environment variable CROISSANCE_DISABLE_JIT=1 to use plain Python regardless.
+"""
+
+import os
+
+import numpy
+
+try:
+    if os.environ.get("CROISSANCE_DISABLE_JIT", "0") not in ("", "0"):
+        raise ImportError("disabled by CROISSANCE_DISABLE_JIT")
+
+    import numba
+except ImportError:
+    numba = None
+
+
+BACKEND = "python" if numba is None else "numba {}".format(numba.__version__)
+
+
+def _jit(fn):
+    if numba is None:
+        return fn
+
+    return numba.njit(cache=True, nogil=True)(fn)
+
+
+def python_function(kernel):
+    """Returns the plain Python implementation of a (possibly compiled) kernel."""
+    return getattr(kernel, "py_func", kernel)
+
+
+@_jit
+def select_segments(order, starts, ends, duration):
+    """
+    Greedily selects non-overlapping windows, taken in the given order, where windows
+    cover the integer positions ``range(start, end)``. Returns the starts and ends of
+    the selected windows, with ends truncated to ``duration``.
+    """
+    offset = starts.min()
+    occupied = numpy.zeros(ends.max() - offset + 1, dtype=numpy.bool_)
+
+    selected_starts = numpy.empty(len(order), dtype=numpy.int64)
+    selected_ends = numpy.empty(len(order), dtype=numpy.int64)
+    count = 0
+    for idx in order:
+        start, end = starts[idx] - offset, ends[idx] - offset
+        if not occupied[start:end].any():
+            occupied[start:end] = True
+            selected_starts[count] = starts[idx]
+            selected_ends[count] = min(duration, ends[idx])
+            count += 1
+
+    return selected_starts[:count], selected_ends[:count]
+
+
+@_jit
+def find_runs(mask):
+    """
+    Returns the positions of the first and last element of each run of True values.
+    """
+    firsts = numpy.empty(len(mask), dtype=numpy.int64)
+    lasts = numpy.empty(len(mask), dtype=numpy.int64)
+    count = 0
+    start = -1
+    for idx in range(len(mask)):
+        if mask[idx]:
+            if start < 0:
+                start = idx
+        elif start >= 0:
+            firsts[count] = start
+            lasts[count] = idx - 1
+            count += 1
+            start = -1
+
+    if start >= 0:
+        firsts[count] = start
+        lasts[count] = len(mask) - 1
+        count += 1
+
+    return firsts[:count], lasts[:count]
+
+
+@_jit
+def knot_windows(segment_starts, segment_ends):
+    """
+    Returns the starts and ends of the windows in which knots are placed for each
+    segment; see ``segment_points``.
+    """
+    starts = numpy.empty(3 * len(segment_starts), dtype=numpy.float64)
+    ends = numpy.empty(3 * len(segment_starts), dtype=numpy.float64)
+    count = 0
+    for idx in range(len(segment_starts)):
+        start, end = segment_starts[idx], segment_ends[idx]
+        if end - start > 5:
+            starts[count], ends[count] = start, start + 2
+            count += 1
+
+            if end - start > 11:
+                starts[count], ends[count] = start + 2, end - 2
+                count += 1
+
+            starts[count], ends[count] = end - 2, end
+            count += 1
+        else:
+            starts[count], ends[count] = start, end
+            count += 1
+
+    return starts[:count], ends[:count]
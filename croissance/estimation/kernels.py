@@ -0,0 +1,89 @@
+"""
+Process-wide caches of filter kernels and design matrices. These depend only on the
+window sizes used, which are the same for all curves sharing a sampling rate, and are
+therefore computed once rather than for every curve.
+"""
+
+from functools import lru_cache
+
+import numpy
+from scipy.ndimage import convolve1d
+from scipy.signal import savgol_coeffs
+
+
+@lru_cache(maxsize=128)
+def savgol_kernel(window_length: int, polyorder: int, deriv: int = 0, delta=1.0):
+    """
+    Returns the convolution coefficients of a Savitzky-Golay filter, together with the
+    matrices mapping the first and last ``window_length`` values of a series onto the
+    first and last ``window_length // 2`` filtered values, as done by
+    ``scipy.signal.savgol_filter`` using ``mode="interp"``.
+    """
+    coeffs = savgol_coeffs(window_length, polyorder, deriv=deriv, delta=delta)
+
+    halflen = window_length // 2
+    positions = numpy.arange(window_length, dtype=float)
+    # Maps values onto the coefficients of a least-squares polynomial fit
+    fit = numpy.linalg.pinv(numpy.vander(positions, polyorder + 1))
+
+    left = _polyval_matrix(positions[:halflen], polyorder, deriv) @ fit
+    right = _polyval_matrix(positions[window_length - halflen :], polyorder, deriv)
+    right = right @ fit
+
+    kernel = (coeffs, left / delta**deriv, right / delta**deriv)
+    for array in kernel:
+        array.setflags(write=False)
+
+    return kernel
+
+
+def savgol(values, window_length: int, polyorder: int, deriv: int = 0, delta=1.0):
+    """
+    Equivalent to ``scipy.signal.savgol_filter(values, window_length, polyorder,
+    deriv, delta)`` for 1-dimensional arrays, using a cached kernel.
+    """
+    values = numpy.asarray(values)
+    # Integer input is filtered in double precision; float32 input in single precision
+    values = values.astype(numpy.result_type(values.dtype, numpy.float32), copy=False)
+    if window_length > len(values):
+        raise ValueError("window_length must be less than or equal to the data size")
+
+    coeffs, left, right = savgol_kernel(window_length, polyorder, deriv, delta)
+
+    result = convolve1d(values, coeffs.astype(values.dtype), mode="constant")
+    halflen = window_length // 2
+    if halflen:
+        result[:halflen] = left @ values[:window_length]
+        result[-halflen:] = right @ values[-window_length:]
+
+    return result
+
+
+@lru_cache(maxsize=128)
+def linear_fit_kernel(length: int):
+    """
+    Returns the positions ``linspace(0, 1, length)`` and the row of the pseudo-inverse
+    of the design matrix ``[x, 1]`` that maps values onto the least-squares slope.
+    """
+    x = numpy.linspace(0, 1, num=length)
+    slope = numpy.linalg.pinv(numpy.vstack([x, numpy.ones(length)]).T)[0]
+
+    x.setflags(write=False)
+    slope.setflags(write=False)
+
+    return x, slope
+
+
+def _polyval_matrix(positions, polyorder, deriv):
+    """
+    Returns a matrix that evaluates the ``deriv``-th derivative of a polynomial, given
+    its coefficients in decreasing powers, at each of the ``positions``.
+    """
+    powers = numpy.arange(polyorder, -1, -1)
+    factors = numpy.ones(polyorder + 1)
+    for i in range(deriv):
+        factors *= numpy.maximum(powers - i, 0)
+
+    exponents = numpy.maximum(powers - deriv, 0)
+
+    return factors * positions[:, numpy.newaxis] ** exponents
@@ -0,0 +1,35 @@
+import numpy
+
+
+def prescreen(series, params):
+    """
+    Cheap tests for curves that cannot contain growth phases, such as blanks and wells
+    without growth. Returns a description of the reason for rejecting the curve, or
+    None if the curve should be processed.
+
+    The tests use the 5th and 95th percentiles of the raw values, which makes them
+    insensitive to the occasional outlier, and are disabled unless the corresponding
+    parameter is set.
+    """
+    if len(series) < 2:
+        return None
+
+    low, high = numpy.percentile(series.values, (5, 95))
+
+    minimum_range = params.curve_minimum_signal_range
+    if minimum_range is not None and high - low < minimum_range:
+        return "signal range {:.4g} is below {:.4g}".format(high - low, minimum_range)
+
+    minimum_log_ratio = params.curve_minimum_log_ratio
+    if minimum_log_ratio is not None:
+        # Ratios are computed above the baseline, if known; curves whose baseline
+        # cannot be determined are never rejected by this test
+        baseline = params.n0 if params.constrain_n0 else 0.0
+        if low - baseline > 0 and high - baseline > 0:
+            log_ratio = numpy.log((high - baseline) / (low - baseline))
+            if log_ratio < minimum_log_ratio:
+                return "log-ratio {:.4g} is below {:.4g}".format(
+                    log_ratio, minimum_log_ratio
+                )
+
+    return None
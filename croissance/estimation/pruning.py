@@ -0,0 +1,51 @@
+import numpy
+
+
+def prune_phase(series, params):
+    """
+    Returns True if a candidate growth phase is not expected to pass the minimum slope
+    and signal-to-noise ratio thresholds, based on estimates that are much cheaper to
+    compute than ``fit_exponential``. A phase is pruned only if an estimate falls
+    below ``params.phase_prune_margin`` times the corresponding threshold.
+
+    - The growth rate of ``a * exp(b * x) + c`` equals y'' / y' for any ``c``. This is
+      estimated from a quadratic least-squares fit at the start of the phase, where
+      it over-estimates the rate of exponential growth.
+    - The signal-to-noise ratio is estimated as the best of a cubic fit and a
+      log-linear fit, which approximate slow and fast exponential growth well.
+    """
+    margin = params.phase_prune_margin
+    if margin is None or len(series) < 5:
+        return False
+
+    x = numpy.asarray(series.index, dtype=numpy.float64)
+    x = x - x.mean()
+    y = numpy.asarray(series.values, dtype=numpy.float64)
+
+    minimum_slope = max(0.0, params.phase_minimum_slope)
+    p2, p1, _p0 = numpy.polyfit(x, y, 2)
+    start_slope = p1 + 2 * p2 * x[0]
+    if p2 > 0 and start_slope > 0 and 2 * p2 / start_slope < margin * minimum_slope:
+        return True
+
+    minimum_snr = max(1.0, params.phase_minimum_signal_noise_ratio)
+    return _estimate_snr(x, y) < margin * minimum_snr
+
+
+def _estimate_snr(x, y):
+    estimates = [_snr(y, numpy.polyval(numpy.polyfit(x, y, 3), x))]
+
+    positive = y > 0
+    if positive.sum() >= 3:
+        slope, intercept = numpy.polyfit(x[positive], numpy.log(y[positive]), 1)
+        estimates.append(_snr(y, numpy.exp(intercept + slope * x)))
+
+    return max(estimates)
+
+
+def _snr(y, fit):
+    noise = numpy.var(y - fit)
+    if not noise:
+        return numpy.inf
+
+    return numpy.var(fit) / noise
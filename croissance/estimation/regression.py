@@ -12,7 +12,10 @@ def fit_exponential(series, *, p0=(1.0, 0.01, 0.0), n0: float = None):
     Fits an exponential to a series. First attempts an exponential fit in linear space
     using p0, then falls back to a fit in log space to attempt to find parameters p0
     for a linear fit; if all else fails returns the linear fit.
+
+    Fits are always performed in double precision, regardless of the dtype of series.
     """
+    series = series.astype(numpy.float64, copy=False)
 
     if n0 is None:
         fit_fn = exponential
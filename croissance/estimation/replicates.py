@@ -0,0 +1,148 @@
+from collections import namedtuple
+
+import numpy
+import pandas
+
+from croissance.estimation import (
+    AnnotatedGrowthCurve,
+    _window_size,
+    estimate_growth,
+    growth_estimation_defaults,
+)
+from croissance.estimation.confidence import slope_confidence_interval
+from croissance.estimation.outliers import remove_outliers
+from croissance.estimation.regression import fit_exponential
+
+# `pooled` is the annotated median curve of the group, while `replicates` is a list of
+# `(name, AnnotatedGrowthCurve)` pairs fitted using the growth phases of the former
+AnnotatedReplicateGroup = namedtuple(
+    "AnnotatedReplicateGroup", ("pooled", "replicates")
+)
+
+ReplicatePhaseStatistics = namedtuple(
+    "ReplicatePhaseStatistics",
+    (
+        "start",
+        "end",
+        "replicates",
+        "slope_mean",
+        "slope_std",
+        "intercept_mean",
+        "intercept_std",
+        "n0_mean",
+        "n0_std",
+        "SNR_mean",
+        "SNR_std",
+    ),
+)
+
+
+def pool_replicates(curves):
+    """
+    Returns the median of a list of replicate curves, at every time where at least
+    one of the replicates has a value.
+    """
+    return pandas.concat(list(curves), axis=1).median(axis=1).dropna()
+
+
+def estimate_replicate_growth(
+    replicates,
+    *,
+    params=growth_estimation_defaults,
+    name: str = "untitled group",
+) -> AnnotatedReplicateGroup:
+    """
+    Estimates growth of a group of replicate curves, given as a list of
+    ``(name, curve)`` pairs. Growth phases are found once in the median curve of the
+    group, and the same phases are then fitted in each of the replicates.
+    """
+    pooled = estimate_growth(
+        pool_replicates(curve for _, curve in replicates), params=params, name=name
+    )
+
+    return AnnotatedReplicateGroup(
+        pooled,
+        [
+            (replicate, fit_replicate(curve, pooled.growth_phases, params=params))
+            for replicate, curve in replicates
+        ],
+    )
+
+
+def fit_replicate(
+    curve: pandas.Series, growth_phases, *, params=growth_estimation_defaults
+) -> AnnotatedGrowthCurve:
+    """
+    Fits the given growth phases of a curve, without applying the slope and
+    signal-to-noise thresholds used to find them; the ranks of the phases are kept.
+    """
+    series = curve.dropna()
+    if params.dtype is not None:
+        series = series.astype(params.dtype, copy=False)
+
+    n_hours = _window_size(series, params)
+    if n_hours:
+        series, outliers = remove_outliers(series, window=n_hours, std=3)
+    else:
+        outliers = pandas.Series(dtype="float64")
+
+    phases = []
+    for phase in growth_phases:
+        phase_series = series[phase.start : phase.end]
+        if len(phase_series[phase_series > 0]) < 3:
+            continue
+
+        slope, intercept, n0, snr, fallback_linear_method = fit_exponential(
+            phase_series, n0=params.n0 if params.constrain_n0 else None
+        )
+
+        if fallback_linear_method:
+            slope_lower, slope_upper = None, None
+        else:
+            slope_lower, slope_upper = slope_confidence_interval(
+                phase_series, slope, intercept, n0, params
+            )
+
+        phases.append(
+            phase._replace(
+                slope=slope,
+                intercept=intercept,
+                n0=n0,
+                SNR=snr,
+                slope_lower=slope_lower,
+                slope_upper=slope_upper,
+            )
+        )
+
+    return AnnotatedGrowthCurve(series, outliers, phases)
+
+
+def replicate_statistics(group: AnnotatedReplicateGroup):
+    """
+    Returns the mean and (sample) standard deviation of the parameters fitted in each
+    replicate, for each growth phase of the pooled curve.
+    """
+    statistics = []
+    for phase in group.pooled.growth_phases:
+        fits = [
+            fit
+            for _, curve in group.replicates
+            for fit in curve.growth_phases
+            if (fit.start, fit.end) == (phase.start, phase.end)
+        ]
+
+        values = {}
+        for field in ("slope", "intercept", "n0", "SNR"):
+            column = numpy.array([getattr(fit, field) for fit in fits], dtype=float)
+            values[field + "_mean"] = column.mean() if len(column) else numpy.nan
+            values[field + "_std"] = (
+                column.std(ddof=1) if len(column) > 1 else numpy.nan
+            )
+
+        statistics.append(
+            ReplicatePhaseStatistics(
+                start=phase.start, end=phase.end, replicates=len(fits), **values
+            )
+        )
+
+    return statistics
@@ -0,0 +1,79 @@
+import numpy
+import pandas
+
+from croissance.estimation.kernels import savgol
+
+
+def decimate(series, points_per_hour):
+    """
+    Returns a series with the mean time and value of ``series`` in consecutive bins
+    of ``1 / points_per_hour`` hours, starting at the first measurement.
+    """
+    index = series.index.values
+    bins = _bins(index, index[0], points_per_hour)
+    # Bins are consecutive runs of equal values, since the index is sorted
+    starts = numpy.flatnonzero(numpy.diff(bins, prepend=-1))
+    counts = numpy.diff(starts, append=len(bins))
+
+    times = numpy.add.reduceat(index, starts) / counts
+    values = numpy.add.reduceat(series.values, starts) / counts
+
+    return pandas.Series(data=values.astype(series.dtype), index=times)
+
+
+def refine_phase(series, start, end, points_per_hour, window):
+    """
+    Returns the start and end of a phase found in ``decimate(series, points_per_hour)``
+    at the resolution of ``series``.
+
+    The start is moved to the first point of the bin of ``start`` or of the bin before
+    it from which the first and second derivatives of ``series`` (Savitzky-Golay
+    filters spanning ``window`` points) remain positive, and the end likewise within
+    the bin of ``end`` and the bin after it. Boundaries where the derivatives do not
+    confirm the phase are placed at the outer edge of their bin.
+    """
+    index = series.index.values
+    bins = _bins(index, index[0], points_per_hour)
+    first, last = _bins(numpy.array([start, end]), index[0], points_per_hour)
+
+    lo = bins.searchsorted(first, side="left")
+    hi = bins.searchsorted(last, side="right")
+
+    if first < last and window <= len(index):
+        # Points of the bins on either side of each boundary
+        start_lo = bins.searchsorted(first - 1, side="left")
+        end_hi = bins.searchsorted(last + 1, side="right")
+        start_bin = bins.searchsorted(first, side="right")
+        end_bin = bins.searchsorted(last, side="left")
+
+        growth = _growth(series.values, start_lo, start_bin, window)
+        if growth[-1]:
+            stops = numpy.flatnonzero(~growth)
+            lo = start_lo + (stops[-1] + 1 if len(stops) else 0)
+
+        growth = _growth(series.values, end_bin, end_hi, window)
+        if growth[0]:
+            stops = numpy.flatnonzero(~growth)
+            hi = end_bin + stops[0] if len(stops) else end_hi
+
+    return series.index[lo], series.index[hi - 1]
+
+
+def _growth(values, lo, hi, window):
+    """
+    Returns whether the first and second derivatives of ``values`` are both positive
+    at each position from ``lo`` to ``hi``, filtering only the values required.
+    """
+    halflen = window // 2
+    offset = max(0, min(lo - halflen, len(values) - window))
+    stop = max(offset + window, min(hi + halflen, len(values)))
+
+    values = values[offset:stop]
+    first = savgol(values, window, 3, deriv=1)[lo - offset : hi - offset]
+    second = savgol(values, window, 3, deriv=2)[lo - offset : hi - offset]
+
+    return (first > 0) & (second > 0)
+
+
+def _bins(times, origin, points_per_hour):
+    return numpy.floor((times - origin) * points_per_hour).astype(numpy.int64)
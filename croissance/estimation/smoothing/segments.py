@@ -1,7 +1,11 @@
 import numpy
 import pandas
+from numpy.lib.stride_tricks import sliding_window_view
 from scipy.interpolate import InterpolatedUnivariateSpline
-from scipy.signal import detrend
+
+from croissance.estimation.grid import sampling_grid
+from croissance.estimation.jit import knot_windows, select_segments
+from croissance.estimation.kernels import linear_fit_kernel
 
 
 def segment_by_std_dev(series, increment=2, maximum=20):
@@ -10,40 +14,127 @@ def segment_by_std_dev(series, increment=2, maximum=20):
     Windows are of varying size from `increment` to `maximum * increment` at each
     offset `increment` within the series.
     """
-    start = int(series.index.min())
     duration = int(series.index[-2])
+    starts, ends, lo, hi = sampling_grid(series.index).get(
+        ("segment_windows", increment, maximum),
+        lambda index: _segment_windows(index, increment, maximum),
+    )
+
+    if not len(starts):
+        return []
+
+    starts = numpy.asarray(starts, dtype=numpy.int64)
+    ends = numpy.asarray(ends, dtype=numpy.int64)
+    window_agv_std = window_std_devs(series.values, lo, hi) / (ends - starts)
+
+    # Windows are considered in order of (average std. dev., start, end)
+    order = numpy.lexsort((ends, starts, window_agv_std))
+    segment_starts, segment_ends = select_segments(order, starts, ends, duration)
 
-    windows = []
+    return sorted(zip(segment_starts.tolist(), segment_ends.tolist()))
+
+
+def _segment_windows(index, increment, maximum):
+    """
+    Returns the starts, ends and positional bounds of the non-empty windows considered
+    by ``segment_by_std_dev`` for a given index.
+    """
+    start = int(index.min())
+    duration = int(index[-2])
+
+    starts, ends = [], []
     for i in range(start, duration, increment):
         for size in range(1, maximum + 1):
-            window = series[i : i + size * increment]
-            # Gaps in measurements may result in empty windows
-            if not window.empty:
-                window = detrend(window)
-                windows.append(
-                    (window.std() / (size * increment), i, i + size * increment)
-                )
+            starts.append(i)
+            ends.append(i + size * increment)
+
+    lo, hi = _slice_bounds(index, starts, ends)
+    # Gaps in measurements may result in empty windows
+    nonempty = hi > lo
+
+    return (
+        [start for start, keep in zip(starts, nonempty) if keep],
+        [end for end, keep in zip(ends, nonempty) if keep],
+        lo[nonempty],
+        hi[nonempty],
+    )
+
+
+def window_std_devs(values, lo, hi):
+    """
+    Returns the standard deviation of ``detrend(values[lo:hi])``, i.e. of the residuals
+    of a linear least-squares fit, for each pair of positional bounds. Windows of the
+    same length are detrended together as the rows of a single (strided) array.
+    """
+    values = numpy.asarray(values, dtype=float)
+    lengths = numpy.asarray(hi) - numpy.asarray(lo)
 
-    segments = []
-    spots = set()
-    for _window_agv_std, start, end in sorted(windows):
-        window_spots = range(start, int(end))
+    # Windows with fewer than three points are fitted exactly
+    std_devs = numpy.zeros(len(lengths))
+    for length in numpy.unique(lengths[lengths > 2]):
+        selected = numpy.flatnonzero(lengths == length)
+        windows = sliding_window_view(values, length)[numpy.asarray(lo)[selected]]
 
-        if not any(i in spots for i in window_spots):
-            segments.append((start, min(duration, end)))
-            spots.update(window_spots)
+        positions = numpy.arange(length) - (length - 1) / 2
+        centered = windows - windows.mean(axis=1, keepdims=True)
+        slopes = centered @ positions / (positions @ positions)
+        residuals = centered - slopes[:, numpy.newaxis] * positions
 
-    return sorted(segments)
+        std_devs[selected] = residuals.std(axis=1)
+
+    return std_devs
 
 
 def window_median(window, start, end):
-    x = numpy.linspace(0, 1, num=len(window))
-    A = numpy.vstack([x, numpy.ones(len(x))]).T
-    m, _c = numpy.linalg.lstsq(A, window, rcond=None)[0]
+    x, slope = linear_fit_kernel(len(window))
+    m = slope @ numpy.asarray(window)
 
     return (start + end) / 2, m * 0.5 + numpy.median(window - m * x)
 
 
+def window_medians(values, lo, hi):
+    """
+    Vectorized ``window_median`` for the windows ``values[lo[i]:hi[i]]``, returning
+    the median value of each window after removing its least-squares linear trend.
+    Slopes are computed in closed form from prefix sums, which are accumulated in
+    double precision regardless of the dtype of ``values``.
+    """
+    values = numpy.asarray(values, dtype=float)
+    lo = numpy.asarray(lo, dtype=int)
+    hi = numpy.asarray(hi, dtype=int)
+    n = hi - lo
+
+    # Slopes are invariant to offsets; centering reduces the rounding errors of sums
+    centered = values - values.mean() if len(values) else values
+    positions = numpy.arange(len(values))
+    sum_y = numpy.concatenate([[0.0], numpy.cumsum(centered)])
+    sum_iy = numpy.concatenate([[0.0], numpy.cumsum(positions * centered)])
+
+    # Sums over each window, with positions i relative to the start of the window
+    s_y = sum_y[hi] - sum_y[lo]
+    s_iy = sum_iy[hi] - sum_iy[lo] - lo * s_y
+    s_i = n * (n - 1) / 2.0
+    s_ii = (n - 1) * n * (2 * n - 1) / 6.0
+
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        slope = (n * s_iy - s_i * s_y) / (n * s_ii - s_i**2)
+        # Slope with respect to x = linspace(0, 1, n), and 0 for single points
+        m = numpy.where(n > 1, slope * (n - 1), 0.0)
+
+    # Detrended windows, padded to equal length with NaNs
+    offsets = numpy.arange(n.max(initial=0))
+    mask = offsets < n[:, numpy.newaxis]
+    idx = numpy.where(mask, lo[:, numpy.newaxis] + offsets, 0)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        x = numpy.where(n > 1, 1.0 / (n - 1), 0.0)[:, numpy.newaxis] * offsets
+
+    residuals = numpy.where(mask, values[idx] - m[:, numpy.newaxis] * x, numpy.nan)
+    if not len(residuals):
+        return m
+
+    return m * 0.5 + numpy.nanmedian(residuals, axis=1)
+
+
 def segment_points(series, segments):
     """
     Picks knot points for an interpolating spline along a series of segments according
@@ -54,28 +145,53 @@ def segment_points(series, segments):
     - For large segments, add a knot a knot near the beginning and end of the segment,
       and one in the center.
     """
-    out = [(series.index[0], numpy.median(series[: series.index[0] + 1]))]
+    segments = numpy.array(segments, dtype=float).reshape(-1, 2)
+    starts, ends = knot_windows(segments[:, 0], segments[:, 1])
+    lo, hi = _slice_bounds(series.index, starts, ends)
+
+    # Windows may be empty due to gaps in measurements
+    nonempty = hi > lo
+    knots = (starts[nonempty] + ends[nonempty]) / 2
+    values = window_medians(series.values, lo[nonempty], hi[nonempty])
+
+    first = series.index[0]
+    (first_lo,), (first_hi,) = _slice_bounds(series.index, [None], [first + 1])
+    (last_lo,), (last_hi,) = _slice_bounds(series.index, [first - 1], [None])
+
+    index = [first, *knots, series.index[-1]]
+    data = [
+        numpy.median(series.values[first_lo:first_hi]),
+        *values,
+        numpy.max(series.values[last_lo:last_hi]),
+    ]
+
+    return pandas.Series(index=index, data=data)
 
-    def _add_knot(start, end):
-        window = series[start:end]
-        if not window.empty:
-            out.append(window_median(window, start, end))
 
-    for start, end in segments:
-        if end - start > 5:
-            _add_knot(start, start + 2)
+def _slice_bounds(index, starts, ends):
+    """
+    Returns the positional bounds of ``series[start:end]`` for each start and end,
+    where None represents an open bound. This is label-based, including both ends, for
+    float indexes and positional for integer indexes.
+    """
+    n = len(index)
+    if pandas.api.types.is_integer_dtype(index.dtype):
+        bounds = []
+        for start, end in zip(starts, ends):
+            start = None if start is None else int(start)
+            end = None if end is None else int(end)
+            bounds.append(slice(start, end).indices(n)[:2])
 
-            if end - start > 11:
-                _add_knot(start + 2, end - 2)
+        lo, hi = zip(*bounds) if bounds else ((), ())
+        return numpy.array(lo, dtype=int), numpy.array(hi, dtype=int)
 
-            _add_knot(end - 2, end)
-        else:
-            _add_knot(start, end)
+    starts = [index[0] if start is None else start for start in starts]
+    ends = [index[-1] if end is None else end for end in ends]
 
-    out += [(series.index[-1], numpy.max(series[series.index[0] - 1 :]))]
+    lo = index.searchsorted(numpy.asarray(starts, dtype=float), side="left")
+    hi = index.searchsorted(numpy.asarray(ends, dtype=float), side="right")
 
-    index, data = zip(*out)
-    return pandas.Series(index=index, data=data)
+    return numpy.asarray(lo, dtype=int), numpy.asarray(hi, dtype=int)
 
 
 def segment_spline_smoothing(series, series_std_dev=None, k=3):
@@ -89,4 +205,6 @@ def segment_spline_smoothing(series, series_std_dev=None, k=3):
         return pandas.Series(dtype="float64")
 
     spline = InterpolatedUnivariateSpline(points.index, points.values, k=k)
-    return pandas.Series(data=spline(series.index), index=series.index)
+    dtype = numpy.result_type(series.dtype, numpy.float32)
+
+    return pandas.Series(data=spline(series.index).astype(dtype), index=series.index)
@@ -1,6 +1,7 @@
 import numpy
 import pandas
-from scipy.signal import savgol_filter
+
+from croissance.estimation.kernels import savgol
 
 
 def points_per_hour(series):
@@ -10,9 +11,10 @@ def points_per_hour(series):
     return 1 / numpy.median(series.index[1:] - series.index[:-1])
 
 
-def savitzky_golay(series, *args, **kwargs):
+def savitzky_golay(series, window_length, polyorder, deriv=0, delta=1.0):
     return pandas.Series(
-        index=series.index, data=savgol_filter(series.values, *args, **kwargs)
+        index=series.index,
+        data=savgol(series.values, window_length, polyorder, deriv, delta),
     )
 
 
@@ -0,0 +1,677 @@
+"""
+Executors for running growth estimation on work units, either locally using a pool
+of processes or threads, or on several nodes using a job queue served over TCP.
+"""
+
+import itertools
+import logging
+import multiprocessing
+import pickle
+import queue
+import socket
+import sys
+import threading
+import time
+import traceback
+from collections import deque, namedtuple
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    BrokenExecutor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from multiprocessing.managers import BaseManager
+
+WorkUnit = namedtuple("WorkUnit", ("key", "payload"))
+# `seconds` is the CPU time spent on the unit by a worker; None for restored units
+UnitResult = namedtuple(
+    "UnitResult", ("key", "value", "error", "seconds"), defaults=(None,)
+)
+
+
+# Key of the first record of a journal, holding its header
+_HEADER = "__header__"
+
+
+class Checkpoint:
+    """
+    Append-only journal of completed work units, keyed by ``WorkUnit.key``. Records
+    are flushed as they are added, so that a journal left behind by a crashed run can
+    be re-opened to skip work that has already been done.
+
+    If a ``header`` is given (e.g. a hash of the parameters of the work), an existing
+    journal is only used if it was written with an equal header; otherwise it is
+    discarded, and ``discarded`` is set.
+    """
+
+    def __init__(self, filepath, header=None):
+        self._filepath = filepath
+        self._results = {}
+        self.discarded = False
+
+        try:
+            with open(filepath, "r+b") as handle:
+                stored_header = None
+                while True:
+                    offset = handle.tell()
+                    try:
+                        key, value = pickle.load(handle)
+                    except (
+                        EOFError,
+                        pickle.UnpicklingError,
+                        ValueError,
+                        MemoryError,
+                        AttributeError,
+                        IndexError,
+                        KeyError,
+                        TypeError,
+                    ):
+                        # The end of the journal, or a torn trailing record left by a
+                        # crashed run, which is removed before appending new records
+                        handle.truncate(offset)
+                        break
+
+                    if offset == 0 and key == _HEADER:
+                        stored_header = value
+                    else:
+                        self._results[key] = value
+
+                # ``offset`` is the end of the last complete record
+                if header is not None and stored_header != header and offset:
+                    self._results = {}
+                    self.discarded = True
+                    handle.truncate(0)
+        except FileNotFoundError:
+            pass
+
+        self._handle = open(filepath, "ab")  # noqa: SIM115 closed by close()
+        if header is not None and not self._handle.tell():
+            pickle.dump(
+                (_HEADER, header), self._handle, protocol=pickle.HIGHEST_PROTOCOL
+            )
+            self._handle.flush()
+
+    def add(self, key, value):
+        pickle.dump((key, value), self._handle, protocol=pickle.HIGHEST_PROTOCOL)
+        self._handle.flush()
+        self._results[key] = value
+
+    def __contains__(self, key):
+        return key in self._results
+
+    def __getitem__(self, key):
+        return self._results[key]
+
+    def __len__(self):
+        return len(self._results)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def close(self):
+        self._handle.close()
+
+
+class ExecutionStats:
+    """
+    Summary of the work done by an executor, used to report how well the available
+    workers were utilised. ``busy_seconds`` is the CPU time spent by workers on work
+    units.
+    """
+
+    __slots__ = ["batches", "busy_seconds", "units", "wall_seconds", "workers"]
+
+    def __init__(self, workers):
+        self.units = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+        self.wall_seconds = 0.0
+        self.workers = workers
+
+    @property
+    def busy_workers(self):
+        """Average number of workers that were busy while running work units."""
+        if not self.wall_seconds:
+            return 0.0
+
+        return self.busy_seconds / self.wall_seconds
+
+    @property
+    def utilisation(self):
+        return self.busy_workers / self.workers
+
+
+class Executor:
+    """
+    Base class for executors that apply a function to a stream of work units.
+    """
+
+    def __init__(self, workers: int = 1, retries: int = 0):
+        self.workers = max(1, workers)
+        self.retries = max(0, retries)
+        self.stats = ExecutionStats(self.workers)
+
+    def map(self, fn, units, *, ordered: bool = False, checkpoint=None, schedule=None):
+        """
+        Applies ``fn`` to the payload of each ``WorkUnit`` in ``units`` and yields a
+        ``UnitResult`` per unit, in order of completion unless ``ordered`` is set.
+        Units that fail are retried up to ``retries`` times, after which the result
+        carries the formatted traceback in ``error``. Units found in ``checkpoint``
+        are not run again, and completed units are added to it.
+
+        If given, ``schedule`` is called with the list of pending ``(seq, unit)``
+        pairs and returns the order in which to dispatch them, as a list of batches
+        of such pairs; each batch is sent to a worker as a single task.
+        """
+        results = self._map_with_checkpoint(fn, units, checkpoint, schedule)
+        if ordered:
+            results = reorder(results)
+
+        for _seq, result in results:
+            yield result
+
+    def _map_with_checkpoint(self, fn, units, checkpoint, schedule):
+        restored = deque()
+
+        def _pending():
+            for seq, unit in enumerate(units):
+                if checkpoint is not None and unit.key in checkpoint:
+                    restored.append(
+                        (seq, UnitResult(unit.key, checkpoint[unit.key], None))
+                    )
+                else:
+                    yield seq, unit
+
+        if schedule is None:
+            batches = ((task,) for task in _pending())
+        else:
+            batches = (tuple(batch) for batch in schedule(list(_pending())))
+
+        self.stats = ExecutionStats(self.workers)
+        started = time.perf_counter()
+        for seq, result in self._run(fn, batches):
+            while restored:
+                yield restored.popleft()
+
+            if checkpoint is not None and result.error is None:
+                checkpoint.add(result.key, result.value)
+
+            self.stats.units += 1
+            self.stats.wall_seconds = time.perf_counter() - started
+
+            yield seq, result
+
+        while restored:
+            yield restored.popleft()
+
+    def _run(self, fn, batches):
+        """
+        Runs ``fn`` on each unit in ``batches`` of ``(seq, unit)`` pairs, yielding
+        ``(seq, UnitResult)`` pairs in any order.
+        """
+        raise NotImplementedError
+
+    def _next_batch(self, batches, retry):
+        if retry:
+            return retry.popleft()
+
+        batch = next(batches, None)
+        if batch is None:
+            return None
+
+        return batch, 0
+
+    def _handle_batch(self, batch, attempt, outcomes, elapsed, retry):
+        self.stats.batches += 1
+        self.stats.busy_seconds += elapsed
+
+        for (seq, unit), (value, error, seconds) in zip(batch, outcomes):
+            if error is None:
+                yield seq, UnitResult(unit.key, value, None, seconds)
+            elif attempt < self.retries:
+                log = logging.getLogger(__name__)
+                log.warning(
+                    "Retrying work unit %r (attempt %i of %i)",
+                    unit.key,
+                    attempt + 2,
+                    self.retries + 1,
+                )
+                retry.append((((seq, unit),), attempt + 1))
+            else:
+                yield seq, UnitResult(unit.key, None, error, seconds)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def close(self):
+        pass
+
+
+class _PoolExecutor(Executor):
+    def __init__(self, workers: int = 1, retries: int = 0, initializer=None):
+        super().__init__(workers=workers, retries=retries)
+        self._initializer = initializer
+        self._pool = None
+
+    def _create_pool(self):
+        raise NotImplementedError
+
+    def _run(self, fn, batches):
+        if self._pool is None:
+            self._pool = self._create_pool()
+
+        batches = iter(batches)
+        retry = deque()
+        # Units of batches that were running when a worker died; these are run one at
+        # a time, so that a crash is only counted against the unit that caused it
+        suspects = deque()
+        inflight = {}
+        # Bound the number of queued units to keep memory use independent of input size
+        limit = self.workers * 4
+
+        while True:
+            while len(inflight) < limit and not suspects:
+                item = self._next_batch(batches, retry)
+                if item is None:
+                    break
+
+                batch, attempt = item
+                payloads = [unit.payload for _, unit in batch]
+                future = self._pool.submit(_call_batch, fn, payloads)
+                inflight[future] = (batch, attempt, False)
+
+            if suspects and not inflight:
+                batch, attempt = suspects.popleft()
+                future = self._pool.submit(_call_batch, fn, [batch[0][1].payload])
+                inflight[future] = (batch, attempt, True)
+
+            if not inflight:
+                break
+
+            broken = False
+            done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch, attempt, isolated = inflight.pop(future)
+                try:
+                    outcomes, elapsed = future.result()
+                except BrokenExecutor:
+                    broken = True
+                    if not isolated:
+                        suspects.extend(((task,), attempt) for task in batch)
+                        continue
+
+                    outcomes = [(None, traceback.format_exc(), None)]
+                    elapsed = 0.0
+
+                yield from self._handle_batch(batch, attempt, outcomes, elapsed, retry)
+
+            if broken:
+                # A worker died unexpectedly; remaining futures fail with the pool
+                for future, (batch, attempt, _) in inflight.items():
+                    if (
+                        future.done()
+                        and not future.cancelled()
+                        and future.exception() is None
+                    ):
+                        outcomes, elapsed = future.result()
+                        yield from self._handle_batch(
+                            batch, attempt, outcomes, elapsed, retry
+                        )
+                    else:
+                        suspects.extend(((task,), attempt) for task in batch)
+
+                inflight = {}
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = self._create_pool()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+
+class ProcessExecutor(_PoolExecutor):
+    """Runs work units in a pool of local processes."""
+
+    def _create_pool(self):
+        return ProcessPoolExecutor(
+            max_workers=self.workers, initializer=self._initializer
+        )
+
+
+class ThreadExecutor(_PoolExecutor):
+    """Runs work units in a pool of threads in the current process."""
+
+    def _create_pool(self):
+        return ThreadPoolExecutor(
+            max_workers=self.workers, initializer=self._initializer
+        )
+
+
+class _JobQueue:
+    """
+    Queue of work units shared with workers through a manager server. Units that have
+    been handed out are leased until a result is returned; results for units whose
+    lease has expired (and that have therefore been re-queued) are discarded.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._tasks = deque()
+        self._leases = {}
+        self._results = queue.Queue()
+        self._generation = 0
+        self._function = None
+        self._closed = False
+
+    def set_function(self, fn):
+        with self._condition:
+            self._generation += 1
+            self._function = fn
+
+    def get_function(self):
+        with self._condition:
+            return self._generation, self._function
+
+    def submit(self, token, payload):
+        with self._condition:
+            self._tasks.append((token, self._generation, payload))
+            self._condition.notify()
+
+    def get_task(self, timeout=1.0):
+        with self._condition:
+            if not self._condition.wait_for(
+                lambda: self._tasks or self._closed, timeout=timeout
+            ):
+                return None
+            elif self._closed:
+                return _STOP
+
+            task = self._tasks.popleft()
+            self._leases[task[0]] = time.monotonic()
+
+            return task
+
+    def put_result(self, token, outcomes, elapsed):
+        with self._condition:
+            if self._leases.pop(token, None) is None:
+                return
+
+        self._results.put((token, outcomes, elapsed))
+
+    def get_result(self, timeout=1.0):
+        return self._results.get(timeout=timeout)
+
+    def expire_leases(self, timeout):
+        now = time.monotonic()
+        with self._condition:
+            expired = [
+                token
+                for token, leased_at in self._leases.items()
+                if now - leased_at > timeout
+            ]
+            for token in expired:
+                del self._leases[token]
+
+            return expired
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+_STOP = "STOP"
+
+
+class _ClientManager(BaseManager):
+    pass
+
+
+_ClientManager.register("get_queue")
+
+
+class ClusterExecutor(Executor):
+    """
+    Serves work units to workers over TCP using a ``multiprocessing.managers`` job
+    queue. Workers on other nodes connect using ``run_worker`` (or ``croissance
+    worker HOST:PORT``); ``local_workers`` processes are started on this node. Units
+    that are not returned within ``lease_timeout`` seconds, for example because a
+    node went down, are re-queued and count as a failed attempt.
+    """
+
+    def __init__(
+        self,
+        address=("127.0.0.1", 0),
+        authkey: bytes = b"",
+        local_workers: int = 0,
+        retries: int = 0,
+        lease_timeout: float = 600.0,
+        initializer=None,
+    ):
+        super().__init__(workers=local_workers, retries=retries)
+        self.lease_timeout = lease_timeout
+
+        self._jobs = _JobQueue()
+
+        class _ServerManager(BaseManager):
+            pass
+
+        _ServerManager.register("get_queue", callable=lambda: self._jobs)
+
+        self._closing = False
+        self._server = _ServerManager(address=address, authkey=authkey).get_server()
+        self._server.stop_event = threading.Event()
+        self._server_thread = threading.Thread(target=self._serve, daemon=True)
+        self._server_thread.start()
+
+        log = logging.getLogger(__name__)
+        log.info("Serving work units on %s:%i", *self.address)
+
+        self._workers = []
+        for _ in range(local_workers):
+            worker = multiprocessing.Process(
+                target=run_worker,
+                args=(self.address, authkey),
+                kwargs={"initializer": initializer},
+                daemon=True,
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    @property
+    def address(self):
+        return self._server.address
+
+    def _serve(self):
+        # Server.serve_forever is not used, since it cannot be stopped cleanly from
+        # another thread and resets sys.stdout/sys.stderr when it returns
+        while True:
+            try:
+                connection = self._server.listener.accept()
+            except (OSError, EOFError, multiprocessing.AuthenticationError):
+                if self._closing:
+                    break
+                continue
+
+            if self._closing:
+                connection.close()
+                break
+
+            threading.Thread(
+                target=self._server.handle_request, args=(connection,), daemon=True
+            ).start()
+
+    def _run(self, fn, batches):
+        self._jobs.set_function(fn)
+
+        batches = iter(batches)
+        tokens = itertools.count()
+        retry = deque()
+        inflight = {}
+        # Keep enough units queued that remote workers never wait on the parent
+        limit = max(256, self.workers * 4)
+        checked = time.monotonic()
+
+        while True:
+            while len(inflight) < limit:
+                item = self._next_batch(batches, retry)
+                if item is None:
+                    break
+
+                batch, attempt = item
+                token = next(tokens)
+                inflight[token] = (batch, attempt)
+                self._jobs.submit(token, [unit.payload for _, unit in batch])
+
+            if not inflight:
+                break
+
+            completed = []
+            try:
+                token, outcomes, elapsed = self._jobs.get_result(timeout=1.0)
+            except queue.Empty:
+                pass
+            else:
+                batch, attempt = inflight.pop(token)
+                completed.append((batch, attempt, outcomes, elapsed))
+
+            # Leases are checked regardless of other results arriving, so that units
+            # leased by a dead worker are not held back while others keep working
+            now = time.monotonic()
+            if now - checked >= 1.0:
+                checked = now
+                for token in self._jobs.expire_leases(self.lease_timeout):
+                    batch, attempt = inflight.pop(token)
+                    error = "Work unit lease expired after {} seconds".format(
+                        self.lease_timeout
+                    )
+                    outcomes = [(None, error, None)] * len(batch)
+                    completed.append((batch, attempt, outcomes, 0))
+
+            for batch, attempt, outcomes, elapsed in completed:
+                yield from self._handle_batch(batch, attempt, outcomes, elapsed, retry)
+
+    def close(self):
+        self._jobs.close()
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+        if self._server_thread.is_alive():
+            self._closing = True
+            self._server.stop_event.set()
+            # Wake up the thread blocked in accept() by connecting to it
+            try:
+                socket.create_connection(self.address, timeout=1.0).close()
+            except OSError:
+                pass
+
+            self._server_thread.join()
+            self._server.listener.close()
+
+
+def run_worker(address, authkey: bytes, initializer=None, poll_interval=1.0):
+    """
+    Processes work units from a ``ClusterExecutor`` at ``address`` until it closes.
+    """
+    if initializer is not None:
+        initializer()
+
+    manager = _ClientManager(address=tuple(address), authkey=authkey)
+    manager.connect()
+    jobs = manager.get_queue()
+
+    generation, fn = None, None
+    while True:
+        try:
+            task = jobs.get_task(poll_interval)
+        except (EOFError, ConnectionError):
+            # The server has gone away
+            break
+
+        if task is None:
+            continue
+        elif task == _STOP:
+            break
+
+        token, task_generation, payloads = task
+        if task_generation != generation:
+            generation, fn = jobs.get_function()
+
+        outcomes, elapsed = _call_batch(fn, payloads)
+        try:
+            jobs.put_result(token, outcomes, elapsed)
+        except (EOFError, ConnectionError):
+            break
+        except Exception:  # noqa: BLE001
+            # Results that cannot be sent to the server are reported as errors
+            error = traceback.format_exc()
+            jobs.put_result(token, [(None, error, None)] * len(payloads), elapsed)
+
+
+def gil_enabled():
+    """
+    Returns False when running on a free-threaded Python build with the GIL disabled,
+    in which case threads can run growth estimation in parallel.
+    """
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    if is_gil_enabled is None:
+        return True
+
+    return is_gil_enabled()
+
+
+def parse_address(value: str):
+    """Parses an address of the form ``HOST:PORT``."""
+    host, _, port = value.rpartition(":")
+    if not port.isdigit():
+        raise ValueError("Invalid address {!r}; expected HOST:PORT".format(value))
+
+    return (host or "127.0.0.1", int(port))
+
+
+def _call_batch(fn, payloads):
+    # CPU time of the worker thread, so that time spent waiting for a core is not
+    # counted towards the utilisation of the workers
+    started = time.thread_time()
+    outcomes = []
+    for payload in payloads:
+        unit_started = time.thread_time()
+        try:
+            value, error = fn(payload), None
+        except Exception:  # noqa: BLE001 reported as the outcome of the unit
+            value, error = None, traceback.format_exc()
+
+        outcomes.append((value, error, time.thread_time() - unit_started))
+
+    return outcomes, time.thread_time() - started
+
+
+def reorder(results, window=None):
+    """
+    Yields ``(seq, value)`` pairs in order of ``seq``, where sequence numbers are
+    consecutive and start at 0. If more than ``window`` pairs are buffered while waiting
+    for an earlier pair, the earliest buffered pair is yielded regardless; earlier
+    pairs are then yielded as they arrive.
+    """
+    buffered, next_seq = {}, 0
+    for seq, result in results:
+        if seq < next_seq:
+            yield seq, result
+            continue
+
+        buffered[seq] = result
+        if window is not None and len(buffered) > window:
+            next_seq = min(buffered)
+
+        while next_seq in buffered:
+            yield next_seq, buffered.pop(next_seq)
+            next_seq += 1
@@ -0,0 +1,168 @@
+"""
+Storage of annotated curves in an SQLite database, used with `--output-database`.
+
+Curves are identified by the hash of the contents of their input file, their name,
+and the hash of the estimation parameters, so that results of repeated runs with the
+same parameters replace earlier results, while results of runs with other parameters
+are kept alongside them.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+
+from croissance.estimation import GrowthPhase
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS parameters (
+    params_hash TEXT PRIMARY KEY,
+    parameters TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS curves (
+    file_hash TEXT NOT NULL,
+    name TEXT NOT NULL,
+    params_hash TEXT NOT NULL REFERENCES parameters (params_hash),
+    filepath TEXT NOT NULL,
+    status TEXT NOT NULL,
+    message TEXT,
+    updated TEXT NOT NULL,
+    PRIMARY KEY (file_hash, name, params_hash)
+);
+
+CREATE TABLE IF NOT EXISTS phases (
+    file_hash TEXT NOT NULL,
+    name TEXT NOT NULL,
+    params_hash TEXT NOT NULL,
+    phase INTEGER NOT NULL,
+    start REAL,
+    "end" REAL,
+    slope REAL,
+    intercept REAL,
+    N0 REAL,
+    SNR REAL,
+    rank REAL,
+    slope_lower REAL,
+    slope_upper REAL,
+    PRIMARY KEY (file_hash, name, params_hash, phase),
+    FOREIGN KEY (file_hash, name, params_hash)
+        REFERENCES curves (file_hash, name, params_hash) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS curves_name ON curves (name);
+CREATE INDEX IF NOT EXISTS curves_filepath ON curves (filepath);
+CREATE INDEX IF NOT EXISTS phases_name ON phases (name);
+"""
+
+_UPSERT_CURVE = """
+INSERT INTO curves (file_hash, name, params_hash, filepath, status, message, updated)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (file_hash, name, params_hash) DO UPDATE SET
+    filepath = excluded.filepath,
+    status = excluded.status,
+    message = excluded.message,
+    updated = excluded.updated
+"""
+
+# Phases of earlier runs are replaced, as a curve may now have fewer phases
+_DELETE_PHASES = """
+DELETE FROM phases WHERE file_hash = ? AND name = ? AND params_hash = ?
+"""
+
+_INSERT_PHASE = """
+INSERT INTO phases VALUES ({})
+""".format(", ".join("?" * (4 + len(GrowthPhase._fields))))
+
+
+def file_hash(filepath, chunk_size=2**20):
+    """Returns the BLAKE2b hash of the contents of a file."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filepath, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def parameters_json(params):
+    """Serializes GrowthEstimationParameters as JSON with sorted keys."""
+    return json.dumps(
+        {name: getattr(params, name) for name in type(params).__slots__},
+        sort_keys=True,
+    )
+
+
+def parameters_hash(params):
+    """Returns the BLAKE2b hash of the parameters serialized by `parameters_json`."""
+    return hashlib.blake2b(parameters_json(params).encode(), digest_size=16).hexdigest()
+
+
+class SQLiteWriter:
+    """
+    Writes annotated curves to an SQLite database, inserting or updating curves in
+    place. Writes are committed in transactions of up to ``batch_size`` curves, and
+    when the writer is closed.
+    """
+
+    def __init__(self, filepath, params, batch_size: int = 1000):
+        self._connection = sqlite3.connect(str(filepath))
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        self._connection.executescript(SCHEMA)
+        self._batch_size = batch_size
+        self._pending = 0
+
+        self.params_hash = parameters_hash(params)
+        self._connection.execute(
+            "INSERT OR IGNORE INTO parameters VALUES (?, ?)",
+            (self.params_hash, parameters_json(params)),
+        )
+
+    def write(self, file_hash, filepath, name, curve):
+        """Writes an AnnotatedGrowthCurve read from the file with the given hash."""
+        if curve.rejected is not None:
+            status, message = "rejected", curve.rejected
+        else:
+            status, message = "annotated", None
+
+        self._write_curve(file_hash, filepath, name, status, message)
+        self._connection.executemany(
+            _INSERT_PHASE,
+            (
+                (file_hash, name, self.params_hash, idx, *phase)
+                for idx, phase in enumerate(curve.growth_phases, start=1)
+            ),
+        )
+        self._count()
+
+    def write_failed(self, file_hash, filepath, name, error):
+        """Records a curve that could not be annotated, with the error message."""
+        self._write_curve(file_hash, filepath, name, "failed", error)
+        self._count()
+
+    def _write_curve(self, file_hash, filepath, name, status, message):
+        key = (file_hash, name, self.params_hash)
+        updated = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self._connection.execute(
+            _UPSERT_CURVE, (*key, str(filepath), status, message, updated)
+        )
+        self._connection.execute(_DELETE_PHASES, key)
+
+    def _count(self):
+        self._pending += 1
+        if self._pending >= self._batch_size:
+            self.commit()
+
+    def commit(self):
+        self._connection.commit()
+        self._pending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def close(self):
+        self.commit()
+        self._connection.close()
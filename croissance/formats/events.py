@@ -0,0 +1,74 @@
+"""
+Structured log of the events of a run, used with `--event-log`.
+
+Events are written as one JSON object per line, with the `event` type and the seconds
+`elapsed` since the start of the run, and can be loaded using
+``pandas.read_json(filepath, lines=True)``. Events are buffered and written in
+batches, to keep the overhead of logging low for runs with many curves.
+"""
+
+import json
+import time
+
+
+class EventLog:
+    """
+    Writes events to a JSONL file in batches of up to ``batch_size`` events, and
+    when flushed or closed.
+    """
+
+    def __init__(self, filepath, batch_size: int = 1000):
+        self._handle = open(filepath, "wt")  # noqa: SIM115 closed by close()
+        self._batch_size = batch_size
+        self._buffer = []
+        self._started = time.monotonic()
+
+        self.write("started", time=time.strftime("%Y-%m-%dT%H:%M:%S"))
+
+    def write(self, event, **fields):
+        fields = {"event": event, "elapsed": time.monotonic() - self._started, **fields}
+        self._buffer.append(json.dumps(fields, allow_nan=False))
+        if len(self._buffer) >= self._batch_size:
+            self.flush()
+
+    def write_curve(self, filepath, name, result):
+        """Writes a `curve` event for the UnitResult of annotating a curve."""
+        fields = {
+            "file": str(filepath),
+            "name": name,
+            "seconds": result.seconds,
+        }
+
+        if result.error is not None:
+            fields["status"] = "failed"
+            fields["reason"] = result.error.strip().splitlines()[-1]
+            fields["error"] = result.error
+        else:
+            # Replicate groups are described by their pooled curve
+            curve = getattr(result.value, "pooled", result.value)
+            fields["status"] = "annotated" if curve.rejected is None else "rejected"
+            fields["reason"] = curve.rejected
+            fields["phases"] = len(curve.growth_phases)
+            fields["fitted"] = curve.fitted
+            fields["pruned"] = curve.pruned
+
+        self.write("curve", **fields)
+
+    def flush(self):
+        if self._buffer:
+            self._buffer.append("")
+            self._handle.write("\n".join(self._buffer))
+            self._buffer.clear()
+
+        self._handle.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def close(self):
+        self.write("finished")
+        self.flush()
+        self._handle.close()
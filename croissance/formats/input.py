@@ -1,13 +1,91 @@
+import bz2
+import csv
+import gzip
+import io
+import lzma
+import os
+import pickle
+import sys
+import tempfile
+
+import numpy
 import pandas
 
+# Magic numbers of compressed files
+_COMPRESSION_MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+)
+
+
+_DECOMPRESSORS = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+
+
+def open_input(filepath, **kwargs):
+    """
+    Opens an input file for reading as text, where "-" is standard input. Files
+    compressed using gzip, bz2, xz or zstd are detected and decompressed while read;
+    zstd requires the optional `zstandard` package. Keyword arguments are passed on to
+    `io.TextIOWrapper`.
+    """
+    stdin = str(filepath) == "-"
+    handle = sys.stdin.buffer if stdin else open(filepath, "rb")  # noqa: SIM115
+
+    if not isinstance(handle, io.BufferedReader):
+        handle = io.BufferedReader(handle)
+
+    magic = handle.peek(6)
+    compression = next(
+        (name for prefix, name in _COMPRESSION_MAGIC if magic.startswith(prefix)), None
+    )
+
+    # Decompressing file objects does not close them, unlike decompressing files
+    if compression in _DECOMPRESSORS:
+        if not stdin:
+            handle.close()
+            handle = filepath
+
+        handle = _DECOMPRESSORS[compression](handle, "rb")
+    elif compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as error:
+            raise RuntimeError(
+                "{}: zstd compressed input requires the 'zstandard' package".format(
+                    filepath
+                )
+            ) from error
+
+        handle = zstandard.ZstdDecompressor().stream_reader(handle, closefd=True)
+
+    return io.TextIOWrapper(handle, **kwargs)
+
 
 class TSVReader:
-    def __init__(self, filepath):
+    def __init__(self, filepath, dtype=None):
         self._filepath = filepath
+        self._dtype = dtype
 
     def read(self):
-        with open(self._filepath, "rt") as handle:
-            data = pandas.read_csv(handle, sep="\t", header=0, index_col=0)
+        with open_input(self._filepath) as handle:
+            if self._dtype is None:
+                data = pandas.read_csv(handle, sep="\t", header=0, index_col=0)
+            else:
+                # Parse values directly into the requested dtype, keeping the time
+                # column (the index) in double precision. The header is read first,
+                # as (decompressed) standard input cannot be rewound
+                header = io.StringIO(handle.readline())
+                columns = pandas.read_csv(header, sep="\t", header=0).columns
+                data = pandas.read_csv(
+                    handle,
+                    sep="\t",
+                    header=None,
+                    names=columns,
+                    index_col=0,
+                    dtype={name: self._dtype for name in columns[1:]},
+                )
 
         return [(name, data[name].dropna()) for name in data.columns]
 
@@ -16,3 +94,159 @@ class TSVReader:
 
     def __exit__(self, *args, **kwargs):
         pass
+
+
+class LongTSVReader:
+    """
+    Reads long (tidy) tables with one measurement per row and the columns "well",
+    "time" and "value", plus an optional "plate" column; curves are named by well, or
+    by plate and well (e.g. "plate1 A1") if a plate column is present.
+
+    Files are read in chunks of ``chunksize`` rows. If the rows of each curve are
+    contiguous (e.g. the file is sorted by plate and well), each curve is yielded as
+    soon as its last row has been read. Otherwise, set ``presorted=False``: rows are
+    then first spilled to ``buckets`` temporary files, partitioned by curve, after
+    which the curves of one bucket at a time are assembled in memory and yielded.
+    """
+
+    def __init__(
+        self, filepath, dtype=None, presorted=True, chunksize=2**20, buckets=64
+    ):
+        self._filepath = filepath
+        self._dtype = dtype
+        self._presorted = presorted
+        self._chunksize = chunksize
+        self._buckets = buckets
+
+    def read(self):
+        if self._presorted:
+            return self._read_sorted()
+
+        return self._read_unsorted()
+
+    def _read_sorted(self):
+        seen = set()
+        name, pieces = None, []
+        for chunk in self._chunks():
+            names = chunk["name"].to_numpy()
+            bounds = numpy.flatnonzero(names[1:] != names[:-1]) + 1
+            starts = numpy.concatenate(([0], bounds))
+            ends = numpy.concatenate((bounds, [len(names)]))
+
+            for start, end in zip(starts, ends):
+                if names[start] != name:
+                    if pieces:
+                        yield name, self._curve(pieces)
+
+                    name, pieces = names[start], []
+                    if name in seen:
+                        raise ValueError(
+                            "{}: rows of curve {!r} are not contiguous; the file must "
+                            "be sorted by plate and well".format(self._filepath, name)
+                        )
+                    seen.add(name)
+
+                pieces.append(chunk.iloc[start:end])
+
+        if pieces:
+            yield name, self._curve(pieces)
+
+    def _read_unsorted(self):
+        with tempfile.TemporaryDirectory(prefix="croissance-") as tmpdir:
+            filepaths = [
+                os.path.join(tmpdir, "{}.pickle".format(bucket))
+                for bucket in range(self._buckets)
+            ]
+
+            for chunk in self._chunks():
+                hashes = pandas.util.hash_pandas_object(chunk["name"], index=False)
+                for bucket, rows in chunk.groupby(hashes.to_numpy() % self._buckets):
+                    with open(filepaths[bucket], "ab") as handle:
+                        pickle.dump(rows, handle, protocol=pickle.HIGHEST_PROTOCOL)
+
+            for filepath in filepaths:
+                if not os.path.exists(filepath):
+                    continue
+
+                rows = pandas.concat(list(_load_pickles(filepath)))
+                os.unlink(filepath)
+                for name, curve in rows.groupby("name", sort=False):
+                    yield name, self._curve([curve])
+
+    def _chunks(self):
+        with open_input(self._filepath) as handle:
+            yield from self._parse_chunks(handle)
+
+    def _parse_chunks(self, handle):
+        columns = next(csv.reader([handle.readline()], delimiter="\t"), [])
+        missing = {"well", "time", "value"}.difference(columns)
+        if missing:
+            raise ValueError(
+                "{}: missing column(s) {}".format(
+                    self._filepath, ", ".join(sorted(missing))
+                )
+            )
+
+        usecols = ["well", "time", "value"]
+        dtype = {"well": str, "time": "float64", "value": self._dtype or "float64"}
+        if "plate" in columns:
+            usecols.insert(0, "plate")
+            dtype["plate"] = str
+
+        for chunk in pandas.read_csv(
+            handle,
+            sep="\t",
+            header=None,
+            names=columns,
+            usecols=usecols,
+            dtype=dtype,
+            chunksize=self._chunksize,
+        ):
+            name = chunk["well"]
+            if "plate" in chunk:
+                name = chunk["plate"] + " " + name
+
+            yield pandas.DataFrame(
+                {"name": name, "time": chunk["time"], "value": chunk["value"]}
+            )
+
+    def _curve(self, pieces):
+        rows = pandas.concat(pieces) if len(pieces) > 1 else pieces[0]
+        curve = pandas.Series(
+            data=rows["value"].to_numpy(),
+            index=pandas.Index(rows["time"].to_numpy(), name="time"),
+        )
+        if not curve.index.is_monotonic_increasing:
+            curve = curve.sort_index(kind="stable")
+
+        return curve.dropna()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        pass
+
+
+def _load_pickles(filepath):
+    with open(filepath, "rb") as handle:
+        while True:
+            try:
+                yield pickle.load(handle)
+            except EOFError:
+                return
+
+
+def read_groups(filepath):
+    """
+    Reads a tab-separated file mapping curve names to groups of replicates, with the
+    header "name" and "group", and returns a dict of ``{name: group}``.
+    """
+    with open(filepath, "rt", newline="") as handle:
+        reader = csv.DictReader(handle, delimiter="\t")
+        if reader.fieldnames is None or not {"name", "group"} <= set(reader.fieldnames):
+            raise ValueError(
+                "{}: expected the columns 'name' and 'group'".format(filepath)
+            )
+
+        return {row["name"]: row["group"] for row in reader}
@@ -1,46 +1,162 @@
 import csv
+import gzip
+import sys
 
 from croissance.estimation import AnnotatedGrowthCurve, GrowthPhase
+from croissance.estimation.replicates import replicate_statistics
+
+COMPRESSION_SUFFIXES = {
+    None: "",
+    "gzip": ".gz",
+    "zstd": ".zst",
+}
+
+_EMPTY_PHASE = GrowthPhase(None, None, None, None, None, None, None)
+
+
+def open_text(filepath, mode="rt", compression=None):
+    """
+    Opens a (possibly compressed) text file; ``compression`` may be None, "gzip" or
+    "zstd", the last of which requires the optional `zstandard` package. The path "-"
+    is standard output, which is left open when the returned file is closed.
+    """
+    if str(filepath) == "-":
+        if compression is None:
+            return _Unclosed(sys.stdout)
+
+        filepath = _Unclosed(sys.stdout.buffer)
+
+    if compression is None:
+        return open(filepath, mode)
+    elif compression == "gzip":
+        return gzip.open(filepath, mode)
+    elif compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as error:
+            raise RuntimeError(
+                "zstd compression requires the 'zstandard' package"
+            ) from error
+
+        return zstandard.open(filepath, mode)
+    else:
+        raise NotImplementedError("Unsupported compression: '{}'".format(compression))
+
+
+class _Unclosed:
+    """Wraps a file object, flushing rather than closing it when closed."""
+
+    def __init__(self, handle):
+        self._handle = handle
+
+    def close(self):
+        self._handle.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._handle, name)
 
 
 class TSVWriter:
-    def __init__(self, filepath, exclude_default_phase: bool = True):
+    def __init__(
+        self,
+        filepath,
+        exclude_default_phase: bool = True,
+        compression=None,
+        confidence_intervals: bool = False,
+    ):
         self._exclude_default_phase = exclude_default_phase
-        self._handle = open(filepath, "wt")
+        # Number of GrowthPhase fields written; the last two are confidence intervals
+        self._fields = len(GrowthPhase._fields) - (0 if confidence_intervals else 2)
+        self._handle = open_text(filepath, "wt", compression)
         self._writer = csv.writer(
             self._handle, delimiter="\t", quoting=csv.QUOTE_MINIMAL
         )
 
-        self._writer.writerow(
-            ["name", "phase", "start", "end", "slope", "intercept", "N0", "SNR", "rank"]
-        )
+        header = [
+            "name",
+            "phase",
+            "start",
+            "end",
+            "slope",
+            "intercept",
+            "N0",
+            "SNR",
+            "rank",
+        ]
+        if confidence_intervals:
+            header.extend(("slope_lower", "slope_upper"))
+
+        self._writer.writerow(header)
 
     def write(self, name: str, curve: AnnotatedGrowthCurve):
+        self._writer.writerows(self._rows(name, curve))
+
+    def write_all(self, curves):
+        """
+        Writes an iterable of ``(name, curve)`` pairs using a single bulk write.
+        """
+        self._writer.writerows(
+            row for name, curve in curves for row in self._rows(name, curve)
+        )
+
+    def flush(self):
+        self._handle.flush()
+
+    def _rows(self, name, curve):
         if not self._exclude_default_phase:
             phase = GrowthPhase.pick_best(curve.growth_phases, "rank")
             if phase is None:
-                phase = GrowthPhase(None, None, None, None, None, None, None)
+                phase = _EMPTY_PHASE
 
-            self._write_phase(name, 0, phase)
+            yield (name, 0, *phase[: self._fields])
 
         for idx, phase in enumerate(curve.growth_phases, start=1):
-            self._write_phase(name, idx, phase)
+            yield (name, idx, *phase[: self._fields])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def close(self):
+        self._handle.close()
+
+
+class GroupTSVWriter:
+    """
+    Writes the mean and standard deviation of the growth phases fitted in each
+    replicate of a group, one row per growth phase of the pooled curve.
+    """
+
+    def __init__(self, filepath, compression=None):
+        self._handle = open_text(filepath, "wt", compression)
+        self._writer = csv.writer(
+            self._handle, delimiter="\t", quoting=csv.QUOTE_MINIMAL
+        )
 
-    def _write_phase(self, name, idx, phase):
         self._writer.writerow(
             [
-                name,
-                idx,
-                phase.start,
-                phase.end,
-                phase.slope,
-                phase.intercept,
-                phase.n0,
-                phase.SNR,
-                phase.rank,
+                "group",
+                "phase",
+                "start",
+                "end",
+                "replicates",
+                "slope",
+                "slope_std",
+                "intercept",
+                "intercept_std",
+                "N0",
+                "N0_std",
+                "SNR",
+                "SNR_std",
             ]
         )
 
+    def write(self, name: str, group):
+        for idx, statistics in enumerate(replicate_statistics(group), start=1):
+            self._writer.writerow((name, idx, *statistics))
+
     def __enter__(self):
         return self
 
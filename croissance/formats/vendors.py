@@ -0,0 +1,285 @@
+"""
+Readers for the text exports of plate-reader software, used with `--input-format`.
+
+Readers parse their files line by line and yield ``(name, curve)`` pairs as soon as
+the data of a well is complete, with times converted to hours. Wells in the first
+block of measurements of a file (e.g. absorbance) are named as in the file, while
+wells in any further blocks (e.g. fluorescence) are prefixed with the block label.
+"""
+
+import csv
+import math
+import re
+
+import numpy
+import pandas
+
+from croissance.formats.input import open_input
+
+_CLOCK_TIME = re.compile(r"^(?:(\d+)\.)?(\d+):(\d{1,2}):(\d{1,2}(?:\.\d*)?)$")
+_UNIT_TIME = re.compile(r"(\d+(?:\.\d*)?)\s*(d|h|min|s)\b")
+_UNIT_HOURS = {"d": 24.0, "h": 1.0, "min": 1 / 60.0, "s": 1 / 3600.0}
+
+
+def parse_time(text):
+    """
+    Parses times of the forms "[D.]H:MM:SS[.f]" and "1 h 10 min 5 s" into hours.
+    Returns None if the text is not a time.
+    """
+    text = text.strip()
+    match = _CLOCK_TIME.match(text)
+    if match:
+        days, hours, minutes, seconds = match.groups()
+        return (
+            int(days or 0) * 24
+            + int(hours)
+            + int(minutes) / 60.0
+            + float(seconds) / 3600.0
+        )
+
+    parts = _UNIT_TIME.findall(text)
+    if parts and _UNIT_TIME.sub("", text).strip() == "":
+        return sum(float(value) * _UNIT_HOURS[unit] for value, unit in parts)
+
+    return None
+
+
+def parse_value(text):
+    """
+    Parses a measurement, returning NaN for empty cells and for markers such as
+    "OVRFLW" or "?????" used for readings out of range.
+    """
+    try:
+        value = float(text.replace(",", "."))
+    except ValueError:
+        return math.nan
+
+    return value
+
+
+def is_temperature(label):
+    label = label.strip().lower()
+    # The degree sign may be mangled by the encoding of the file
+    return label.startswith(("t°", "t�", "temp"))
+
+
+class _VendorReader:
+    def __init__(self, filepath, dtype=None):
+        self._filepath = filepath
+        self._dtype = dtype
+        self._names = set()
+
+    def read(self):
+        with open_input(
+            self._filepath, encoding="utf-8-sig", errors="replace", newline=""
+        ) as handle:
+            rows = (
+                [cell.strip() for cell in row]
+                for row in csv.reader(handle, delimiter="\t")
+            )
+
+            for name, times, values in self._parse(rows):
+                yield name, self._curve(times, values)
+
+    def _curve(self, times, values):
+        curve = pandas.Series(
+            index=pandas.Index(times, dtype=float, name="time"),
+            data=numpy.asarray(values, dtype=float),
+        ).dropna()
+        if self._dtype is not None:
+            curve = curve.astype(self._dtype)
+
+        return curve
+
+    def _name(self, label, well):
+        # Wells of the first block keep their names; see module documentation
+        if well in self._names and label:
+            return "{} {}".format(label, well)
+
+        self._names.add(well)
+        return well
+
+    def _parse(self, rows):
+        raise NotImplementedError()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        pass
+
+
+class BioTekReader(_VendorReader):
+    """
+    Gen5 exports with blocks of measurements in which each well is a column:
+
+        OD600:600
+        Time      T° OD600:600  A1     A2     ...
+        0:00:00   37.0          0.089  0.091  ...
+        0:10:00   37.0          0.090  0.092  ...
+
+    Blocks end at an empty line; the label of a block is the last single-cell line
+    preceding it. Temperature columns are skipped.
+    """
+
+    def _parse(self, rows):
+        label = ""
+        for row in rows:
+            cells = _trim(row)
+            if len(cells) == 1:
+                label = cells[0]
+            elif len(cells) > 1 and cells[0].lower() == "time":
+                yield from self._parse_block(label, cells, rows)
+                label = ""
+
+    def _parse_block(self, label, header, rows):
+        columns = [
+            (idx, well)
+            for idx, well in enumerate(header)
+            if idx > 0 and well and not is_temperature(well)
+        ]
+
+        times, values = [], [[] for _ in columns]
+        for row in rows:
+            time = parse_time(row[0]) if row else None
+            if time is None:
+                break
+
+            times.append(time)
+            for column, (idx, _) in zip(values, columns):
+                column.append(parse_value(row[idx]) if idx < len(row) else math.nan)
+
+        for (_, well), column in zip(columns, values):
+            yield self._name(label, well), times, column
+
+
+class TecanReader(_VendorReader):
+    """
+    i-control exports, in which each well is either a row (the default layout) or a
+    column of a block of measurements:
+
+        Cycle Nr.     1      2      ...      Cycle Nr.  Time [s]  Temp. [°C]  A1  ...
+        Time [s]      0      600    ...      1          0         37.0        0.1 ...
+        Temp. [°C]    37.0   37.1   ...      2          600       37.1        0.1 ...
+        A1            0.101  0.102  ...
+        A2            0.098  0.099  ...
+
+    Blocks end at an empty line; the label of a block is given by a preceding line
+    "Label: NAME" (or "Label", "NAME"). Times may be given in seconds, minutes or hours.
+    """
+
+    def _parse(self, rows):
+        label = ""
+        for row in rows:
+            cells = _trim(row)
+            if not cells:
+                continue
+            elif cells[0].lower().startswith("label"):
+                label = cells[0].partition(":")[2].strip() or "".join(cells[1:2])
+            elif cells[0].lower().startswith("cycle nr"):
+                if len(cells) > 1 and cells[1].lower().startswith("time"):
+                    yield from self._parse_columns(label, cells, rows)
+                else:
+                    yield from self._parse_rows(label, rows)
+                label = ""
+
+    def _parse_rows(self, label, rows):
+        times = None
+        for row in rows:
+            cells = _trim(row)
+            if not cells:
+                break
+            elif cells[0].lower().startswith("time"):
+                factor = _time_unit_factor(cells[0])
+                times = [parse_value(cell) * factor for cell in cells[1:]]
+            elif is_temperature(cells[0]) or times is None:
+                continue
+            else:
+                values = [parse_value(cell) for cell in cells[1 : len(times) + 1]]
+                values += [math.nan] * (len(times) - len(values))
+                yield self._name(label, cells[0]), times, values
+
+    def _parse_columns(self, label, header, rows):
+        factor = _time_unit_factor(header[1])
+        columns = [
+            (idx, well)
+            for idx, well in enumerate(header)
+            if idx > 1 and well and not is_temperature(well)
+        ]
+
+        times, values = [], [[] for _ in columns]
+        for row in rows:
+            cells = _trim(row)
+            if len(cells) < 2 or math.isnan(parse_value(cells[1])):
+                break
+
+            times.append(parse_value(cells[1]) * factor)
+            for column, (idx, _) in zip(values, columns):
+                column.append(parse_value(row[idx]) if idx < len(row) else math.nan)
+
+        for (_, well), column in zip(columns, values):
+            yield self._name(label, well), times, column
+
+
+class BMGReader(_VendorReader):
+    """
+    MARS/Omega table exports, in which each well is a row and the row following the
+    header contains the time of each measurement:
+
+        Well  Content    Raw Data (600)  Raw Data (600)  ...
+                         0 h             0 h 10 min      ...
+        A01   Sample X1  0.102           0.105           ...
+
+    Blocks end at an empty line. The label of a block is the header of its first
+    measurement column (e.g. "Raw Data (600)").
+    """
+
+    def _parse(self, rows):
+        for row in rows:
+            cells = _trim(row)
+            if cells and cells[0].lower() == "well":
+                yield from self._parse_block(cells, rows)
+
+    def _parse_block(self, header, rows):
+        times_row = next(rows, [])
+        columns = [
+            (idx, parse_time(times_row[idx]))
+            for idx in range(1, min(len(header), len(times_row)))
+            if not is_temperature(header[idx])
+        ]
+        columns = [(idx, time) for idx, time in columns if time is not None]
+        if not columns:
+            return
+
+        label = header[columns[0][0]]
+        times = [time for _, time in columns]
+        for row in rows:
+            cells = _trim(row)
+            if not cells or not cells[0]:
+                break
+
+            values = [
+                parse_value(row[idx]) if idx < len(row) else math.nan
+                for idx, _ in columns
+            ]
+            yield self._name(label, cells[0]), times, values
+
+
+def _trim(row):
+    """Returns a row without trailing empty cells."""
+    end = len(row)
+    while end and not row[end - 1]:
+        end -= 1
+
+    return row[:end]
+
+
+def _time_unit_factor(label):
+    """Returns the factor converting times with a label such as "Time [s]" to hours."""
+    match = re.search(r"\[\s*(d|h|min|s|ms)\s*\]", label.lower())
+    if match is None or match.group(1) == "s":
+        return 1 / 3600.0
+    elif match.group(1) == "ms":
+        return 1 / 3600e3
+
+    return _UNIT_HOURS[match.group(1)]
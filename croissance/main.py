@@ -2,18 +2,45 @@
 import argparse
 import logging
 import multiprocessing
+import os
 import signal
 import sys
-import traceback
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import ExitStack, contextmanager, nullcontext
 from pathlib import Path
 
 import coloredlogs
 
-from croissance import GrowthEstimationParameters, estimate_growth
+from croissance import GrowthEstimationParameters, estimate_growth, tuning
+from croissance.estimation import jit
+from croissance.estimation.grid import group_by_grid
+from croissance.estimation.replicates import (
+    AnnotatedReplicateGroup,
+    estimate_replicate_growth,
+)
 from croissance.estimation.util import normalize_time_unit
+from croissance.execution import (
+    Checkpoint,
+    ClusterExecutor,
+    ProcessExecutor,
+    ThreadExecutor,
+    WorkUnit,
+    gil_enabled,
+    parse_address,
+    reorder,
+    run_worker,
+)
 from croissance.figures.writer import PDFWriter
-from croissance.formats.input import TSVReader
-from croissance.formats.output import TSVWriter
+from croissance.formats.database import SQLiteWriter, file_hash, parameters_hash
+from croissance.formats.events import EventLog
+from croissance.formats.input import LongTSVReader, TSVReader, read_groups
+from croissance.formats.output import COMPRESSION_SUFFIXES, GroupTSVWriter, TSVWriter
+from croissance.formats.vendors import BioTekReader, BMGReader, TecanReader
+from croissance.profiling import MemoryProfiler, null_profiler
+from croissance.scheduling import CostScheduler, estimate_cost
+from croissance.watching import DirectoryWatcher, WatchState
 
 
 class EstimatorWrapper:
@@ -29,50 +56,179 @@ class EstimatorWrapper:
         )
         self.params.phase_minimum_duration_hours = args.phase_minimum_duration
         self.params.phase_minimum_slope = args.phase_minimum_slope
+        self.params.phase_prune_margin = args.phase_prune_margin
+        self.params.dtype = args.dtype
+        self.params.coarse_points_per_hour = args.coarse_points_per_hour
+        self.params.confidence_level = args.confidence_level
+        self.params.confidence_method = args.confidence_method
+        self.params.bootstrap_samples = args.bootstrap_samples
+
+        self.params.curve_minimum_signal_range = args.curve_minimum_signal_range
+        self.params.curve_minimum_log_ratio = args.curve_minimum_log_ratio
 
         self.input_time_unit = args.input_time_unit
 
     def __call__(self, values):
-        filepath, idx, name, curve = values
+        name, curve = values
+        # Groups of replicates are given as a list of (name, curve) pairs
+        if isinstance(curve, list):
+            replicates = [
+                (replicate, normalize_time_unit(series, self.input_time_unit))
+                for replicate, series in curve
+            ]
 
-        try:
-            normalized_curve = normalize_time_unit(curve, self.input_time_unit)
-            annotated_curve = estimate_growth(
-                normalized_curve,
-                params=self.params,
-                name=name,
-            )
+            return estimate_replicate_growth(replicates, params=self.params, name=name)
 
-            return (filepath, idx, name, annotated_curve)
-        except Exception:
-            log = logging.getLogger("croissance")
-            log.error("Unhandled exception while annotating %r:", name)
-            for line in traceback.format_exc().splitlines():
-                log.error("%s", line)
+        normalized_curve = normalize_time_unit(curve, self.input_time_unit)
+
+        return estimate_growth(normalized_curve, params=self.params, name=name)
+
+
+# Path used for reading from standard input and writing to standard output
+STDIN = Path("-")
+
+INPUT_READERS = {
+    "tsv": TSVReader,
+    "long": LongTSVReader,
+    "biotek": BioTekReader,
+    "tecan": TecanReader,
+    "bmg": BMGReader,
+}
 
 
 def init_worker():
     # Ensure that KeyboardInterrupt exceptions only occur in the main thread
     signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Forked workers inherit tracing by `--profile-memory`, which is only used for
+    # attributing memory in the main process
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
 
 
 def parse_args(argv):
-    parser = argparse.ArgumentParser(
-        description="Estimate growth rates in growth curves",
-        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    parser = create_parser()
+    parser.add_argument(
+        "infiles",
+        type=Path,
+        nargs="+",
+        help="Input files, or '-' to read curves from standard input (optionally "
+        "compressed) and write annotated curves to standard output as they complete",
     )
 
-    parser.add_argument("infiles", type=Path, nargs="+")
+    args = parser.parse_args(argv)
+    check_args(parser, args)
+
+    return args
+
+
+def create_parser(**kwargs):
+    """Returns a parser for the options of `croissance` and `croissance watch`."""
+    kwargs.setdefault("description", "Estimate growth rates in growth curves")
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter, **kwargs
+    )
 
     parser.add_argument(
         "--threads",
         type=int,
         default=1,
-        help="Max number of threads to use during growth estimation",
+        help="Max number of worker processes or threads to use during growth "
+        "estimation",
+    )
+
+    group = parser.add_argument_group("Execution")
+    group.add_argument(
+        "--executor",
+        type=str.lower,
+        default="auto",
+        choices=("auto", "process", "thread", "cluster"),
+        help="Run growth estimation in a pool of local processes, in a pool of "
+        "threads, or by serving work units to `croissance worker` processes on one "
+        "or more nodes. By default threads are used on free-threaded Python builds "
+        "and processes otherwise; use `python -m croissance.benchmark executors` to "
+        "compare the two for your data",
+    )
+    group.add_argument(
+        "--schedule",
+        type=str.lower,
+        default="cost",
+        choices=("cost", "input"),
+        help="Order in which curves are dispatched to workers; either the most "
+        "expensive curves first, with cheap curves batched together, or in input order",
+    )
+    group.add_argument(
+        "--auto",
+        action="store_true",
+        help="Choose the number of workers (up to the number of available CPUs), "
+        "the executor and the sizes of batches by timing a sample of the curves; "
+        "measurements are cached per machine and estimation parameters",
+    )
+    group.add_argument(
+        "--auto-recalibrate",
+        action="store_true",
+        help="Repeat the measurements of `--auto` rather than using cached values",
+    )
+    group.add_argument(
+        "--retries",
+        type=int,
+        default=0,
+        help="Number of times a failed curve is retried before giving up",
+    )
+    group.add_argument(
+        "--cluster-address",
+        type=parse_address,
+        default=("127.0.0.1", 50000),
+        metavar="HOST:PORT",
+        help="Address on which work units are served when using `--executor cluster`; "
+        "use e.g. 0.0.0.0:50000 to accept workers from other nodes, on trusted "
+        "networks only, as work units are exchanged as pickles",
+    )
+    add_authkey_argument(group)
+    group.add_argument(
+        "--cluster-lease-timeout",
+        type=float,
+        default=600.0,
+        metavar="SECONDS",
+        help="Re-queue curves that a worker has not finished within this time",
     )
 
     group = parser.add_argument_group("Input")
-    group.add_argument("--input-format", type=str.lower, choices=("tsv",))
+    group.add_argument(
+        "--input-format",
+        type=str.lower,
+        default="tsv",
+        choices=tuple(INPUT_READERS),
+        help="Format of input files; either tab-separated values with a column per "
+        "curve, long tab-separated values with a row per measurement (see the "
+        "README), or the text export of a BioTek (Gen5), Tecan (i-control) or BMG "
+        "(MARS) plate reader. Times in plate-reader exports are converted to hours "
+        "while reading",
+    )
+    group.add_argument(
+        "--unsorted-input",
+        action="store_true",
+        help="Rows of curves in --input-format long files are not contiguous, i.e. "
+        "files are not sorted by plate and well. Rows are first partitioned by curve "
+        "into temporary files, so that only a fraction of a file is held in memory",
+    )
+    group.add_argument(
+        "--float32",
+        dest="dtype",
+        action="store_const",
+        const="float32",
+        help="Read and process curves in single precision, halving memory use; "
+        "exponential fits are still performed in double precision. See the README "
+        "for the effect on accuracy",
+    )
+    group.add_argument(
+        "--groups",
+        type=Path,
+        metavar="FILE",
+        help="Tab-separated file with the columns 'name' and 'group', assigning curves "
+        "to groups of replicates. Growth phases are found once per group, in the "
+        "median of its curves, and fitted in each replicate; the mean and standard "
+        "deviation per group are written to a separate '.groups.tsv' file",
+    )
     group.add_argument(
         "--input-time-unit",
         default="hours",
@@ -90,11 +246,42 @@ def parse_args(argv):
         "default, an input file `file.tsv` will result in output files named `file. "
         "output.tsv` and `file.output.pdf`",
     )
+    group.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume an interrupted run: files for which output has already been "
+        "written are skipped, as are curves recorded in the `.journal` files that "
+        "are kept next to the output while a file is being processed",
+    )
+    group.add_argument(
+        "--output-compression",
+        type=str.lower,
+        choices=("gzip", "zstd"),
+        help="Compress output TSV files; zstd requires the 'zstandard' package",
+    )
     group.add_argument(
         "--output-exclude-default-phase",
         action="store_true",
         help="Do not output phase '0' for each curve",
     )
+    group.add_argument(
+        "--output-database",
+        type=Path,
+        metavar="FILE",
+        help="Also store annotated curves in this SQLite database, identified by the "
+        "hash of the input file, the curve name and the hash of the estimation "
+        "parameters; curves of repeated runs are updated in place. See the README "
+        "for the tables and example queries",
+    )
+    group.add_argument(
+        "--reorder-window",
+        type=int,
+        default=1024,
+        metavar="N",
+        help="When writing to standard output, hold back up to N annotated curves "
+        "while waiting for earlier curves, to keep curves in input order; once more "
+        "curves are waiting, the earliest of them is written regardless",
+    )
     group.add_argument(
         "--figures",
         action="store_true",
@@ -128,6 +315,21 @@ def parse_args(argv):
         help="Identify curve segments using log(N-N0) rather than N; increases "
         "sensitivity to changes in exponential growth but has to assume a certain N0",
     )
+    group.add_argument(
+        "--curve-minimum-signal-range",
+        type=float,
+        metavar="OD",
+        help="Reject curves without growth phases before smoothing, if the difference "
+        "between the 5th and 95th percentile of their values is below this value",
+    )
+    group.add_argument(
+        "--curve-minimum-log-ratio",
+        type=float,
+        metavar="RATIO",
+        help="Reject curves without growth phases before smoothing, if the log of the "
+        "ratio of the 95th to the 5th percentile of their values (minus N0, if "
+        "constrained) is below this value",
+    )
     group.add_argument(
         "--phase-minimum-signal-to-noise",
         type=float,
@@ -149,6 +351,46 @@ def parse_args(argv):
         default=defaults.phase_minimum_slope,
         help="Minimum phase slope",
     )
+    group.add_argument(
+        "--coarse-points-per-hour",
+        type=float,
+        metavar="N",
+        help="Search curves sampled at more than twice this rate for growth phases "
+        "after averaging measurements over 1/N hours, locate their boundaries and fit "
+        "them using all measurements. Phases may differ from those found at full "
+        "resolution; N should be at least 4",
+    )
+    group.add_argument(
+        "--phase-prune-margin",
+        type=float,
+        metavar="FRACTION",
+        help="Skip fitting candidate phases whose estimated slope or signal-to-noise "
+        "ratio is below this fraction of the minimum, e.g. 0.5",
+    )
+
+    group = parser.add_argument_group("Confidence intervals")
+    group.add_argument(
+        "--confidence-level",
+        type=float,
+        metavar="LEVEL",
+        help="Write confidence intervals for slopes at this level (e.g. 0.95) to the "
+        "columns 'slope_lower' and 'slope_upper'",
+    )
+    group.add_argument(
+        "--confidence-method",
+        type=str.lower,
+        default=defaults.confidence_method,
+        choices=("covariance", "bootstrap"),
+        help="Compute confidence intervals from the covariance matrix of each fit, or "
+        "from residual bootstrap resamples fitted in a single vectorized batch",
+    )
+    group.add_argument(
+        "--bootstrap-samples",
+        type=int,
+        metavar="N",
+        default=defaults.bootstrap_samples,
+        help="Number of resamples used by `--confidence-method bootstrap`",
+    )
 
     group = parser.add_argument_group("Logging")
     group.add_argument(
@@ -158,8 +400,148 @@ def parse_args(argv):
         choices=("DEBUG", "INFO", "WARNING", "ERROR"),
         help="Set verbosity of log messages",
     )
+    group.add_argument(
+        "--log-interval",
+        type=float,
+        default=10.0,
+        metavar="SECONDS",
+        help="Interval between summaries of progress; individual curves are only "
+        "logged with `--log-level DEBUG`",
+    )
+    group.add_argument(
+        "--event-log",
+        type=Path,
+        metavar="FILE",
+        help="Write the status, CPU time, number of growth phases and any failure "
+        "reason of each curve to this file as JSON lines, which can be loaded using "
+        "`pandas.read_json(FILE, lines=True)`",
+    )
+    group.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="Log a report of memory used while reading, annotating and writing "
+        "curves, based on tracemalloc and on sampling the resident set size of this "
+        "process and its worker processes. Slows down the main process",
+    )
+
+    return parser
+
+
+def check_args(parser, args):
+    if args.executor == "auto":
+        args.executor = "process" if gil_enabled() else "thread"
+
+    if args.executor == "cluster" and not args.cluster_authkey:
+        parser.error("--executor cluster requires --cluster-authkey")
+
+    if args.auto and (args.executor == "cluster" or args.schedule == "input"):
+        parser.error(
+            "--auto cannot be used with --executor cluster or --schedule input"
+        )
+
+    if STDIN in args.infiles:
+        if len(args.infiles) > 1:
+            parser.error("standard input ('-') cannot be combined with other files")
+        elif (
+            args.figures
+            or args.groups
+            or args.resume
+            or args.output_database
+            or args.auto
+        ):
+            parser.error(
+                "--figures, --groups, --resume, --output-database and --auto cannot "
+                "be used with standard input"
+            )
+
+    if args.input_format != "tsv" and args.input_time_unit != "hours":
+        parser.error("--input-time-unit only applies to --input-format tsv")
+
+
+def add_authkey_argument(group):
+    group.add_argument(
+        "--cluster-authkey",
+        default=os.environ.get("CROISSANCE_AUTHKEY"),
+        help="Secret shared between the croissance server and its workers; defaults "
+        "to the environment variable CROISSANCE_AUTHKEY",
+    )
+
+
+def parse_worker_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="croissance worker",
+        description="Annotate growth curves served by `croissance --executor cluster`",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+
+    parser.add_argument("address", type=parse_address, metavar="HOST:PORT")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Number of worker processes to start on this node",
+    )
+    add_authkey_argument(parser)
+    parser.add_argument(
+        "--log-level",
+        type=str.upper,
+        default="INFO",
+        choices=("DEBUG", "INFO", "WARNING", "ERROR"),
+        help="Set verbosity of log messages",
+    )
 
-    return parser.parse_args(argv)
+    args = parser.parse_args(argv)
+    if not args.cluster_authkey:
+        parser.error("--cluster-authkey is required")
+
+    return args
+
+
+def create_executor(args):
+    if args.executor == "thread":
+        return ThreadExecutor(workers=args.threads, retries=args.retries)
+    elif args.executor == "cluster":
+        return ClusterExecutor(
+            address=args.cluster_address,
+            authkey=args.cluster_authkey.encode(),
+            local_workers=args.threads,
+            retries=args.retries,
+            lease_timeout=args.cluster_lease_timeout,
+            initializer=init_worker,
+        )
+
+    return ProcessExecutor(
+        workers=args.threads, retries=args.retries, initializer=init_worker
+    )
+
+
+def create_cost(args):
+    """Returns a function estimating the relative cost of annotating a work unit."""
+
+    def _cost(unit):
+        _name, curve = unit.payload
+        if isinstance(curve, list):
+            return sum(
+                estimate_cost(series, args.input_time_unit) for _, series in curve
+            )
+
+        return estimate_cost(curve, args.input_time_unit)
+
+    return _cost
+
+
+def create_scheduler(args, plan=None):
+    if args.schedule == "input":
+        return None
+    elif plan is not None:
+        return CostScheduler(
+            workers=args.threads,
+            cost=create_cost(args),
+            min_batch_cost=plan.min_batch_cost,
+            max_batch_size=plan.max_batch_size,
+        )
+
+    return CostScheduler(workers=args.threads, cost=create_cost(args))
 
 
 def setup_logging(level):
@@ -171,56 +553,746 @@ def setup_logging(level):
     return logging.getLogger("croissance")
 
 
-def main(argv):
-    args = parse_args(argv)
+def log_failure(log, name, error):
+    """
+    Logs the exception raised while annotating a curve as a single line, and its
+    traceback at the debug level (and in the event log, if any).
+    """
+    log.error("Failed to annotate %r: %s", name, error.strip().splitlines()[-1])
+    log.debug("Traceback for %r:\n%s", name, error.rstrip())
+
+
+def worker_main(argv):
+    args = parse_worker_args(argv)
     log = setup_logging(level=args.log_level)
 
+    log.info("Starting %i worker(s) for %s:%i", args.processes, *args.address)
+    workers = [
+        multiprocessing.Process(
+            target=run_worker,
+            args=(args.address, args.cluster_authkey.encode()),
+            kwargs={"initializer": init_worker},
+        )
+        for _ in range(max(1, args.processes))
+    ]
+
+    for worker in workers:
+        worker.start()
+
+    for worker in workers:
+        worker.join()
+
+    log.info("Done ..")
+
+    return 0
+
+
+def parse_watch_args(argv):
+    parser = create_parser(
+        prog="croissance watch",
+        description="Annotate growth curves in files as they are added to a directory",
+    )
+    parser.add_argument("directory", type=Path)
+
+    group = parser.add_argument_group("Watch")
+    group.add_argument(
+        "--pattern",
+        default="*.tsv",
+        help="Glob pattern of the names of input files; output files are ignored",
+    )
+    group.add_argument(
+        "--settle",
+        type=float,
+        default=5.0,
+        metavar="SECONDS",
+        help="Consider files complete once they have not been modified for this long, "
+        "unless inotify has already reported them as closed after writing",
+    )
+    group.add_argument(
+        "--poll-interval",
+        type=float,
+        default=10.0,
+        metavar="SECONDS",
+        help="Interval between scans of the directory; on file systems without "
+        "inotify support this is how new files are noticed",
+    )
+    group.add_argument(
+        "--no-inotify",
+        dest="inotify",
+        action="store_false",
+        help="Only poll the directory for new files",
+    )
+    group.add_argument(
+        "--state",
+        type=Path,
+        metavar="FILE",
+        help="JSON file recording the files already processed, so that they are not "
+        "processed again after a restart; defaults to '.croissance-watch.json' in "
+        "the watched directory",
+    )
+    group.add_argument(
+        "--once",
+        action="store_true",
+        help="Process the complete files currently in the directory and exit",
+    )
+
+    args = parser.parse_args(argv)
+    args.infiles = []
+    check_args(parser, args)
+
+    if args.auto:
+        parser.error("--auto cannot be used with `croissance watch`")
+
+    if not args.directory.is_dir():
+        parser.error("'{}' is not a directory".format(args.directory))
+    elif args.state is None:
+        args.state = args.directory / ".croissance-watch.json"
+
+    return args
+
+
+def watch_main(argv):
+    args = parse_watch_args(argv)
+    log = setup_logging(level=args.log_level)
+    state = WatchState(args.state)
+
+    def _is_output(name):
+        return args.output_suffix + "." in name
+
+    watcher = DirectoryWatcher(
+        args.directory,
+        pattern=args.pattern,
+        settle=args.settle,
+        poll_interval=args.poll_interval,
+        exclude=_is_output,
+        use_inotify=args.inotify,
+    )
+
+    log.info(
+        "Watching '%s' for files matching %r (%s)",
+        args.directory,
+        args.pattern,
+        watcher.backend,
+    )
+
+    return_code = 0
+    # Workers are kept running between files, so are only started once
+    with ExitStack() as stack:
+        stack.enter_context(watcher)
+        journals = stack.enter_context(FileJournals())
+        database = stack.enter_context(open_database(args))
+        events = stack.enter_context(open_event_log(args))
+        executor = stack.enter_context(create_executor(args))
+
+        try:
+            # Files already present are picked up by the initial scan
+            timeout = 0.0
+            while True:
+                for filepath, signature in watcher.poll(timeout):
+                    if state.is_processed(filepath, signature):
+                        continue
+
+                    file_args = argparse.Namespace(**vars(args))
+                    file_args.infiles = [filepath]
+                    try:
+                        file_code = annotate_files(
+                            file_args,
+                            journals,
+                            executor=executor,
+                            database=database,
+                            events=events,
+                        )
+                    except Exception:
+                        log.exception("Failed to process '%s'", filepath)
+                        file_code = 1
+
+                    status = "failed" if file_code else "done"
+                    state.add(filepath, signature, status)
+                    return_code = max(return_code, file_code)
+
+                if args.once:
+                    break
+
+                timeout = None
+        except KeyboardInterrupt:
+            log.info("Stopped watching '%s'", args.directory)
+
+    return return_code
+
+
+class FileJournals:
+    """
+    Journals of annotated curves, one per input file, used to resume interrupted runs.
+    Work unit keys are of the form ``(filepath, idx, name)``.
+    """
+
+    def __init__(self):
+        self._journals = {}
+
+    def open(self, filepath, journal_filepath, header=None):
+        """
+        Opens the journal of an input file; ``header`` identifies the estimation
+        parameters, and journals written with other parameters are discarded.
+        """
+        journal = Checkpoint(journal_filepath, header=header)
+        if journal.discarded:
+            log = logging.getLogger("croissance")
+            log.warning(
+                "Discarded journal '%s', which was written using different estimation "
+                "parameters",
+                journal_filepath,
+            )
+
+        self._journals[filepath] = journal
+
+    def remove(self, filepath, journal_filepath):
+        self._journals.pop(filepath).close()
+        journal_filepath.unlink()
+
+    def add(self, key, value):
+        self._journals[key[0]].add(key[1:], value)
+
+    def __contains__(self, key):
+        return key[1:] in self._journals[key[0]]
+
+    def __getitem__(self, key):
+        return self._journals[key[0]][key[1:]]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def close(self):
+        for journal in self._journals.values():
+            journal.close()
+        self._journals = {}
+
+
+@contextmanager
+def atomic_output(filepath):
+    """
+    Yields a temporary path that is renamed to ``filepath`` on success, so that
+    output files are never left half-written by a crashed run.
+    """
+    temp_filepath = filepath.with_name(".{}.tmp".format(filepath.name))
+    try:
+        yield temp_filepath
+        os.replace(temp_filepath, filepath)
+    finally:
+        if temp_filepath.exists():
+            temp_filepath.unlink()
+
+
+def output_filepaths(args, filepath):
+    filepaths = {
+        "tsv": filepath.with_suffix(
+            args.output_suffix + ".tsv" + COMPRESSION_SUFFIXES[args.output_compression]
+        ),
+        "journal": filepath.with_suffix(args.output_suffix + ".journal"),
+    }
+
+    if args.groups:
+        filepaths["groups"] = filepath.with_suffix(
+            args.output_suffix
+            + ".groups.tsv"
+            + COMPRESSION_SUFFIXES[args.output_compression]
+        )
+
+    if args.figures:
+        filepaths["pdf"] = filepath.with_suffix(args.output_suffix + ".pdf")
+
+    return filepaths
+
+
+def write_outputs(
+    args, filepaths, annotated_curves, annotated_groups=(), profiler=null_profiler
+):
+    log = logging.getLogger("croissance")
+    annotated_curves = sorted(annotated_curves)
+
+    log.info("Writing annotated curves to '%s'", filepaths["tsv"])
+    with ExitStack() as stack:
+        temp_filepath = stack.enter_context(atomic_output(filepaths["tsv"]))
+        outwriter = stack.enter_context(
+            TSVWriter(
+                temp_filepath,
+                args.output_exclude_default_phase,
+                compression=args.output_compression,
+                confidence_intervals=args.confidence_level is not None,
+            )
+        )
+        outwriter.write_all(
+            (name, annotated_curve) for _, name, annotated_curve in annotated_curves
+        )
+
+    if "groups" in filepaths:
+        log.info("Writing replicate statistics to '%s'", filepaths["groups"])
+        with ExitStack() as stack:
+            temp_filepath = stack.enter_context(atomic_output(filepaths["groups"]))
+            outwriter = stack.enter_context(
+                GroupTSVWriter(temp_filepath, compression=args.output_compression)
+            )
+            for _, name, group in sorted(annotated_groups):
+                outwriter.write(name, group)
+
+    if args.figures:
+        log.info("Writing PDFs to '%s'", filepaths["pdf"])
+
+        with ExitStack() as stack:
+            stack.enter_context(profiler.stage("figures"))
+            temp_filepath = stack.enter_context(atomic_output(filepaths["pdf"]))
+            figwriter = stack.enter_context(
+                PDFWriter(temp_filepath, yscale=args.figures_yscale)
+            )
+            for _, name, annotated_curve in annotated_curves:
+                figwriter.write(name, annotated_curve)
+
+
+def is_finished(filepaths):
+    if filepaths["journal"].exists():
+        return False
+
+    return all(
+        filepath.exists() for key, filepath in filepaths.items() if key != "journal"
+    )
+
+
+def open_database(args):
+    if args.output_database is None:
+        return nullcontext()
+
+    return SQLiteWriter(args.output_database, EstimatorWrapper(args).params)
+
+
+def open_event_log(args):
+    if args.event_log is None:
+        return nullcontext()
+
+    return EventLog(args.event_log)
+
+
+class ProgressLog:
+    """
+    Counts annotated curves by status, logging a summary at most every ``interval``
+    seconds; the total number of curves is included if known.
+    """
+
+    def __init__(self, interval, total=None):
+        self.interval = interval
+        self.total = total
+        self.counts = Counter()
+        self._started = self._logged = time.monotonic()
+
+    def add(self, status):
+        self.counts[status] += 1
+
+        now = time.monotonic()
+        if now - self._logged >= self.interval:
+            self._logged = now
+            self.log()
+
+    def log(self):
+        done = sum(self.counts.values())
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        progress = (
+            str(done) if self.total is None else "{} of {}".format(done, self.total)
+        )
+
+        log = logging.getLogger("croissance")
+        log.info(
+            "Annotated %s curves (%i rejected, %i failed) at %.1f curves/s",
+            progress,
+            self.counts["rejected"],
+            self.counts["failed"],
+            done / elapsed,
+        )
+
+
+def create_reader(args, filepath):
+    if args.input_format == "long":
+        return LongTSVReader(
+            filepath, dtype=args.dtype, presorted=not args.unsorted_input
+        )
+
+    return INPUT_READERS[args.input_format](filepath, dtype=args.dtype)
+
+
+def read_work_units(args, filepath, groups, group_indices):
+    """
+    Yields a WorkUnit per curve in a file, as curves are read, followed by a WorkUnit
+    per group of replicates in the file; see ``--groups``.
+    """
+    log = logging.getLogger("croissance")
+
+    replicates = {}
+    with create_reader(args, filepath) as reader:
+        for idx, (name, curve) in enumerate(reader.read()):
+            if curve.empty:
+                log.warning("Skipping empty curve %r", name)
+                continue
+            elif name in groups:
+                replicates.setdefault(groups[name], []).append((idx, name, curve))
+                continue
+
+            yield WorkUnit((filepath, idx, name), (name, curve))
+
+    # Groups are keyed by the index of their first replicate
+    for group, members in replicates.items():
+        key = (filepath, members[0][0], group)
+        group_indices[key] = [idx for idx, _, _ in members]
+        yield WorkUnit(key, (group, [(name, curve) for _, name, curve in members]))
+
+
+def member_curves(units):
+    """Returns the (name, curve) of each curve in work units, including replicates."""
     curves = []
-    for filepath in args.infiles:
-        log.info("Reading curves from '%s", filepath)
-        with TSVReader(filepath) as reader:
-            for idx, (name, curve) in enumerate(reader.read()):
-                if curve.empty:
-                    log.warning("Skipping empty curve %r", name)
-                    continue
+    for unit in units:
+        name, curve = unit.payload
+        if isinstance(curve, list):
+            curves.extend(curve)
+        else:
+            curves.append((name, curve))
+
+    return curves
+
+
+def count_grids(units):
+    """
+    Returns the number of distinct sampling grids among work units. Grid-dependent
+    precomputation is cached by workers, and curves sharing a grid have the same cost
+    and are therefore batched together by the CostScheduler.
+    """
+    return len(group_by_grid(member_curves(units)))
+
+
+def main(argv):
+    if argv and argv[0] == "worker":
+        return worker_main(argv[1:])
+    elif argv and argv[0] == "watch":
+        return watch_main(argv[1:])
+
+    args = parse_args(argv)
+    setup_logging(level=args.log_level)
 
-                curves.append((filepath, idx, name, curve))
-    log.info("Collected a total of %i growth curves", len(curves))
+    profiler = MemoryProfiler() if args.profile_memory else null_profiler
+    if args.infiles == [STDIN]:
+        with open_event_log(args) as events, profiler:
+            return_code = annotate_stream(args, profiler, events)
+    else:
+        with ExitStack() as stack:
+            journals = stack.enter_context(FileJournals())
+            database = stack.enter_context(open_database(args))
+            events = stack.enter_context(open_event_log(args))
+            stack.enter_context(profiler)
+
+            return_code = annotate_files(
+                args, journals, profiler, database=database, events=events
+            )
+
+    profiler.log_report()
+
+    return return_code
 
-    # Dont spawn more processes than tasks
-    args.threads = max(1, min(args.threads, len(curves)))
-    log.info("Annotating growth curves using %i threads", args.threads)
+
+def annotate_stream(args, profiler=null_profiler, events=None):
+    """
+    Annotates curves read from standard input, writing them to standard output as they
+    are annotated, in input order up to ``--reorder-window``. Curves are passed on to
+    workers as they are read, regardless of ``--schedule``. Curves are also written
+    to an EventLog ``events``, if given.
+    """
+    log = logging.getLogger("croissance")
+    log.info("Reading curves from standard input")
+
+    order = {}
+
+    def _read():
+        for seq, unit in enumerate(read_work_units(args, STDIN, {}, {})):
+            order[unit.key] = seq
+            yield unit
 
     return_code = 0
-    annotated_curves = {filepath: [] for filepath in args.infiles}
-    with multiprocessing.Pool(processes=args.threads, initializer=init_worker) as pool:
-        async_calculation = pool.imap_unordered(EstimatorWrapper(args), curves)
+    progress = ProgressLog(args.log_interval)
+    with profiler.stage("annotate"), create_executor(args) as executor:
+        results = executor.map(EstimatorWrapper(args), _read())
+        results = ((order.pop(result.key), result) for result in results)
 
-        for nth, result in enumerate(async_calculation, start=1):
-            if result is None:
-                return_code = 1
+        try:
+            with TSVWriter(
+                STDIN,
+                args.output_exclude_default_phase,
+                compression=args.output_compression,
+                confidence_intervals=args.confidence_level is not None,
+            ) as outwriter:
+                for nth, (_, result) in enumerate(
+                    reorder(results, args.reorder_window), start=1
+                ):
+                    filepath, _idx, name = result.key
+                    if events is not None:
+                        events.write_curve(filepath, name, result)
+
+                    if result.error is not None:
+                        log_failure(log, name, result.error)
+
+                        return_code = 1
+                        progress.add("failed")
+                        continue
+
+                    outwriter.write(name, result.value)
+                    outwriter.flush()
+                    log.debug("Annotated curve %i: %s", nth, name)
+                    progress.add(
+                        "annotated" if result.value.rejected is None else "rejected"
+                    )
+        except BrokenPipeError:
+            # The reader has gone away, e.g. `croissance - | head`; stdout is pointed
+            # at devnull so that flushing it at exit does not fail again
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, sys.stdout.fileno())
+            os.close(devnull)
+            log.info("Standard output was closed; stopping")
+
+            return 1
+
+    progress.log()
+    log.info("Done ..")
+
+    return return_code
+
+
+def tune_execution(args, curves, journals):
+    """
+    Returns a tuning.ExecutionPlan for annotating the given work units, excluding
+    those already annotated in a previous run.
+    """
+    estimator = EstimatorWrapper(args)
+    cache = tuning.TuningCache(tuning.default_cache_filepath())
+
+    return tuning.tune(
+        estimator,
+        [unit for unit in curves if unit.key not in journals],
+        create_cost(args),
+        parameters_hash(estimator.params),
+        executor=args.executor,
+        cache=cache,
+        recalibrate=args.auto_recalibrate,
+        initializer=init_worker,
+    )
+
+
+def annotate_files(
+    args, journals, profiler=null_profiler, executor=None, database=None, events=None
+):
+    """
+    Annotates the curves in ``args.infiles``, writing outputs next to each file and,
+    if given, to an SQLiteWriter ``database`` and an EventLog ``events``. An existing
+    ``executor`` may be passed, which is then left open.
+    """
+    log = logging.getLogger("croissance")
+    groups = read_groups(args.groups) if args.groups else {}
+
+    filepaths = {}
+    remaining = {}
+    reading = set()
+    group_indices = {}
+    return_code = 0
+    rejected = fitted = pruned = 0
+    failed = set()
+    annotated_curves = {}
+    annotated_groups = {}
+    file_hashes = {}
+
+    def _file_hash(filepath):
+        if filepath not in file_hashes:
+            file_hashes[filepath] = file_hash(filepath)
+
+        return file_hashes[filepath]
+
+    def _finish_file(filepath):
+        curves = annotated_curves.pop(filepath)
+        with profiler.stage("write"):
+            write_outputs(
+                args,
+                filepaths[filepath],
+                curves,
+                annotated_groups.pop(filepath),
+                profiler=profiler,
+            )
+
+            if database is not None:
+                log.info("Storing annotated curves in '%s'", args.output_database)
+                for _, name, curve in curves:
+                    database.write(_file_hash(filepath), filepath, name, curve)
+                database.commit()
+
+        if events is not None:
+            events.write(
+                "file",
+                file=str(filepath),
+                curves=len(curves),
+                failed=filepath in failed,
+            )
+
+        # Journals of files with failed curves are kept so that --resume retries them
+        if filepath not in failed:
+            journals.remove(filepath, filepaths[filepath]["journal"])
+
+    # Results of runs with other parameters must not be resumed
+    estimator = EstimatorWrapper(args)
+    journal_header = (parameters_hash(estimator.params), estimator.input_time_unit)
+
+    def _read_files():
+        for filepath in args.infiles:
+            filepaths[filepath] = output_filepaths(args, filepath)
+            if args.resume and is_finished(filepaths[filepath]):
+                log.info("Skipping '%s'; output from previous run found", filepath)
                 continue
+            elif not args.resume and filepaths[filepath]["journal"].exists():
+                filepaths[filepath]["journal"].unlink()
+
+            journals.open(filepath, filepaths[filepath]["journal"], journal_header)
 
-            filepath, idx, name, curve = result
-            log.info("Annotated curve %i of %i: %s", nth, len(curves), name)
+            log.info("Reading curves from '%s", filepath)
+            remaining[filepath] = 0
+            annotated_curves[filepath] = []
+            annotated_groups[filepath] = []
 
-            annotated_curves[filepath].append((idx, name, curve))
+            reading.add(filepath)
+            for unit in read_work_units(args, filepath, groups, group_indices):
+                remaining[filepath] += 1
+                yield unit
+            reading.discard(filepath)
 
-    for filepath in args.infiles:
-        output_filepath = filepath.with_suffix(args.output_suffix + ".tsv")
-        log.info("Writing annotated curves to '%s'", output_filepath)
+            if not remaining[filepath]:
+                _finish_file(filepath)
 
-        with TSVWriter(output_filepath, args.output_exclude_default_phase) as outwriter:
-            for _, name, annotated_curve in sorted(annotated_curves[filepath]):
-                outwriter.write(name, annotated_curve)
+    plan = None
+    curves = _read_files()
+    if args.schedule == "cost":
+        # Scheduling by cost requires all curves up front
+        with profiler.stage("read"):
+            curves = list(curves)
+        # Replicate groups are annotated as a single work unit
+        log.info(
+            "Collected a total of %i growth curves in %i work unit(s), sampled on %i "
+            "distinct time grids",
+            len(member_curves(curves)),
+            len(curves),
+            count_grids(curves),
+        )
 
-        if args.figures:
-            figure_filepath = filepath.with_suffix(args.output_suffix + ".pdf")
-            log.info("Writing PDFs to '%s'", figure_filepath)
+        if args.auto:
+            plan = tune_execution(args, curves, journals)
+            args.threads = plan.workers
+            args.executor = plan.executor
+            log.info("Execution plan: %s", tuning.describe(plan))
 
-            with PDFWriter(figure_filepath, yscale=args.figures_yscale) as figwriter:
-                for _, name, annotated_curve in sorted(annotated_curves[filepath]):
-                    figwriter.write(name, annotated_curve)
+        # Dont spawn more processes than tasks
+        args.threads = max(1, min(args.threads, len(curves)))
+    else:
+        log.info("Streaming growth curves to workers in input order")
+
+    log.info("Using the %s backend for compiled kernels", jit.BACKEND)
+    log.info(
+        "Annotating growth curves using %i %s workers", args.threads, args.executor
+    )
+
+    if executor is None:
+        executor = create_executor(args)
+    else:
+        executor = nullcontext(executor)
+
+    progress = ProgressLog(
+        args.log_interval, total=len(curves) if isinstance(curves, list) else None
+    )
+    with profiler.stage("annotate"), executor as executor:
+        results = executor.map(
+            EstimatorWrapper(args),
+            curves,
+            checkpoint=journals,
+            schedule=create_scheduler(args, plan),
+        )
+
+        for nth, result in enumerate(results, start=1):
+            filepath, idx, name = result.key
+            if events is not None:
+                events.write_curve(filepath, name, result)
+
+            if result.error is not None:
+                log_failure(log, name, result.error)
+
+                return_code = 1
+                failed.add(filepath)
+                progress.add("failed")
+                if database is not None:
+                    database.write_failed(
+                        _file_hash(filepath), filepath, name, result.error
+                    )
+            else:
+                value = result.value
+                if isinstance(value, AnnotatedReplicateGroup):
+                    annotated_groups[filepath].append((idx, name, value))
+                    for replicate_idx, (replicate, curve) in zip(
+                        group_indices[result.key], value.replicates
+                    ):
+                        annotated_curves[filepath].append(
+                            (replicate_idx, replicate, curve)
+                        )
+
+                    value = value.pooled
+                else:
+                    annotated_curves[filepath].append((idx, name, value))
+
+                if value.rejected is not None:
+                    rejected += 1
+                    progress.add("rejected")
+                    log.debug("Rejected curve %i: %s (%s)", nth, name, value.rejected)
+                else:
+                    progress.add("annotated")
+                    log.debug("Annotated curve %i: %s", nth, name)
+
+                fitted += value.fitted
+                pruned += value.pruned
+
+            remaining[filepath] -= 1
+            if not remaining[filepath] and filepath not in reading:
+                _finish_file(filepath)
+
+        progress.log()
+        if rejected:
+            log.info("Rejected %i curves without growth in the pre-screen", rejected)
+
+        if pruned:
+            log.info(
+                "Avoided %i of %i exponential fits of candidate growth phases",
+                pruned,
+                fitted + pruned,
+            )
+
+        stats = executor.stats
+        if stats.batches:
+            log.info(
+                "Annotated %i curves in %i batches in %.1fs, with an average of %.1f "
+                "busy workers (%.0f%% utilisation)",
+                stats.units,
+                stats.batches,
+                stats.wall_seconds,
+                stats.busy_workers,
+                stats.utilisation * 100,
+            )
+
+        if events is not None:
+            events.write(
+                "summary",
+                curves=stats.units,
+                batches=stats.batches,
+                wall_seconds=stats.wall_seconds,
+                busy_seconds=stats.busy_seconds,
+                workers=stats.workers,
+            )
+            events.flush()
 
     log.info("Done ..")
 
@@ -0,0 +1,245 @@
+"""
+Memory profiling of command-line runs, enabled using `croissance --profile-memory`.
+"""
+
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+MiB = 2**20
+
+
+class StageStatistics:
+    __slots__ = [
+        "allocated",
+        "calls",
+        "depth",
+        "peak_rss",
+        "peak_traced",
+        "peak_workers_rss",
+        "seconds",
+        "top_allocations",
+    ]
+
+    def __init__(self, depth=0):
+        # Nesting depth of the stage when first entered
+        self.depth = depth
+        self.calls = 0
+        self.seconds = 0.0
+        self.allocated = 0
+        self.peak_traced = 0
+        self.peak_rss = 0
+        self.peak_workers_rss = 0
+        self.top_allocations = {}
+
+
+class MemoryProfiler:
+    """
+    Attributes memory use to named stages of a run. Allocations made by the current
+    process are traced using `tracemalloc`, while a background thread samples the
+    resident set size (RSS) of the process and of its child processes (i.e. workers).
+    Sampling of child processes requires Linux; elsewhere only the peak RSS of the
+    current process is reported.
+    """
+
+    def __init__(self, interval=0.1, top=3, frames=1):
+        self.interval = interval
+        self.top = top
+        self.frames = frames
+        self.stages = {}
+
+        self._stack = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._sampler = None
+
+    def __enter__(self):
+        tracemalloc.start(self.frames)
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def close(self):
+        if self._sampler is not None:
+            self._stopped.set()
+            self._sampler.join()
+            self._sampler = None
+            tracemalloc.stop()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Records memory allocated (and not freed) during a stage, the peak of traced
+        memory, and the peak RSS sampled while the stage was the innermost stage.
+        Stages may be nested and repeated; statistics of repeated stages are combined,
+        and those of a stage include those of stages nested within it.
+        """
+        snapshot = _snapshot()
+        with self._lock:
+            if name not in self.stages:
+                self.stages[name] = StageStatistics(depth=len(self._stack))
+            stats = self.stages[name]
+
+            # The peak so far belongs to the enclosing stage, and is reset below
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                parent = self._stack[-1]
+                parent["peak"] = max(parent["peak"], peak)
+
+            frame = {"stats": stats, "peak": 0}
+            self._stack.append(frame)
+            tracemalloc.reset_peak()
+
+        started = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            elapsed = time.perf_counter() - started
+            after, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, frame["peak"])
+            differences = _snapshot().compare_to(snapshot, "lineno")
+            # Short stages may otherwise not be sampled at all
+            self._record_rss()
+
+            with self._lock:
+                self._stack.pop()
+                if self._stack:
+                    parent = self._stack[-1]
+                    parent["peak"] = max(parent["peak"], peak)
+
+                stats.calls += 1
+                stats.seconds += elapsed
+                stats.allocated += after - current
+                stats.peak_traced = max(stats.peak_traced, peak)
+                for difference in differences[: self.top]:
+                    if difference.size_diff > 0:
+                        location = str(difference.traceback)
+                        stats.top_allocations[location] = (
+                            stats.top_allocations.get(location, 0)
+                            + difference.size_diff
+                        )
+
+    def report(self):
+        """Returns the lines of a human readable report."""
+        lines = [
+            "{:<12}{:>7}{:>10}{:>16}{:>13}{:>10}{:>13}".format(
+                "stage",
+                "calls",
+                "seconds",
+                "allocated MiB",
+                "traced MiB",
+                "RSS MiB",
+                "workers MiB",
+            )
+        ]
+
+        for name, stats in self.stages.items():
+            lines.append(
+                "{:<12}{:>7}{:>10.2f}{:>16.2f}{:>13.2f}{:>10.1f}{:>13.1f}".format(
+                    "  " * stats.depth + name,
+                    stats.calls,
+                    stats.seconds,
+                    stats.allocated / MiB,
+                    stats.peak_traced / MiB,
+                    stats.peak_rss / MiB,
+                    stats.peak_workers_rss / MiB,
+                )
+            )
+
+        lines.append("Peak RSS of this process: {:.1f} MiB".format(peak_rss() / MiB))
+        for name, stats in self.stages.items():
+            top = sorted(stats.top_allocations.items(), key=lambda item: -item[1])
+            for location, size in top[: self.top]:
+                lines.append(
+                    "Largest allocations during {}: {:.2f} MiB at {}".format(
+                        name, size / MiB, location
+                    )
+                )
+
+        return lines
+
+    def log_report(self, log=None):
+        log = log or logging.getLogger("croissance")
+        log.info("Memory profile:")
+        for line in self.report():
+            log.info("  %s", line)
+
+    def _sample(self):
+        while not self._stopped.wait(self.interval):
+            self._record_rss()
+
+    def _record_rss(self):
+        pid = os.getpid()
+        rss = process_rss(pid)
+        workers = sum(process_rss(child) for child in child_processes(pid))
+
+        with self._lock:
+            if self._stack:
+                stats = self._stack[-1]["stats"]
+                stats.peak_rss = max(stats.peak_rss, rss)
+                stats.peak_workers_rss = max(stats.peak_workers_rss, workers)
+
+
+def _snapshot():
+    # Excludes allocations made by tracemalloc itself, i.e. of previous snapshots
+    return tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, tracemalloc.__file__)]
+    )
+
+
+def peak_rss():
+    """Returns the peak RSS of the current process, in bytes."""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in KiB elsewhere
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def process_rss(pid):
+    """Returns the current RSS of a process in bytes, or 0 if unavailable."""
+    try:
+        with open("/proc/{}/statm".format(pid)) as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def child_processes(pid):
+    """Returns the PIDs of the child processes of a process, if available."""
+    children = []
+    try:
+        for task in os.listdir("/proc/{}/task".format(pid)):
+            with open("/proc/{}/task/{}/children".format(pid, task)) as handle:
+                children.extend(int(child) for child in handle.read().split())
+    except (OSError, ValueError):
+        pass
+
+    return children
+
+
+class NullProfiler:
+    """Stand-in for MemoryProfiler when profiling is disabled."""
+
+    @contextmanager
+    def stage(self, name):
+        yield None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        pass
+
+    def log_report(self, log=None):
+        pass
+
+
+null_profiler = NullProfiler()
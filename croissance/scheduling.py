@@ -0,0 +1,77 @@
+"""
+Scheduling of growth curves on workers, ordered and batched by their estimated cost.
+"""
+
+# Approximate cost in seconds of ``estimate_growth`` per hour and per data-point of a
+# curve. The per-hour cost of segmenting the curve by standard deviation dominates,
+# while the per-point costs of smoothing, derivatives and fitting are comparatively
+# small even for densely sampled curves.
+COST_PER_HOUR = 5e-3
+COST_PER_POINT = 1e-5
+
+
+def estimate_cost(curve, unit: str = "hours"):
+    """
+    Estimates the relative cost of annotating a curve from its length and duration.
+    """
+    if len(curve) < 2:
+        return COST_PER_POINT * len(curve)
+
+    duration = curve.index[-1] - curve.index[0]
+    if unit == "minutes":
+        duration /= 60.0
+
+    return COST_PER_HOUR * max(0.0, duration) + COST_PER_POINT * len(curve)
+
+
+class CostScheduler:
+    """
+    Dispatches the most expensive work units first, so that no long-running units are
+    left once most workers have run out of work, and combines cheap units into batches
+    to reduce the per-task overhead of dispatching them.
+
+    Batches are sized by guided self-scheduling: each batch holds about
+    ``1 / (workers * batches_per_worker)`` of the remaining cost, but no less than
+    ``min_batch_cost``, which causes batches to shrink towards the end of a run.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        cost,
+        batches_per_worker: int = 4,
+        min_batch_cost: float = 0.05,
+        max_batch_size: int = 256,
+    ):
+        self.workers = max(1, workers)
+        self.batches_per_worker = batches_per_worker
+        self.min_batch_cost = min_batch_cost
+        self.max_batch_size = max_batch_size
+        self._cost = cost
+
+    def __call__(self, tasks):
+        costs = [self._cost(unit) for _, unit in tasks]
+        order = sorted(range(len(tasks)), key=costs.__getitem__, reverse=True)
+        remaining = sum(costs)
+
+        batches, batch, batch_cost = [], [], 0.0
+        target = self._target(remaining)
+        for idx in order:
+            batch.append(tasks[idx])
+            batch_cost += costs[idx]
+
+            if batch_cost >= target or len(batch) >= self.max_batch_size:
+                batches.append(batch)
+                remaining -= batch_cost
+                batch, batch_cost = [], 0.0
+                target = self._target(remaining)
+
+        if batch:
+            batches.append(batch)
+
+        return batches
+
+    def _target(self, remaining):
+        share = remaining / (self.workers * self.batches_per_worker)
+
+        return max(self.min_batch_cost, share)
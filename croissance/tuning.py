@@ -0,0 +1,258 @@
+"""
+Automatic choice of the number of workers, batch sizes and executor for a run, used
+by `croissance --auto`. Choices are based on the measured time of annotating a sample
+of the curves, and on the measured overheads of starting workers and dispatching
+tasks to them on this machine, which are cached between runs.
+"""
+
+import json
+import logging
+import os
+import platform
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from croissance.execution import ProcessExecutor, WorkUnit
+
+# Workers are only added while they are predicted to reduce the run time by this
+# fraction, as each worker also adds memory use
+MINIMUM_GAIN = 0.05
+
+# Batches are sized to take at least this multiple of the overhead of dispatching a
+# task, and no less than MINIMUM_BATCH_SECONDS
+BATCH_OVERHEAD_RATIO = 50
+MINIMUM_BATCH_SECONDS = 0.02
+
+# Incremented when measurements change, so that older cached values are not used
+CACHE_VERSION = 2
+
+# Sampling stops after this many seconds, even if fewer curves have been timed
+SAMPLE_SECONDS = 2.0
+
+ExecutionPlan = namedtuple(
+    "ExecutionPlan",
+    (
+        "executor",
+        "workers",
+        "min_batch_cost",
+        "max_batch_size",
+        "seconds_per_cost",
+        "predicted_seconds",
+    ),
+)
+
+Overheads = namedtuple("Overheads", ("startup_seconds", "dispatch_seconds"))
+
+
+def available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def default_cache_filepath():
+    cache = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+
+    return Path(cache) / "croissance" / "tuning.json"
+
+
+def machine_key():
+    """Identifies this machine and Python installation in the tuning cache."""
+    return "v{} {} {} {} cpus python {}".format(
+        CACHE_VERSION,
+        platform.node(),
+        platform.machine(),
+        available_cpus(),
+        platform.python_version(),
+    )
+
+
+def _noop(payload):
+    return payload
+
+
+def measure_overheads(initializer=None, tasks=20):
+    """
+    Measures the time taken to start a worker process and to run a task in it, and
+    the overhead of dispatching each further task.
+    """
+    units = [WorkUnit(idx, idx) for idx in range(tasks + 1)]
+    with ProcessExecutor(workers=1, initializer=initializer) as executor:
+        started = time.perf_counter()
+        results = executor.map(_noop, units[:1])
+        next(results)
+        startup = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for _ in executor.map(_noop, units[1:]):
+            pass
+        dispatch = (time.perf_counter() - started) / tasks
+
+    return Overheads(startup, dispatch)
+
+
+def measure_seconds_per_cost(fn, units, cost, samples=8):
+    """
+    Runs ``fn`` on a sample of work units spread over the range of their estimated
+    costs, and returns the measured seconds per unit of estimated cost. The cheapest
+    unit is first run untimed, so that one-off costs such as compiling or loading
+    kernels are not attributed to the curves.
+    """
+    ordered = sorted(units, key=cost)
+    if ordered:
+        fn(ordered[0].payload)
+
+    count = min(samples, len(ordered))
+    sample = [
+        ordered[(2 * idx + 1) * len(ordered) // (2 * count)] for idx in range(count)
+    ]
+
+    seconds = total_cost = 0.0
+    for unit in sample:
+        started = time.perf_counter()
+        fn(unit.payload)
+        seconds += time.perf_counter() - started
+        total_cost += cost(unit)
+
+        if seconds >= SAMPLE_SECONDS:
+            break
+
+    return seconds / max(total_cost, 1e-9)
+
+
+def plan_execution(costs, seconds_per_cost, overheads, max_workers, executor="process"):
+    """
+    Returns the ExecutionPlan with the fewest workers (up to ``max_workers``) whose
+    predicted run time is within MINIMUM_GAIN of adding further workers. Runs with a
+    single worker use the thread executor, avoiding the start of a worker process.
+    """
+    total = sum(costs) * seconds_per_cost
+    longest = max(costs, default=0.0) * seconds_per_cost
+    max_workers = max(1, min(max_workers, len(costs)))
+
+    def _predict(workers):
+        if workers == 1:
+            return total
+
+        # Workers are started one after the other, and no run takes less time than
+        # its longest curve
+        return workers * overheads.startup_seconds + max(total / workers, longest)
+
+    workers = 1
+    while workers < max_workers:
+        if _predict(workers + 1) > (1 - MINIMUM_GAIN) * _predict(workers):
+            break
+        workers += 1
+
+    batch_seconds = max(
+        MINIMUM_BATCH_SECONDS, BATCH_OVERHEAD_RATIO * overheads.dispatch_seconds
+    )
+    median = sorted(costs)[len(costs) // 2] * seconds_per_cost if costs else 0.0
+
+    return ExecutionPlan(
+        executor=executor if workers > 1 else "thread",
+        workers=workers,
+        min_batch_cost=batch_seconds / max(seconds_per_cost, 1e-12),
+        # Curves that each take longer than a batch are dispatched one at a time
+        max_batch_size=1 if median >= batch_seconds else 256,
+        seconds_per_cost=seconds_per_cost,
+        predicted_seconds=_predict(workers),
+    )
+
+
+class TuningCache:
+    """
+    Measurements from previous runs, stored as JSON and keyed by machine (see
+    `machine_key`) and by a hash of the estimation parameters.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = Path(filepath)
+        self._data = {}
+        try:
+            with self.filepath.open("rt") as handle:
+                self._data = json.load(handle)
+        except (OSError, ValueError):
+            pass
+
+    def _machine(self):
+        return self._data.setdefault(machine_key(), {})
+
+    def overheads(self):
+        values = self._machine().get("overheads")
+
+        return None if values is None else Overheads(*values)
+
+    def seconds_per_cost(self, params_hash):
+        return self._machine().get("seconds_per_cost", {}).get(params_hash)
+
+    def update(self, overheads, params_hash, seconds_per_cost):
+        machine = self._machine()
+        machine["overheads"] = list(overheads)
+        machine.setdefault("seconds_per_cost", {})[params_hash] = seconds_per_cost
+
+        try:
+            self.filepath.parent.mkdir(parents=True, exist_ok=True)
+            temp_filepath = self.filepath.with_name(
+                ".{}.tmp".format(self.filepath.name)
+            )
+            with temp_filepath.open("wt") as handle:
+                json.dump(self._data, handle, indent=1, sort_keys=True)
+            os.replace(temp_filepath, self.filepath)
+        except OSError as error:
+            log = logging.getLogger("croissance")
+            log.warning("Could not update tuning cache '%s': %s", self.filepath, error)
+
+
+def tune(
+    fn,
+    units,
+    cost,
+    params_hash,
+    *,
+    max_workers=None,
+    executor="process",
+    cache=None,
+    recalibrate=False,
+    initializer=None,
+):
+    """
+    Returns an ExecutionPlan for running ``fn`` on a list of work units, using the
+    estimated ``cost`` of each unit. Measurements are taken from and stored in an
+    optional TuningCache.
+    """
+    overheads = None if cache is None or recalibrate else cache.overheads()
+    seconds_per_cost = (
+        None if cache is None or recalibrate else cache.seconds_per_cost(params_hash)
+    )
+
+    if overheads is None:
+        overheads = measure_overheads(initializer=initializer)
+    if seconds_per_cost is None and units:
+        seconds_per_cost = measure_seconds_per_cost(fn, units, cost)
+        if cache is not None:
+            cache.update(overheads, params_hash, seconds_per_cost)
+
+    return plan_execution(
+        [cost(unit) for unit in units],
+        seconds_per_cost or 0.0,
+        overheads,
+        max_workers or available_cpus(),
+        executor=executor,
+    )
+
+
+def describe(plan):
+    """Returns a human readable description of an ExecutionPlan."""
+    return (
+        "{} {} worker(s), batches of at least {:.2f}s and at most {} curve(s); "
+        "predicted {:.1f}s".format(
+            plan.workers,
+            plan.executor,
+            plan.min_batch_cost * plan.seconds_per_cost,
+            plan.max_batch_size,
+            plan.predicted_seconds,
+        )
+    )
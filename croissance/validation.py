@@ -0,0 +1,531 @@
+"""
+Validation of alternative (e.g. optimized) implementations of growth estimation
+against a reference, by comparing the growth phases both find in a corpus of curves.
+Run using e.g.
+
+    python -m croissance.validation --synthetic 100000 --workers 8 \\
+        --candidate-patch croissance.estimation.remove_outliers=fast:remove_outliers
+
+Implementations are given as patches, which replace the object at a dotted path (as
+seen by the code calling it) with an object ``module:attribute``, and as overrides of
+GrowthEstimationParameters. By default both the reference and the candidate are the
+unmodified estimation. The exit status is 1 if any difference exceeds its tolerance.
+"""
+
+import argparse
+import ast
+import importlib
+import math
+import signal
+import sys
+import threading
+import time
+from collections import namedtuple
+from contextlib import ExitStack
+from unittest import mock
+
+import numpy
+
+from croissance.benchmark import synthetic_curve
+from croissance.estimation import (
+    GrowthEstimationParameters,
+    GrowthPhase,
+    estimate_growth,
+)
+from croissance.estimation.grid import sampling_grid
+from croissance.execution import ProcessExecutor, WorkUnit
+from croissance.formats.input import TSVReader
+
+METRICS = ("start", "end", "slope", "n0", "SNR", "rank")
+
+# Default CPU seconds allowed per curve and implementation; a few synthetic curves
+# take far longer than others, as fits of their phases need many iterations
+DEFAULT_TIME_BUDGET = 5.0
+
+# Default relative tolerances, i.e. differences allowed in proportion to the
+# reference value; see `is_close`
+DEFAULT_RTOL = 1e-9
+DEFAULT_ATOL = 1e-12
+
+# `patches` is a tuple of ``(target, "module:attribute")`` pairs and `params` a tuple
+# of ``(name, value)`` pairs of GrowthEstimationParameters
+Implementation = namedtuple("Implementation", ("patches", "params"), defaults=((), ()))
+
+# Differences between the results of the reference and the candidate for one curve;
+# `differences` maps metrics to the largest absolute and relative difference of any
+# compared phase, and `exceeded` lists metrics for which a tolerance was exceeded
+# `timed_out` is set for curves exceeding the time budget in either implementation,
+# which are not compared
+CurveComparison = namedtuple(
+    "CurveComparison",
+    (
+        "name",
+        "status_mismatch",
+        "count_mismatch",
+        "differences",
+        "exceeded",
+        "timed_out",
+    ),
+    defaults=(False,),
+)
+
+
+def resolve(reference):
+    """Returns the object referenced by a string ``module:attribute``."""
+    module, _, attribute = reference.partition(":")
+    obj = importlib.import_module(module)
+    for part in filter(None, attribute.split(".")):
+        obj = getattr(obj, part)
+
+    return obj
+
+
+def is_close(reference, candidate, rtol, atol=DEFAULT_ATOL):
+    if reference is None or candidate is None:
+        return reference is candidate
+    elif math.isnan(reference) or math.isnan(candidate):
+        return math.isnan(reference) and math.isnan(candidate)
+
+    return abs(candidate - reference) <= atol + rtol * abs(reference)
+
+
+def compare_phases(reference, candidate):
+    """
+    Returns the pairs of phases to compare, and whether the number of phases differs.
+    Phases are compared in order if both found the same number of phases, and otherwise
+    only the best ranked phase of each is compared.
+    """
+    if len(reference) == len(candidate):
+        return list(zip(reference, candidate)), False
+
+    best_reference = GrowthPhase.pick_best(reference, "rank")
+    best_candidate = GrowthPhase.pick_best(candidate, "rank")
+    if best_reference is None or best_candidate is None:
+        return [], True
+
+    return [(best_reference, best_candidate)], True
+
+
+def compare_curves(name, reference, candidate, tolerances):
+    """
+    Compares two AnnotatedGrowthCurves of the same curve, using ``tolerances``, a dict
+    of relative tolerances per metric. Curves for which estimation failed are given
+    as the error message instead, and only compared by status, and curves that
+    exceeded the time budget as None.
+    """
+    if reference is None or candidate is None:
+        return CurveComparison(name, False, False, {}, [], timed_out=True)
+    elif isinstance(reference, str) or isinstance(candidate, str):
+        mismatch = not (isinstance(reference, str) and isinstance(candidate, str))
+        return CurveComparison(name, mismatch, False, {}, [])
+
+    status_mismatch = reference.rejected != candidate.rejected
+    pairs, count_mismatch = compare_phases(
+        reference.growth_phases, candidate.growth_phases
+    )
+
+    differences, exceeded = {}, set()
+    for reference_phase, candidate_phase in pairs:
+        for metric in METRICS:
+            a = getattr(reference_phase, metric)
+            b = getattr(candidate_phase, metric)
+            if not is_close(a, b, tolerances[metric]):
+                exceeded.add(metric)
+
+            if a is None or b is None:
+                continue
+
+            difference = abs(b - a)
+            relative = difference / abs(a) if a else (0.0 if b == a else math.inf)
+            previous = differences.get(metric, (0.0, 0.0))
+            differences[metric] = (
+                max(previous[0], difference),
+                max(previous[1], relative),
+            )
+
+    return CurveComparison(
+        name, status_mismatch, count_mismatch, differences, sorted(exceeded)
+    )
+
+
+def run_implementation(implementation, curves, time_budget=None):
+    """
+    Runs ``estimate_growth`` on a list of ``(name, curve)`` pairs with the patches
+    and parameters of an implementation; returns the results and elapsed seconds.
+    Estimation of a curve is abandoned after ``time_budget`` CPU seconds, if given,
+    in which case its result is None.
+    """
+    params = GrowthEstimationParameters()
+    for name, value in implementation.params:
+        setattr(params, name, value)
+
+    with ExitStack() as stack:
+        for target, replacement in implementation.patches:
+            stack.enter_context(mock.patch(target, resolve(replacement)))
+
+        # Grid-dependent precomputation may differ between implementations
+        sampling_grid.clear()
+        started = time.perf_counter()
+        results = [
+            _estimate(curve, params, name, time_budget) for name, curve in curves
+        ]
+        elapsed = time.perf_counter() - started
+
+    sampling_grid.clear()
+
+    return results, elapsed
+
+
+class _BudgetExceeded(BaseException):
+    # Not derived from Exception, so that it is not caught by estimation code
+    pass
+
+
+def _estimate(curve, params, name, time_budget=None):
+    # Budgets rely on signals, which are only delivered to the main thread
+    if time_budget is None or threading.current_thread() is not threading.main_thread():
+        return _estimate_unbounded(curve, params, name)
+
+    exceeded = []
+
+    def _exceed_budget(signum, frame):
+        exceeded.append(True)
+        raise _BudgetExceeded()
+
+    previous = signal.signal(signal.SIGPROF, _exceed_budget)
+    try:
+        # The timer fires once, so the budget may only be exceeded before it has been
+        # disarmed, which is also caught
+        try:
+            signal.setitimer(signal.ITIMER_PROF, time_budget)
+            result = _estimate_unbounded(curve, params, name)
+        finally:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+    except _BudgetExceeded:
+        return None
+    finally:
+        signal.signal(signal.SIGPROF, previous or signal.SIG_IGN)
+
+    # Exceptions raised by the handler are lost if it runs in a finalizer or callback
+    return None if exceeded else result
+
+
+def _estimate_unbounded(curve, params, name):
+    try:
+        return estimate_growth(curve, params=params, name=name)
+    except Exception as error:  # noqa: BLE001 compared as the result of the curve
+        return "{}: {}".format(type(error).__name__, error)
+
+
+def synthetic_corpus(start, stop, seed=0, step=1):
+    """
+    Returns the synthetic curves with indexes ``start`` to ``stop`` (every ``step``th
+    curve) of a corpus with randomly varied duration, sampling rate, growth rate,
+    background and noise, in which one in ten curves does not grow.
+    """
+    curves = []
+    for idx in range(start, stop, step):
+        rng = numpy.random.default_rng((seed, idx))
+        grows = rng.random() >= 0.1
+        curves.append(
+            (
+                "S{}".format(idx),
+                synthetic_curve(
+                    hours=float(rng.choice([12.0, 18.0, 24.0])),
+                    points_per_hour=float(rng.choice([2.0, 4.0, 6.0, 12.0])),
+                    mu=rng.uniform(0.1, 0.8) if grows else 0.0,
+                    n0=rng.uniform(0.01, 0.2),
+                    noise=10 ** rng.uniform(-3.5, -1.5),
+                    seed=int(rng.integers(2**31)),
+                ),
+            )
+        )
+
+    return curves
+
+
+def _compare_batch(payload):
+    reference, candidate, tolerances, time_budget, curves = payload
+    if curves[0] == "synthetic":
+        curves = synthetic_corpus(*curves[1:])
+
+    reference_results, reference_seconds = run_implementation(
+        reference, curves, time_budget
+    )
+    candidate_results, candidate_seconds = run_implementation(
+        candidate, curves, time_budget
+    )
+
+    comparisons = [
+        compare_curves(name, a, b, tolerances)
+        for (name, _), a, b in zip(curves, reference_results, candidate_results)
+    ]
+
+    return comparisons, reference_seconds, candidate_seconds
+
+
+class Report:
+    """Aggregates the CurveComparisons of a corpus."""
+
+    def __init__(self, tolerances):
+        self.tolerances = tolerances
+        self.curves = 0
+        self.status_mismatches = 0
+        self.count_mismatches = 0
+        self.exceeded = dict.fromkeys(METRICS, 0)
+        self.max_differences = {metric: (0.0, 0.0) for metric in METRICS}
+        self.reference_seconds = 0.0
+        self.candidate_seconds = 0.0
+        self.failures = []
+        self.timed_out = []
+
+    def add(self, comparisons, reference_seconds=0.0, candidate_seconds=0.0):
+        self.reference_seconds += reference_seconds
+        self.candidate_seconds += candidate_seconds
+        for comparison in comparisons:
+            self.curves += 1
+            if comparison.timed_out:
+                self.timed_out.append(comparison.name)
+                continue
+
+            self.status_mismatches += comparison.status_mismatch
+            self.count_mismatches += comparison.count_mismatch
+            for metric in comparison.exceeded:
+                self.exceeded[metric] += 1
+
+            for metric, (difference, relative) in comparison.differences.items():
+                previous = self.max_differences[metric]
+                self.max_differences[metric] = (
+                    max(previous[0], difference),
+                    max(previous[1], relative),
+                )
+
+            if (
+                comparison.status_mismatch
+                or comparison.count_mismatch
+                or comparison.exceeded
+            ):
+                self.failures.append(comparison)
+
+    @property
+    def passed(self):
+        return not self.failures
+
+    def lines(self, examples=10):
+        lines = [
+            "Compared {} curves; reference {:.1f}s, candidate {:.1f}s".format(
+                self.curves, self.reference_seconds, self.candidate_seconds
+            ),
+            "Curves rejected by (or failing in) only one implementation: {}".format(
+                self.status_mismatches
+            ),
+            "Curves with different numbers of growth phases: {}".format(
+                self.count_mismatches
+            ),
+            "Curves exceeding the time budget (not compared): {}".format(
+                len(self.timed_out)
+            ),
+            "metric\trtol\texceeded\tmax abs diff\tmax rel diff",
+        ]
+
+        for metric in METRICS:
+            lines.append(
+                "{}\t{:.1e}\t{}\t{:.3e}\t{:.3e}".format(
+                    metric,
+                    self.tolerances[metric],
+                    self.exceeded[metric],
+                    *self.max_differences[metric],
+                )
+            )
+
+        for comparison in self.failures[:examples]:
+            reasons = list(comparison.exceeded)
+            if comparison.count_mismatch:
+                reasons.insert(0, "phase count")
+            if comparison.status_mismatch:
+                reasons.insert(0, "rejection")
+
+            lines.append("Differs: {} ({})".format(comparison.name, ", ".join(reasons)))
+
+        for name in self.timed_out[:examples]:
+            lines.append("Exceeded time budget: {}".format(name))
+
+        return lines
+
+
+def validate(reference, candidate, batches, tolerances, workers=1, time_budget=None):
+    """
+    Compares two Implementations on batches of curves, each either a list of
+    ``(name, curve)`` pairs or a tuple of arguments of `synthetic_corpus` prefixed by
+    "synthetic", and returns a Report.
+    """
+    report = Report(tolerances)
+    units = [
+        WorkUnit(idx, (reference, candidate, tolerances, time_budget, batch))
+        for idx, batch in enumerate(batches)
+    ]
+
+    with ProcessExecutor(workers=workers) as executor:
+        for result in executor.map(_compare_batch, units):
+            if result.error is not None:
+                raise RuntimeError(result.error)
+
+            report.add(*result.value)
+
+    return report
+
+
+def parse_assignment(value):
+    name, sep, text = value.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError("expected NAME=VALUE, not {!r}".format(value))
+
+    return name.strip(), text.strip()
+
+
+def parse_parameter(value):
+    name, text = parse_assignment(value)
+    if name not in GrowthEstimationParameters.__slots__:
+        raise argparse.ArgumentTypeError("unknown parameter {!r}".format(name))
+
+    try:
+        return name, ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return name, text
+
+
+def parse_tolerance(value):
+    metric, text = parse_assignment(value)
+    if metric not in METRICS:
+        raise argparse.ArgumentTypeError("unknown metric {!r}".format(metric))
+
+    return metric, float(text)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="python -m croissance.validation",
+        description="Compare the growth phases found by a candidate implementation of "
+        "growth estimation with those found by a reference implementation",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "infiles",
+        nargs="*",
+        help="TSV files with recorded curves to include in the corpus",
+    )
+    parser.add_argument(
+        "--synthetic",
+        type=int,
+        default=1000,
+        metavar="N",
+        help="Number of synthetic curves to include in the corpus",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+
+    for role in ("reference", "candidate"):
+        parser.add_argument(
+            "--{}-patch".format(role),
+            type=parse_assignment,
+            action="append",
+            default=[],
+            metavar="TARGET=MODULE:ATTRIBUTE",
+            help="Replace TARGET, e.g. croissance.estimation.fit_exponential, in the "
+            "{} implementation".format(role),
+        )
+        parser.add_argument(
+            "--{}-param".format(role),
+            type=parse_parameter,
+            action="append",
+            default=[],
+            metavar="NAME=VALUE",
+            help="Set a GrowthEstimationParameters attribute, e.g. dtype='float32', "
+            "in the {} implementation".format(role),
+        )
+
+    parser.add_argument(
+        "--rtol",
+        type=float,
+        default=DEFAULT_RTOL,
+        help="Relative tolerance of differences in all metrics",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=parse_tolerance,
+        action="append",
+        default=[],
+        metavar="METRIC=RTOL",
+        help="Relative tolerance of one metric; one of {}".format(", ".join(METRICS)),
+    )
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=100,
+        help="Max number of curves compared per task; smaller batches are used if "
+        "needed to give each worker at least four tasks",
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        default=DEFAULT_TIME_BUDGET,
+        metavar="SECONDS",
+        help="CPU seconds allowed per curve and implementation; curves exceeding "
+        "it are reported separately and not compared. 0 to disable",
+    )
+    parser.add_argument(
+        "--examples",
+        type=int,
+        default=10,
+        help="Number of differing curves listed by name",
+    )
+
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+
+    tolerances = dict.fromkeys(METRICS, args.rtol)
+    tolerances.update(args.tolerance)
+
+    reference = Implementation(tuple(args.reference_patch), tuple(args.reference_param))
+    candidate = Implementation(tuple(args.candidate_patch), tuple(args.candidate_param))
+
+    curves = []
+    for filepath in args.infiles:
+        with TSVReader(filepath) as reader:
+            curves.extend(
+                ("{}:{}".format(filepath, name), curve)
+                for name, curve in reader.read()
+                if not curve.empty
+            )
+
+    # Batches take every nth curve, and there are enough of them that a batch with
+    # a slow curve does not leave the other workers idle at the end of a run
+    total = args.synthetic + len(curves)
+    count = max(
+        math.ceil(total / max(args.batch_size, 1)), min(total, 4 * args.workers)
+    )
+    batches = [
+        ("synthetic", offset, args.synthetic, args.seed, count)
+        for offset in range(min(count, args.synthetic))
+    ]
+    batches.extend(curves[offset::count] for offset in range(min(count, len(curves))))
+
+    report = validate(
+        reference,
+        candidate,
+        batches,
+        tolerances,
+        args.workers,
+        time_budget=args.time_budget or None,
+    )
+    for line in report.lines(args.examples):
+        print(line)
+
+    return 0 if report.passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,214 @@
+"""
+Watching of directories for new input files, used by `croissance watch`.
+"""
+
+import ctypes
+import ctypes.util
+import fnmatch
+import json
+import logging
+import os
+import select
+import struct
+import time
+from pathlib import Path
+
+# inotify events signalling that a file was written and closed, or moved into place
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+
+_EVENT = struct.Struct("iIII")
+
+
+class Inotify:
+    """
+    Minimal wrapper of the Linux inotify API, reporting the names of files closed
+    after writing or moved into a directory. Raises OSError where unavailable.
+    """
+
+    def __init__(self, directory):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            inotify_init1 = libc.inotify_init1
+            inotify_add_watch = libc.inotify_add_watch
+        except (OSError, AttributeError) as error:
+            raise OSError("inotify is not available") from error
+
+        self._fd = inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        watch = inotify_add_watch(
+            self._fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO
+        )
+        if watch < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, "inotify_add_watch failed for '{}'".format(directory))
+
+    def read(self, timeout):
+        """Waits up to ``timeout`` seconds for events and returns the file names."""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        names = []
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            _watch, _mask, _cookie, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if name:
+                names.append(os.fsdecode(name))
+
+        return names
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class DirectoryWatcher:
+    """
+    Reports files in a directory matching ``pattern`` once they are complete, i.e.
+    once the writer has closed them (using inotify, on Linux) or once they have not
+    been modified for ``settle`` seconds. The directory is also scanned every
+    ``poll_interval`` seconds, which is the only means of detection where inotify is
+    unavailable (e.g. on network file systems or on other platforms). Files for which
+    ``exclude(name)`` is true are ignored, as are hidden files.
+    """
+
+    def __init__(
+        self,
+        directory,
+        pattern="*.tsv",
+        settle=5.0,
+        poll_interval=10.0,
+        exclude=None,
+        use_inotify=True,
+    ):
+        self.directory = Path(directory)
+        self.pattern = pattern
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self._exclude = exclude
+        self._inotify = None
+        self._closed = set()
+        self._last_scan = None
+
+        if use_inotify:
+            try:
+                self._inotify = Inotify(self.directory)
+            except OSError as error:
+                log = logging.getLogger("croissance")
+                log.info("Polling '%s' for new files: %s", self.directory, error)
+
+    @property
+    def backend(self):
+        return "polling" if self._inotify is None else "inotify"
+
+    def poll(self, timeout=None):
+        """
+        Waits up to ``timeout`` seconds (by default the poll interval) for files to be
+        completed, and returns a sorted list of ``(path, signature)`` pairs of all
+        complete files, where ``signature`` identifies the version of a file.
+        """
+        timeout = self.poll_interval if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if self._inotify is not None:
+                names = [
+                    name
+                    for name in self._inotify.read(max(0.0, remaining))
+                    if self._matches(name)
+                ]
+                self._closed.update(names)
+                if names:
+                    return self._scan()
+            elif remaining > 0:
+                time.sleep(remaining)
+
+            if time.monotonic() >= deadline:
+                return self._scan()
+
+    def _scan(self):
+        now = time.time()
+        completed = []
+        for entry in os.scandir(self.directory):
+            if not self._matches(entry.name):
+                continue
+
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+
+            if entry.name in self._closed or now - stat.st_mtime >= self.settle:
+                signature = (stat.st_size, stat.st_mtime_ns)
+                completed.append((self.directory / entry.name, signature))
+
+        self._closed.clear()
+
+        return sorted(completed)
+
+    def _matches(self, name):
+        return (
+            not name.startswith(".")
+            and fnmatch.fnmatch(name, self.pattern)
+            and not (self._exclude is not None and self._exclude(name))
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+
+class WatchState:
+    """
+    Records the files processed by `croissance watch`, by name and signature (size and
+    modification time), in a JSON file that is replaced atomically on each update.
+    Files are processed again if they are modified.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = Path(filepath)
+        self._files = {}
+
+        if self.filepath.exists():
+            with self.filepath.open("rt") as handle:
+                self._files = json.load(handle)["files"]
+
+    def is_processed(self, filepath, signature):
+        record = self._files.get(Path(filepath).name)
+
+        return record is not None and tuple(record["signature"]) == tuple(signature)
+
+    def add(self, filepath, signature, status):
+        self._files[Path(filepath).name] = {
+            "signature": list(signature),
+            "status": status,
+            "processed": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        self.save()
+
+    def save(self):
+        temp_filepath = self.filepath.with_name(".{}.tmp".format(self.filepath.name))
+        with temp_filepath.open("wt") as handle:
+            json.dump({"files": self._files}, handle, indent=1, sort_keys=True)
+
+        os.replace(temp_filepath, self.filepath)
@@ -7,6 +7,7 @@ import pytest
 from pytest import approx
 
 from croissance import plot_processed_curve, process_curve
+from croissance.estimation import GrowthEstimationParameters, estimate_growth
 from croissance.figures.writer import PDFWriter
 
 
@@ -179,3 +180,85 @@ def test_plot_processed_curve(yscale, naxis):
         assert len(axes) == naxis
     finally:
         plt.close()
+
+
+def test_estimate_growth_float32():
+    mu = 0.5
+    pph = 4.0
+    curve = pandas.Series(
+        data=[numpy.exp(mu * i / pph) for i in range(100)],
+        index=[i / pph for i in range(100)],
+    )
+
+    params = GrowthEstimationParameters()
+    params.dtype = "float32"
+
+    double = estimate_growth(curve)
+    single = estimate_growth(curve, params=params)
+
+    assert single.series.dtype == "float32"
+    assert len(single.growth_phases) == len(double.growth_phases) == 1
+    assert single.growth_phases[0].slope == approx(double.growth_phases[0].slope)
+
+
+def test_estimate_growth_prescreen():
+    mu = 0.5
+    pph = 4.0
+    curve = pandas.Series(
+        data=[numpy.exp(mu * i / pph) for i in range(100)],
+        index=[i / pph for i in range(100)],
+    )
+    blank = pandas.Series(
+        data=[0.1 + 0.001 * (i % 3) for i in range(100)],
+        index=curve.index,
+    )
+
+    params = GrowthEstimationParameters()
+    params.curve_minimum_signal_range = 0.05
+    params.curve_minimum_log_ratio = 0.5
+
+    assert estimate_growth(curve, params=params).rejected is None
+    assert len(estimate_growth(curve, params=params).growth_phases) == 1
+
+    result = estimate_growth(blank, params=params)
+    assert result.growth_phases == []
+    assert result.rejected.startswith("signal range")
+
+    params.curve_minimum_signal_range = None
+    assert estimate_growth(blank, params=params).rejected.startswith("log-ratio")
+
+
+def test_estimate_growth_phase_pruning():
+    mu = 0.5
+    pph = 4.0
+    curve = pandas.Series(
+        data=[numpy.exp(mu * i / pph) for i in range(100)],
+        index=[i / pph for i in range(100)],
+    )
+
+    params = GrowthEstimationParameters()
+    unpruned = estimate_growth(curve, params=params)
+    assert unpruned.pruned == 0
+
+    params.phase_prune_margin = 0.5
+    pruned = estimate_growth(curve, params=params)
+    assert pruned.growth_phases == unpruned.growth_phases
+    assert pruned.fitted + pruned.pruned == unpruned.fitted
+
+
+def test_estimate_growth_coarse_to_fine():
+    mu = 0.5
+    pph = 60.0
+    curve = pandas.Series(
+        data=[numpy.exp(mu * i / pph) for i in range(20 * 60)],
+        index=[i / pph for i in range(20 * 60)],
+    )
+
+    params = GrowthEstimationParameters()
+    params.coarse_points_per_hour = 4
+    result = estimate_growth(curve, params=params)
+
+    assert len(result.growth_phases) == 1
+    assert len(result.series) == len(curve)
+    assert mu == approx(result.growth_phases[0].slope, abs=1e-2)
+    assert result.growth_phases[0].SNR > 1000
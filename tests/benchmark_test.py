@@ -0,0 +1,39 @@
+from croissance.benchmark import main, synthetic_plate
+
+
+def test_synthetic_plate():
+    plate = synthetic_plate(curves=3, hours=10, points_per_hour=6)
+
+    assert [name for name, _ in plate] == ["W0", "W1", "W2"]
+    assert all(len(curve) == 60 for _, curve in plate)
+
+
+def test_benchmark_executors(capsys):
+    assert main(["executors", "--curves", "2", "--hours", "12", "--workers", "1"]) == 0
+
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split("\t")[:2] for line in lines[1:]] == [
+        ["process", "1"],
+        ["thread", "1"],
+    ]
+
+
+def test_benchmark_resolution(capsys):
+    argv = ["resolution", "--curves", "2", "--points-per-hour", "30", "--coarse", "6"]
+    assert main(argv) == 0
+
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split("\t")[0] for line in lines[1:3]] == ["30.0", "6.0"]
+    assert lines[-1].startswith("6.0 points/hour: 0 curves")
+
+
+def test_benchmark_kernels(capsys):
+    assert main(["kernels", "--repeats", "1"]) == 0
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith("Compiled backend: ")
+    assert [line.split("\t")[0] for line in lines[2:]] == [
+        "select_segments",
+        "find_runs",
+        "knot_windows",
+    ]
@@ -0,0 +1,62 @@
+import numpy
+import pandas
+import pytest
+from scipy.optimize import curve_fit
+from scipy.stats import t
+
+from croissance.estimation import GrowthEstimationParameters
+from croissance.estimation.confidence import slope_confidence_interval
+from croissance.estimation.regression import exponential, fit_exponential
+
+
+@pytest.fixture
+def phase():
+    rng = numpy.random.default_rng(3)
+    index = numpy.arange(2.0, 10.0, 0.25)
+    values = 0.05 + 0.01 * numpy.exp(0.5 * index) + rng.normal(0.0, 0.01, len(index))
+
+    return pandas.Series(index=index, data=values)
+
+
+def _params(method):
+    params = GrowthEstimationParameters()
+    params.confidence_level = 0.95
+    params.confidence_method = method
+
+    return params
+
+
+def test_slope_confidence_interval_disabled(phase):
+    slope, intercept, n0, _snr, _ = fit_exponential(phase)
+    params = GrowthEstimationParameters()
+
+    assert slope_confidence_interval(phase, slope, intercept, n0, params) == (
+        None,
+        None,
+    )
+
+
+@pytest.mark.parametrize("method", ("covariance", "bootstrap"))
+def test_slope_confidence_interval(phase, method):
+    slope, intercept, n0, _snr, _ = fit_exponential(phase)
+    lower, upper = slope_confidence_interval(
+        phase, slope, intercept, n0, _params(method)
+    )
+
+    assert lower < slope < upper
+    assert lower < 0.5 < upper
+    assert upper - lower < 0.05
+
+
+def test_slope_confidence_interval_matches_curve_fit(phase):
+    slope, intercept, n0, _snr, _ = fit_exponential(phase)
+    _popt, pcov = curve_fit(
+        exponential, phase.index, phase.values, p0=(0.01, slope, n0)
+    )
+    error = t.ppf(0.975, len(phase) - 3) * numpy.sqrt(pcov[1, 1])
+
+    lower, upper = slope_confidence_interval(
+        phase, slope, intercept, n0, _params("covariance")
+    )
+    assert lower == pytest.approx(slope - error, rel=1e-4)
+    assert upper == pytest.approx(slope + error, rel=1e-4)
@@ -0,0 +1,44 @@
+import numpy
+import pandas
+
+from croissance.estimation.grid import group_by_grid, sampling_grid
+
+
+def test_sampling_grid_is_shared():
+    a = pandas.Series(index=numpy.arange(0.0, 10.0, 0.25), data=1.0)
+    b = pandas.Series(index=numpy.arange(0.0, 10.0, 0.25), data=2.0)
+    c = pandas.Series(index=numpy.arange(0.0, 10.0, 0.5), data=1.0)
+
+    assert sampling_grid(a.index) is sampling_grid(b.index)
+    assert sampling_grid(a.index) is not sampling_grid(c.index)
+    assert sampling_grid(a.index).points_per_hour == 4.0
+    assert sampling_grid(c.index).window_size(5) == 11
+
+
+def test_sampling_grid_get_computes_once():
+    grid = sampling_grid(pandas.Index([0.0, 1.0, 2.0]))
+    calls = []
+
+    def _compute(index):
+        calls.append(index)
+        return len(index)
+
+    assert grid.get("test", _compute) == 3
+    assert grid.get("test", _compute) == 3
+    assert len(calls) == 1
+
+
+def test_group_by_grid():
+    index = numpy.arange(0.0, 5.0, 0.5)
+    curves = [
+        ("A1", pandas.Series(index=index, data=1.0)),
+        ("A2", pandas.Series(index=index[1:], data=1.0)),
+        ("A3", pandas.Series(index=index, data=2.0)),
+    ]
+
+    groups = group_by_grid(curves)
+    assert [[name for name, _ in members] for _, members in groups] == [
+        ["A1", "A3"],
+        ["A2"],
+    ]
+    assert groups[0][0] is sampling_grid(pandas.Index(index))
@@ -0,0 +1,67 @@
+import numpy
+import pytest
+
+from croissance.estimation import jit
+
+
+def _select_segments(order, starts, ends, duration):
+    segments, spots = [], set()
+    for idx in order:
+        window_spots = range(starts[idx], ends[idx])
+        if not any(i in spots for i in window_spots):
+            segments.append((starts[idx], min(duration, ends[idx])))
+            spots.update(window_spots)
+
+    return segments
+
+
+def _find_runs(mask):
+    runs, start = [], None
+    for idx, value in enumerate(mask):
+        if value and start is None:
+            start = idx
+        elif not value and start is not None:
+            runs.append((start, idx - 1))
+            start = None
+
+    if start is not None:
+        runs.append((start, len(mask) - 1))
+
+    return runs
+
+
+@pytest.fixture(params=("python", "backend"))
+def kernel(request):
+    def _kernel(fn):
+        return jit.python_function(fn) if request.param == "python" else fn
+
+    return _kernel
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_select_segments(kernel, seed):
+    rng = numpy.random.default_rng(seed)
+    starts = rng.integers(0, 24, 100)
+    ends = starts + rng.integers(1, 10, 100)
+    order = rng.permutation(100)
+
+    result = kernel(jit.select_segments)(order, starts, ends, 20)
+    assert list(zip(*result)) == _select_segments(order, starts, ends, 20)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_find_runs(kernel, seed):
+    mask = numpy.random.default_rng(seed).random(50) > 0.5
+
+    assert list(zip(*kernel(jit.find_runs)(mask))) == _find_runs(mask)
+    assert list(zip(*kernel(jit.find_runs)(numpy.ones(3, dtype=bool)))) == [(0, 2)]
+    assert list(zip(*kernel(jit.find_runs)(numpy.zeros(3, dtype=bool)))) == []
+
+
+def test_knot_windows(kernel):
+    starts, ends = kernel(jit.knot_windows)(
+        numpy.array([0.0, 4.0, 10.0]), numpy.array([4.0, 10.0, 22.0])
+    )
+
+    assert list(starts) == [0.0, 4.0, 8.0, 10.0, 12.0, 20.0]
+    assert list(ends) == [4.0, 6.0, 10.0, 12.0, 20.0, 22.0]
@@ -0,0 +1,41 @@
+import numpy
+import pytest
+from scipy.signal import savgol_filter
+
+from croissance.estimation.kernels import linear_fit_kernel, savgol, savgol_kernel
+
+
+@pytest.mark.parametrize("window_length", (1, 5, 21))
+@pytest.mark.parametrize("deriv", (0, 1, 2))
+def test_savgol_matches_scipy(window_length, deriv):
+    values = numpy.random.default_rng(0).normal(size=50).cumsum()
+    polyorder = min(3, window_length - 1)
+
+    expected = savgol_filter(values, window_length, polyorder, deriv=deriv, delta=0.5)
+    result = savgol(values, window_length, polyorder, deriv=deriv, delta=0.5)
+
+    assert result == pytest.approx(expected, abs=1e-9)
+
+
+def test_savgol_kernel_is_cached():
+    assert savgol_kernel(11, 3, 1) is savgol_kernel(11, 3, 1)
+
+    coeffs, _left, _right = savgol_kernel(11, 3, 1)
+    with pytest.raises(ValueError):
+        coeffs[0] = 1.0
+
+
+def test_savgol_window_too_large():
+    with pytest.raises(ValueError):
+        savgol(numpy.ones(5), 7, 3)
+
+
+@pytest.mark.parametrize("length", (1, 2, 7))
+def test_linear_fit_kernel(length):
+    values = numpy.random.default_rng(1).normal(size=length)
+    x, slope = linear_fit_kernel(length)
+
+    A = numpy.vstack([x, numpy.ones(length)]).T
+    expected, _c = numpy.linalg.lstsq(A, values, rcond=None)[0]
+
+    assert slope @ values == pytest.approx(expected, abs=1e-12)
@@ -0,0 +1,43 @@
+import numpy
+import pandas
+
+from croissance.estimation import GrowthEstimationParameters
+from croissance.estimation.pruning import prune_phase
+
+
+def _params(margin=0.5):
+    params = GrowthEstimationParameters()
+    params.phase_prune_margin = margin
+    params.phase_minimum_slope = 0.1
+    params.phase_minimum_signal_noise_ratio = 10
+
+    return params
+
+
+def test_prune_phase_disabled_by_default():
+    flat = pandas.Series(index=numpy.arange(0.0, 4.0, 0.25), data=1.0)
+
+    assert not prune_phase(flat, GrowthEstimationParameters())
+
+
+def test_prune_phase_keeps_exponential_growth():
+    index = numpy.arange(0.0, 6.0, 0.25)
+    for mu in (0.2, 0.5, 1.0, 2.0):
+        curve = pandas.Series(index=index, data=0.05 + 0.01 * numpy.exp(mu * index))
+
+        assert not prune_phase(curve, _params())
+
+
+def test_prune_phase_rejects_slow_growth():
+    index = numpy.arange(0.0, 6.0, 0.25)
+    curve = pandas.Series(index=index, data=0.05 + 0.01 * numpy.exp(0.01 * index))
+
+    assert prune_phase(curve, _params())
+
+
+def test_prune_phase_rejects_noise():
+    rng = numpy.random.default_rng(0)
+    index = numpy.arange(0.0, 6.0, 0.25)
+    curve = pandas.Series(index=index, data=0.1 + rng.normal(0.0, 0.01, len(index)))
+
+    assert prune_phase(curve, _params())
@@ -0,0 +1,51 @@
+import numpy
+import pandas
+from pytest import approx
+
+from croissance.estimation.replicates import (
+    estimate_replicate_growth,
+    pool_replicates,
+    replicate_statistics,
+)
+
+
+def _replicates(mus, pph=4.0, points=100):
+    index = numpy.arange(points) / pph
+
+    return [
+        ("R{}".format(idx), pandas.Series(index=index, data=numpy.exp(mu * index)))
+        for idx, mu in enumerate(mus)
+    ]
+
+
+def test_pool_replicates():
+    a = pandas.Series(index=[0.0, 1.0, 2.0], data=[1.0, 2.0, 3.0])
+    b = pandas.Series(index=[0.0, 1.0, 2.0], data=[3.0, 4.0, numpy.nan])
+    c = pandas.Series(index=[0.0, 1.0], data=[2.0, 9.0])
+
+    pooled = pool_replicates([a, b, c])
+    assert list(pooled.index) == [0.0, 1.0, 2.0]
+    assert list(pooled.values) == [2.0, 4.0, 3.0]
+
+
+def test_estimate_replicate_growth():
+    mus = [0.45, 0.5, 0.55]
+    group = estimate_replicate_growth(_replicates(mus))
+
+    assert len(group.pooled.growth_phases) == 1
+    assert [name for name, _ in group.replicates] == ["R0", "R1", "R2"]
+
+    phase = group.pooled.growth_phases[0]
+    for mu, (_, curve) in zip(mus, group.replicates):
+        assert len(curve.growth_phases) == 1
+        assert (curve.growth_phases[0].start, curve.growth_phases[0].end) == (
+            phase.start,
+            phase.end,
+        )
+        assert curve.growth_phases[0].rank == phase.rank
+        assert curve.growth_phases[0].slope == approx(mu, abs=1e-2)
+
+    (statistics,) = replicate_statistics(group)
+    assert statistics.replicates == 3
+    assert statistics.slope_mean == approx(0.5, abs=1e-2)
+    assert statistics.slope_std == approx(0.05, abs=1e-2)
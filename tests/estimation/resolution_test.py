@@ -0,0 +1,40 @@
+import numpy
+import pandas
+from pytest import approx
+
+from croissance.estimation.resolution import decimate, refine_phase
+
+
+def test_decimate():
+    series = pandas.Series(index=numpy.arange(0.0, 2.0, 0.25), data=numpy.arange(8.0))
+
+    coarse = decimate(series, 2)
+    assert list(coarse.index) == approx([0.125, 0.625, 1.125, 1.625])
+    assert list(coarse.values) == approx([0.5, 2.5, 4.5, 6.5])
+
+
+def test_decimate_with_gaps():
+    series = pandas.Series(index=[0.0, 0.1, 0.2, 2.1, 2.2], data=[1.0, 2, 3, 4, 6])
+
+    coarse = decimate(series, 1)
+    assert list(coarse.index) == approx([0.1, 2.15])
+    assert list(coarse.values) == approx([2.0, 5.0])
+
+
+def test_refine_phase():
+    series = pandas.Series(index=numpy.arange(0.0, 4.0, 0.25), data=1.0)
+    coarse = decimate(series, 1)
+
+    # Without growth at full resolution, phases span the bins of their start and end
+    assert refine_phase(series, coarse.index[1], coarse.index[2], 1, 5) == (1.0, 2.75)
+    assert refine_phase(series, coarse.index[0], coarse.index[3], 1, 5) == (0.0, 3.75)
+
+
+def test_refine_phase_at_full_resolution():
+    # The first and second derivatives are both positive from 1.3 to 2.3 hours
+    times = numpy.arange(0.0, 6.0, 0.05)
+    series = pandas.Series(index=times, data=-numpy.cos(numpy.pi / 2 * (times - 1.3)))
+
+    start, end = refine_phase(series, 1.5, 2.5, 1, 21)
+    assert start == approx(1.3, abs=0.1)
+    assert end == approx(2.3, abs=0.1)
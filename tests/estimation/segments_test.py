@@ -0,0 +1,53 @@
+import numpy
+import pandas
+import pytest
+from scipy.signal import detrend
+
+from croissance.estimation.smoothing.segments import (
+    segment_points,
+    window_median,
+    window_medians,
+    window_std_devs,
+)
+
+
+def test_window_medians_matches_window_median():
+    values = numpy.random.default_rng(0).normal(size=40).cumsum()
+    lo = numpy.array([0, 3, 10, 10, 39])
+    hi = numpy.array([5, 4, 30, 12, 40])
+
+    expected = [window_median(values[a:b], 0, 0)[1] for a, b in zip(lo, hi)]
+
+    assert window_medians(values, lo, hi) == pytest.approx(expected, abs=1e-12)
+
+
+def test_window_std_devs_matches_detrend():
+    values = 1.0 + numpy.random.default_rng(0).normal(size=400).cumsum() * 0.01
+    lo = numpy.array([0, 3, 10, 10, 390, 200])
+    hi = numpy.array([5, 5, 300, 12, 400, 201])
+
+    expected = [detrend(values[a:b]).std() for a, b in zip(lo, hi)]
+
+    assert window_std_devs(values, lo, hi) == pytest.approx(expected, abs=1e-12)
+
+
+def test_segment_points():
+    series = pandas.Series(
+        index=numpy.arange(0.0, 20.0, 0.5),
+        data=numpy.arange(0.0, 20.0, 0.5) * 2.0,
+    )
+    points = segment_points(series, [(0, 4), (4, 18)])
+
+    # Small segment: one knot; large segment: knots at the start, center and end
+    assert list(points.index) == [0.0, 2.0, 5.0, 11.0, 17.0, 19.5]
+    # Knots lie on the line through the data
+    assert list(points.values[1:-1]) == pytest.approx([4.0, 10.0, 22.0, 34.0])
+    assert points.values[0] == 1.0
+    assert points.values[-1] == 39.0
+
+
+def test_segment_points_empty_window():
+    series = pandas.Series(index=[0.0, 1.0, 2.0, 8.0, 9.0], data=1.0)
+    points = segment_points(series, [(3, 6)])
+
+    assert list(points.index) == [0.0, 9.0]
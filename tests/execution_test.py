@@ -0,0 +1,241 @@
+import os
+import threading
+import time
+
+import pytest
+
+from croissance.execution import (
+    Checkpoint,
+    ClusterExecutor,
+    ProcessExecutor,
+    ThreadExecutor,
+    WorkUnit,
+    parse_address,
+    reorder,
+)
+
+
+def square(value):
+    if value < 0:
+        raise ValueError(value)
+
+    return value * value
+
+
+def fail_once(args):
+    marker, value = args
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        raise RuntimeError("first attempt")
+
+    return value
+
+
+def sleep(seconds):
+    time.sleep(seconds)
+
+    return seconds
+
+
+def unpicklable(value):
+    return threading.Lock() if value < 0 else value
+
+
+def crash(value):
+    if value < 0:
+        os._exit(1)
+
+    time.sleep(0.01)
+
+    return value
+
+
+def _executors():
+    return [
+        lambda: ProcessExecutor(workers=2),
+        lambda: ThreadExecutor(workers=2),
+        lambda: ClusterExecutor(local_workers=2),
+    ]
+
+
+@pytest.mark.parametrize("create", _executors())
+def test_executor_map_ordered(create):
+    units = [WorkUnit(i, i) for i in range(25)]
+    with create() as executor:
+        results = list(executor.map(square, units, ordered=True))
+
+    assert [result.key for result in results] == list(range(25))
+    assert [result.value for result in results] == [i * i for i in range(25)]
+    assert all(result.error is None for result in results)
+
+
+@pytest.mark.parametrize("create", _executors())
+def test_executor_map_error(create):
+    with create() as executor:
+        results = list(executor.map(square, [WorkUnit("a", 2), WorkUnit("b", -1)]))
+
+    results = {result.key: result for result in results}
+    assert results["a"].value == 4
+    assert results["b"].value is None
+    assert "ValueError" in results["b"].error
+
+
+@pytest.mark.parametrize("executor_class", (ProcessExecutor, ThreadExecutor))
+def test_executor_map_retries(tmp_path, executor_class):
+    unit = WorkUnit("a", (str(tmp_path / "marker"), 7))
+    with executor_class(workers=1, retries=1) as executor:
+        (result,) = executor.map(fail_once, [unit])
+
+    assert result.error is None
+    assert result.value == 7
+
+
+def test_executor_map_checkpoint(tmp_path):
+    filepath = tmp_path / "journal"
+    with ThreadExecutor(workers=2) as executor, Checkpoint(filepath) as checkpoint:
+        units = [WorkUnit(i, i) for i in range(5)]
+        assert len(list(executor.map(square, units, checkpoint=checkpoint))) == 5
+
+    with ThreadExecutor(workers=2) as executor, Checkpoint(filepath) as checkpoint:
+        assert len(checkpoint) == 5
+        # Negative values would fail if they were not restored from the checkpoint
+        units = [WorkUnit(i, -i if i < 5 else i) for i in range(1, 8)]
+        results = list(executor.map(square, units, ordered=True, checkpoint=checkpoint))
+
+    assert [result.value for result in results] == [i * i for i in range(1, 8)]
+
+
+def test_process_executor_worker_crash():
+    units = [WorkUnit(i, -1 if i == 13 else i) for i in range(40)]
+    with ProcessExecutor(workers=4, retries=1) as executor:
+        results = list(executor.map(crash, units, ordered=True))
+
+    # Units running alongside the crashing unit are not failed, nor use up retries
+    assert [result.key for result in results if result.error is not None] == [13]
+    assert [result.value for result in results][:13] == list(range(13))
+
+
+def test_cluster_executor_lease_expiry():
+    # One worker is held up by the slow unit, while the other returns a result every
+    # 0.1s; the slow unit must expire without waiting for the fast units to finish
+    units = [WorkUnit("slow", 2.0)] + [WorkUnit(i, 0.1) for i in range(40)]
+    with ClusterExecutor(local_workers=2, lease_timeout=0.5) as executor:
+        results = list(executor.map(sleep, units))
+
+    keys = [result.key for result in results]
+    assert keys.index("slow") < len(keys) - 10
+    assert "lease expired" in results[keys.index("slow")].error
+
+
+def test_cluster_executor_unpicklable_result():
+    units = [WorkUnit("a", 1), WorkUnit("b", -1)]
+    with ClusterExecutor(local_workers=1) as executor:
+        results = {result.key: result for result in executor.map(unpicklable, units)}
+
+    assert results["a"].value == 1
+    assert results["b"].value is None
+    assert "pickle" in results["b"].error
+
+
+def test_checkpoint_truncated_record(tmp_path):
+    filepath = tmp_path / "journal"
+    with Checkpoint(filepath) as checkpoint:
+        checkpoint.add("a", 1)
+        checkpoint.add("b", 2)
+
+    with open(filepath, "r+b") as handle:
+        handle.truncate(os.path.getsize(filepath) - 3)
+
+    with Checkpoint(filepath) as checkpoint:
+        assert "a" in checkpoint
+        assert "b" not in checkpoint
+
+
+def test_checkpoint_resume_after_crash(tmp_path):
+    filepath = tmp_path / "journal"
+    values = {key: [key * 100] * 10 for key in "abcd"}
+    with Checkpoint(filepath) as checkpoint:
+        checkpoint.add("a", values["a"])
+        checkpoint.add("b", values["b"])
+
+    # A crash while writing "b" leaves a torn record at the end of the journal
+    with open(filepath, "r+b") as handle:
+        handle.truncate(os.path.getsize(filepath) - 50)
+
+    with Checkpoint(filepath) as checkpoint:
+        assert len(checkpoint) == 1
+        checkpoint.add("b", values["b"])
+        checkpoint.add("c", values["c"])
+
+    with Checkpoint(filepath) as checkpoint:
+        assert len(checkpoint) == 3
+        checkpoint.add("d", values["d"])
+
+    with Checkpoint(filepath) as checkpoint:
+        assert {key: checkpoint[key] for key in "abcd"} == values
+
+
+def test_checkpoint_header(tmp_path):
+    filepath = tmp_path / "journal"
+    with Checkpoint(filepath, header="params 1") as checkpoint:
+        checkpoint.add("a", 1)
+
+    with Checkpoint(filepath, header="params 1") as checkpoint:
+        assert not checkpoint.discarded
+        assert checkpoint["a"] == 1
+        checkpoint.add("b", 2)
+
+    # Journals written with another header are discarded, and replaced
+    with Checkpoint(filepath, header="params 2") as checkpoint:
+        assert checkpoint.discarded
+        assert len(checkpoint) == 0
+        checkpoint.add("c", 3)
+
+    with Checkpoint(filepath, header="params 2") as checkpoint:
+        assert not checkpoint.discarded
+        assert len(checkpoint) == 1
+
+
+def test_parse_address():
+    assert parse_address("node1:5000") == ("node1", 5000)
+    assert parse_address(":5000") == ("127.0.0.1", 5000)
+
+    with pytest.raises(ValueError):
+        parse_address("node1")
+
+
+def test_executor_map_schedule():
+    def schedule(tasks):
+        # Reverse order, two units per batch
+        tasks = tasks[::-1]
+        return [tasks[i : i + 2] for i in range(0, len(tasks), 2)]
+
+    calls = []
+
+    def record(value):
+        calls.append(value)
+        return value
+
+    units = [WorkUnit(i, i) for i in range(7)]
+    with ThreadExecutor(workers=1) as executor:
+        results = list(executor.map(record, units, schedule=schedule))
+
+        assert executor.stats.units == 7
+        assert executor.stats.batches == 4
+
+    assert calls == list(range(6, -1, -1))
+    assert sorted(result.value for result in results) == list(range(7))
+
+
+def test_reorder_window():
+    results = [(1, "b"), (2, "c"), (3, "d"), (0, "a"), (4, "e")]
+
+    assert [value for _, value in reorder(results)] == ["a", "b", "c", "d", "e"]
+    # Once more than two results are held back, the earliest is yielded regardless
+    assert [value for _, value in reorder(results, window=2)] == [
+        "b",
+        "c",
+        "d",
+        "a",
+        "e",
+    ]
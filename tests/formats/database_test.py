@@ -0,0 +1,54 @@
+import sqlite3
+
+from croissance import GrowthEstimationParameters
+from croissance.estimation import AnnotatedGrowthCurve, GrowthPhase
+from croissance.formats.database import SQLiteWriter, file_hash
+
+PHASES = [
+    GrowthPhase(1.0, 5.5, 0.5, 0.25, 0.01, 1000.0, 80.0),
+    GrowthPhase(6.0, 9.0, 0.125, 2.0, 0.0, 50.0, 80.0),
+]
+
+
+def _rows(filepath, query):
+    with sqlite3.connect(str(filepath)) as connection:
+        return connection.execute(query).fetchall()
+
+
+def test_SQLiteWriter_upserts(tmp_path):
+    database = tmp_path / "results.db"
+    params = GrowthEstimationParameters()
+
+    with SQLiteWriter(database, params) as writer:
+        writer.write("abc", "plate.tsv", "A1", AnnotatedGrowthCurve(None, None, PHASES))
+        writer.write("abc", "plate.tsv", "A2", AnnotatedGrowthCurve(None, None, []))
+        writer.write_failed("abc", "plate.tsv", "A3", "Traceback ...")
+
+    # Re-running updates curves in place, including removing phases no longer found
+    with SQLiteWriter(database, params) as writer:
+        curve = AnnotatedGrowthCurve(None, None, PHASES[:1])
+        writer.write("abc", "plate.tsv", "A1", curve)
+
+    assert _rows(database, "SELECT name, status FROM curves ORDER BY name") == [
+        ("A1", "annotated"),
+        ("A2", "annotated"),
+        ("A3", "failed"),
+    ]
+    assert _rows(database, "SELECT name, phase, slope FROM phases") == [("A1", 1, 0.5)]
+
+    # Runs with other parameters are stored alongside
+    params.phase_minimum_slope = 0.1
+    with SQLiteWriter(database, params, batch_size=1) as writer:
+        writer.write("abc", "plate.tsv", "A1", AnnotatedGrowthCurve(None, None, []))
+
+    assert _rows(database, "SELECT COUNT(*) FROM parameters") == [(2,)]
+    assert _rows(database, "SELECT COUNT(*) FROM curves WHERE name = 'A1'") == [(2,)]
+
+
+def test_file_hash(tmp_path):
+    (tmp_path / "a.tsv").write_text("time\tA1\n")
+    (tmp_path / "b.tsv").write_text("time\tA1\n")
+    (tmp_path / "c.tsv").write_text("time\tA2\n")
+
+    assert file_hash(tmp_path / "a.tsv") == file_hash(tmp_path / "b.tsv")
+    assert file_hash(tmp_path / "a.tsv") != file_hash(tmp_path / "c.tsv")
@@ -0,0 +1,33 @@
+import pandas
+
+from croissance.estimation import AnnotatedGrowthCurve, GrowthPhase
+from croissance.execution import UnitResult
+from croissance.formats.events import EventLog
+
+PHASE = GrowthPhase(1.0, 5.5, 0.5, 0.25, 0.01, 1000.0, 80.0)
+
+
+def test_EventLog(tmp_path):
+    filepath = tmp_path / "events.jsonl"
+    curves = [
+        UnitResult("A1", AnnotatedGrowthCurve(None, None, [PHASE], None, 1, 2), None),
+        UnitResult("A2", AnnotatedGrowthCurve(None, None, [], "flat"), None, 0.5),
+        UnitResult("A3", None, "Traceback ...\nValueError: bad curve\n", 0.25),
+    ]
+
+    with EventLog(filepath, batch_size=3) as events:
+        for result in curves:
+            events.write_curve("plate.tsv", result.key, result)
+
+        # Complete batches are written before the log is closed
+        assert len(filepath.read_text().splitlines()) == 3
+
+    data = pandas.read_json(filepath, lines=True)
+    assert list(data["event"]) == ["started", "curve", "curve", "curve", "finished"]
+
+    curves = data[data["event"] == "curve"].set_index("name")
+    assert list(curves["status"]) == ["annotated", "rejected", "failed"]
+    assert list(curves["reason"].fillna("")) == ["", "flat", "ValueError: bad curve"]
+    assert list(curves["phases"].fillna(-1)) == [1, 0, -1]
+    assert curves.loc["A1", "pruned"] == 2
+    assert curves.loc["A2", "seconds"] == 0.5
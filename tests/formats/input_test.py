@@ -0,0 +1,129 @@
+import bz2
+import gzip
+import io
+import lzma
+import sys
+
+import pytest
+
+from croissance.formats.input import (
+    LongTSVReader,
+    TSVReader,
+    open_input,
+    read_groups,
+)
+
+
+@pytest.mark.parametrize("dtype", (None, "float32"))
+def test_TSVReader(tmp_path, dtype):
+    filepath = tmp_path / "plate.tsv"
+    filepath.write_text("time\tA1\tA2\n0.0\t0.1\t0.2\n0.25\t0.15\t\n0.5\t0.2\t0.3\n")
+
+    with TSVReader(filepath, dtype=dtype) as reader:
+        curves = reader.read()
+
+    assert [name for name, _ in curves] == ["A1", "A2"]
+    assert list(curves[1][1].index) == [0.0, 0.5]
+    assert curves[0][1].values == pytest.approx([0.1, 0.15, 0.2])
+    assert curves[0][1].dtype == (dtype or "float64")
+    assert curves[0][1].index.dtype == "float64"
+
+
+class _Pipe(io.RawIOBase):
+    """Non-seekable stream, like standard input when reading from a pipe."""
+
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._data.readinto(buffer)
+
+
+@pytest.mark.parametrize("compress", (None, gzip.compress, bz2.compress, lzma.compress))
+def test_open_input(tmp_path, monkeypatch, compress):
+    # Larger than the buffers of the decompressors, which could otherwise be rewound
+    text = "time\tA1\n" + "".join("{}\t0.1\n".format(i) for i in range(10000))
+    data = text.encode()
+    if compress is not None:
+        data = compress(data)
+
+    filepath = tmp_path / "plate.tsv"
+    filepath.write_bytes(data)
+    with open_input(filepath) as handle:
+        assert handle.read() == text
+
+    stdin = io.TextIOWrapper(io.BufferedReader(_Pipe(data), buffer_size=16))
+    monkeypatch.setattr(sys, "stdin", stdin)
+    with TSVReader("-", dtype="float32") as reader:
+        ((name, curve),) = reader.read()
+
+    assert name == "A1"
+    assert len(curve) == 10000
+    assert curve.dtype == "float32"
+
+
+LONG = (
+    "plate\twell\ttime\tvalue\n"
+    "P1\tA1\t0.0\t0.1\n"
+    "P1\tA1\t0.5\t0.2\n"
+    "P1\tA2\t0.0\t0.3\n"
+    "P1\tA2\t0.5\t\n"
+    "P2\tA1\t0.0\t0.5\n"
+    "P2\tA1\t0.5\t0.6\n"
+)
+
+
+@pytest.mark.parametrize("chunksize", (1, 2, 100))
+def test_LongTSVReader(tmp_path, chunksize):
+    filepath = tmp_path / "long.tsv"
+    filepath.write_text(LONG)
+
+    with LongTSVReader(filepath, chunksize=chunksize) as reader:
+        curves = list(reader.read())
+
+    assert [name for name, _ in curves] == ["P1 A1", "P1 A2", "P2 A1"]
+    assert list(curves[0][1].index) == [0.0, 0.5]
+    assert list(curves[0][1]) == [0.1, 0.2]
+    assert list(curves[1][1]) == [0.3]
+
+
+def test_LongTSVReader_unsorted(tmp_path):
+    header, *rows = LONG.splitlines()
+    filepath = tmp_path / "long.tsv"
+    filepath.write_text("\n".join([header] + rows[1::2] + rows[::2]) + "\n")
+
+    reader = LongTSVReader(filepath, chunksize=2)
+    with reader, pytest.raises(ValueError, match="not contiguous"):
+        list(reader.read())
+
+    with LongTSVReader(filepath, presorted=False, chunksize=2, buckets=2) as reader:
+        curves = dict(reader.read())
+
+    assert sorted(curves) == ["P1 A1", "P1 A2", "P2 A1"]
+    # Rows are sorted by time within each curve
+    assert list(curves["P2 A1"].index) == [0.0, 0.5]
+    assert list(curves["P2 A1"]) == [0.5, 0.6]
+    assert list(curves["P1 A2"]) == [0.3]
+    assert not list(tmp_path.glob("croissance-*"))
+
+
+def test_LongTSVReader_missing_columns(tmp_path):
+    filepath = tmp_path / "long.tsv"
+    filepath.write_text("well\tvalue\nA1\t0.1\n")
+
+    with pytest.raises(ValueError, match="time"):
+        list(LongTSVReader(filepath).read())
+
+
+def test_read_groups(tmp_path):
+    filepath = tmp_path / "groups.tsv"
+    filepath.write_text("name\tgroup\nA1\twt\nA2\twt\nB1\tmutant\n")
+
+    assert read_groups(filepath) == {"A1": "wt", "A2": "wt", "B1": "mutant"}
+
+    filepath.write_text("well\tcondition\nA1\twt\n")
+    with pytest.raises(ValueError):
+        read_groups(filepath)
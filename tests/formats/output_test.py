@@ -0,0 +1,70 @@
+import gzip
+
+from croissance.estimation import AnnotatedGrowthCurve, GrowthPhase
+from croissance.formats.output import TSVWriter
+
+PHASES = [
+    GrowthPhase(1.0, 5.5, 0.5, 0.25, 0.01, 1000.0, 80.0),
+    GrowthPhase(6.0, 9.0, 0.125, 2.0, 0.0, 50.0, 80.0),
+]
+
+EXPECTED = (
+    "name\tphase\tstart\tend\tslope\tintercept\tN0\tSNR\trank\r\n"
+    "A1\t0\t6.0\t9.0\t0.125\t2.0\t0.0\t50.0\t80.0\r\n"
+    "A1\t1\t1.0\t5.5\t0.5\t0.25\t0.01\t1000.0\t80.0\r\n"
+    "A1\t2\t6.0\t9.0\t0.125\t2.0\t0.0\t50.0\t80.0\r\n"
+    "B\t0" + "\t" * 7 + "\r\n"
+    '"C\t2"\t0' + "\t" * 7 + "\r\n"
+)
+
+
+def _curves():
+    return [
+        ("A1", AnnotatedGrowthCurve(None, None, PHASES)),
+        ("B", AnnotatedGrowthCurve(None, None, [])),
+        ("C\t2", AnnotatedGrowthCurve(None, None, [])),
+    ]
+
+
+def test_pick_best_prefers_last_of_ties():
+    assert GrowthPhase.pick_best(PHASES, "rank") is PHASES[1]
+    assert GrowthPhase.pick_best(PHASES, "SNR") is PHASES[0]
+    assert GrowthPhase.pick_best([], "rank") is None
+
+
+def test_TSVWriter_write_all_matches_write(tmp_path):
+    with TSVWriter(tmp_path / "a.tsv", exclude_default_phase=False) as writer:
+        for name, curve in _curves():
+            writer.write(name, curve)
+
+    with TSVWriter(tmp_path / "b.tsv", exclude_default_phase=False) as writer:
+        writer.write_all(_curves())
+
+    a = (tmp_path / "a.tsv").read_bytes()
+    assert a == (tmp_path / "b.tsv").read_bytes()
+    assert a.decode() == EXPECTED
+
+
+def test_TSVWriter_gzip(tmp_path):
+    with TSVWriter(tmp_path / "a.tsv") as writer:
+        writer.write_all(_curves())
+
+    with TSVWriter(tmp_path / "a.tsv.gz", compression="gzip") as writer:
+        writer.write_all(_curves())
+
+    with gzip.open(tmp_path / "a.tsv.gz", "rb") as handle:
+        assert handle.read() == (tmp_path / "a.tsv").read_bytes()
+
+
+def test_TSVWriter_confidence_intervals(tmp_path):
+    phase = PHASES[0]._replace(slope_lower=0.25, slope_upper=0.75)
+    with TSVWriter(tmp_path / "a.tsv", confidence_intervals=True) as writer:
+        writer.write("A1", AnnotatedGrowthCurve(None, None, [phase]))
+
+    assert (tmp_path / "a.tsv").read_text().splitlines() == [
+        (
+            "name\tphase\tstart\tend\tslope\tintercept\tN0\tSNR\trank\t"
+            "slope_lower\tslope_upper"
+        ),
+        "A1\t1\t1.0\t5.5\t0.5\t0.25\t0.01\t1000.0\t80.0\t0.25\t0.75",
+    ]
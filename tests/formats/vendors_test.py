@@ -0,0 +1,139 @@
+import math
+
+import pytest
+
+from croissance.formats.vendors import (
+    BioTekReader,
+    BMGReader,
+    TecanReader,
+    parse_time,
+)
+
+BIOTEK = (
+    "Software Version\t3.11.19\n"
+    "Reader Type:\tSynergy H1\n"
+    "\n"
+    "OD:600\n"
+    "\n"
+    "Time\tT° OD:600\tA1\tA2\n"
+    "0:00:00\t37.0\t0.101\t0.201\n"
+    "0:15:00\t37.1\t0.102\tOVRFLW\n"
+    "25:30:00\t37.0\t0.104\t0.204\n"
+    "\n"
+    "GFP:485,528\n"
+    "\n"
+    "Time\tT° GFP:485,528\tA1\tA2\n"
+    "0:00:00\t37.0\t10\t20\n"
+    "0:15:00\t37.1\t11\t21\n"
+    "\n"
+    "Results\n"
+)
+
+TECAN_ROWS = (
+    "Application: Tecan i-control\n"
+    "\n"
+    "Label: OD600\n"
+    "Cycle Nr.\t1\t2\t3\n"
+    "Time [s]\t0\t900\t1800\n"
+    "Temp. [°C]\t37.0\t37.1\t37.0\n"
+    "A1\t0.101\t0.102\t0.104\n"
+    "A2\t0.201\t\t0.204\n"
+    "\n"
+    "End Time:\t2024-01-01 12:00:00\n"
+)
+
+TECAN_COLUMNS = (
+    "Label: OD600\n"
+    "Cycle Nr.\tTime [s]\tTemp. [°C]\tA1\tA2\n"
+    "1\t0\t37.0\t0.101\t0.201\n"
+    "2\t900\t37.1\t0.102\t\n"
+    "3\t1800\t37.0\t0.104\t0.204\n"
+    "\n"
+)
+
+BMG = (
+    "User: USER\n"
+    "Test Name: Growth\n"
+    "\n"
+    "Well\tContent\tRaw Data (600)\tRaw Data (600)\tRaw Data (600)\n"
+    "\t\t0 h \t0 h 15 min\t0 h 30 min\n"
+    "A01\tSample X1\t0.101\t0.102\t0.104\n"
+    "A02\tSample X2\t0.201\t\t0.204\n"
+)
+
+
+@pytest.mark.parametrize(
+    "text, hours",
+    (
+        ("0:15:00", 0.25),
+        ("25:30:00", 25.5),
+        ("1.01:00:00", 25.0),
+        ("0:00:09.0", 0.0025),
+        ("1 h 30 min", 1.5),
+        ("45 min", 0.75),
+        ("9 s", 0.0025),
+        ("OD600", None),
+        ("", None),
+    ),
+)
+def test_parse_time(text, hours):
+    if hours is None:
+        assert parse_time(text) is None
+    else:
+        assert parse_time(text) == pytest.approx(hours)
+
+
+def _read(cls, tmp_path, text, **kwargs):
+    filepath = tmp_path / "export.txt"
+    filepath.write_text(text, encoding="utf-8")
+
+    with cls(filepath, **kwargs) as reader:
+        return list(reader.read())
+
+
+def test_BioTekReader(tmp_path):
+    curves = _read(BioTekReader, tmp_path, BIOTEK)
+
+    assert [name for name, _ in curves] == [
+        "A1",
+        "A2",
+        "GFP:485,528 A1",
+        "GFP:485,528 A2",
+    ]
+    assert list(curves[0][1].index) == [0.0, 0.25, 25.5]
+    assert list(curves[0][1]) == [0.101, 0.102, 0.104]
+    # Out-of-range readings are dropped
+    assert list(curves[1][1].index) == [0.0, 25.5]
+    assert list(curves[3][1]) == [20.0, 21.0]
+
+
+@pytest.mark.parametrize("text", (TECAN_ROWS, TECAN_COLUMNS))
+def test_TecanReader(tmp_path, text):
+    curves = _read(TecanReader, tmp_path, text, dtype="float32")
+
+    assert [name for name, _ in curves] == ["A1", "A2"]
+    assert list(curves[0][1].index) == [0.0, 0.25, 0.5]
+    assert curves[0][1].values == pytest.approx([0.101, 0.102, 0.104])
+    assert curves[0][1].dtype == "float32"
+    assert list(curves[1][1].index) == [0.0, 0.5]
+
+
+def test_BMGReader(tmp_path):
+    curves = _read(BMGReader, tmp_path, BMG)
+
+    assert [name for name, _ in curves] == ["A01", "A02"]
+    assert list(curves[0][1].index) == [0.0, 0.25, 0.5]
+    assert list(curves[0][1]) == [0.101, 0.102, 0.104]
+    assert not any(math.isnan(value) for value in curves[1][1])
+    assert len(curves[1][1]) == 2
+
+
+def test_reader_streams_wells(tmp_path):
+    filepath = tmp_path / "export.txt"
+    filepath.write_text(TECAN_ROWS)
+
+    with TecanReader(filepath) as reader:
+        curves = reader.read()
+        name, _ = next(curves)
+
+    assert name == "A1"
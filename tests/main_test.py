@@ -0,0 +1,285 @@
+import gzip
+import io
+import os
+import sqlite3
+import subprocess
+import sys
+
+import numpy
+import pandas
+import pytest
+
+from croissance.estimation import AnnotatedGrowthCurve, GrowthPhase
+from croissance.execution import Checkpoint
+from croissance.formats.database import parameters_hash
+from croissance.main import EstimatorWrapper, main, parse_args
+
+
+@pytest.fixture
+def plate(tmp_path):
+    mu = 0.5
+    pph = 4.0
+    index = pandas.Index([i / pph for i in range(100)], name="time")
+    data = pandas.DataFrame(
+        {
+            "A1": [numpy.exp(mu * i / pph) for i in range(100)],
+            "A2": [numpy.exp(mu * 0.5 * i / pph) for i in range(100)],
+        },
+        index=index,
+    )
+
+    filepath = tmp_path / "plate.tsv"
+    data.to_csv(filepath, sep="\t")
+
+    return filepath
+
+
+def _read_output(filepath):
+    return pandas.read_csv(filepath, sep="\t")
+
+
+@pytest.mark.parametrize("executor", ("process", "thread"))
+def test_main_basic(plate, executor):
+    argv = [str(plate), "--threads", "2", "--executor", executor]
+    assert main(argv + ["--log-level", "WARNING"]) == 0
+
+    output = _read_output(plate.with_suffix(".output.tsv"))
+    assert list(output["name"]) == ["A1", "A1", "A2", "A2"]
+    assert list(output["phase"]) == [0, 1, 0, 1]
+    assert not plate.with_suffix(".output.journal").exists()
+
+
+def test_main_resume(plate, caplog):
+    output_filepath = plate.with_suffix(".output.tsv")
+    assert main([str(plate), "--log-level", "WARNING"]) == 0
+    mtime = output_filepath.stat().st_mtime_ns
+
+    # Finished files are not processed again
+    assert main([str(plate), "--resume", "--log-level", "WARNING"]) == 0
+    assert output_filepath.stat().st_mtime_ns == mtime
+
+    # Curves recorded in the journal of an interrupted run are not annotated again
+    def _interrupted_run():
+        output_filepath.unlink()
+        estimator = EstimatorWrapper(parse_args([str(plate)]))
+        header = (parameters_hash(estimator.params), estimator.input_time_unit)
+        phase = GrowthPhase(1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0)
+        with Checkpoint(plate.with_suffix(".output.journal"), header) as journal:
+            journal.add((0, "A1"), AnnotatedGrowthCurve(None, None, [phase]))
+
+    _interrupted_run()
+    assert main([str(plate), "--resume", "--log-level", "WARNING"]) == 0
+
+    output = _read_output(output_filepath)
+    assert list(output["slope"])[:2] == [3.0, 3.0]
+    assert list(output["slope"])[2:] == pytest.approx([0.25, 0.25], abs=1e-2)
+    assert not plate.with_suffix(".output.journal").exists()
+
+    # Journals of runs with other estimation parameters are discarded
+    _interrupted_run()
+    argv = [str(plate), "--resume", "--phase-minimum-slope", "0.01"]
+    with caplog.at_level("WARNING", logger="croissance"):
+        assert main(argv) == 0
+
+    assert "Discarded journal" in caplog.text
+    output = _read_output(output_filepath)
+    assert list(output["slope"]) == pytest.approx([0.5, 0.5, 0.25, 0.25], abs=1e-2)
+
+
+def test_main_groups(plate, caplog):
+    groups = plate.with_name("groups.tsv")
+    groups.write_text("name\tgroup\nA1\tG\nA2\tG\n")
+
+    argv = [str(plate), "--groups", str(groups), "--schedule", "cost"]
+    with caplog.at_level("INFO", logger="croissance"):
+        assert main(argv) == 0
+
+    # Replicates are counted as curves, but annotated as a single unit
+    assert "Collected a total of 2 growth curves in 1 work unit(s)" in caplog.text
+
+    output = _read_output(plate.with_suffix(".output.tsv"))
+    assert list(output["name"]) == ["A1", "A1", "A2", "A2"]
+    # Both replicates are fitted using the growth phase of the pooled curve
+    assert output["start"].nunique() == output["end"].nunique() == 1
+
+    statistics = _read_output(plate.with_suffix(".output.groups.tsv"))
+    assert list(statistics["group"]) == ["G"]
+    assert list(statistics["replicates"]) == [2]
+    assert statistics["slope"][0] == pytest.approx(0.375, abs=2e-2)
+    assert statistics["slope_std"][0] > 0.1
+
+
+def test_main_auto(plate, tmp_path, monkeypatch, caplog):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    with caplog.at_level("INFO", logger="croissance"):
+        assert main([str(plate), "--auto"]) == 0
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert any(message.startswith("Execution plan: ") for message in messages)
+    assert (tmp_path / "cache" / "croissance" / "tuning.json").exists()
+
+    output = _read_output(plate.with_suffix(".output.tsv"))
+    assert list(output["name"]) == ["A1", "A1", "A2", "A2"]
+
+
+def test_main_profile_memory(plate, caplog):
+    argv = [str(plate), "--profile-memory", "--executor", "thread"]
+    with caplog.at_level("INFO", logger="croissance"):
+        assert main(argv) == 0
+
+    rows = [record.getMessage().split()[0] for record in caplog.records]
+    start = rows.index("Memory")
+    assert rows[start + 1 : start + 5] == ["stage", "read", "annotate", "write"]
+
+
+def test_main_input_format(plate):
+    export = plate.with_name("export.txt")
+    rows = ["Cycle Nr.\tTime [min]\tA1"]
+    rows += [
+        "{}\t{}\t{}".format(i + 1, i * 15, numpy.exp(0.5 * i / 4)) for i in range(100)
+    ]
+    export.write_text("\n".join(rows) + "\n")
+
+    argv = [str(export), "--input-format", "tecan", "--log-level", "WARNING"]
+    assert main(argv) == 0
+
+    output = _read_output(export.with_name("export.output.tsv"))
+    assert list(output["name"]) == ["A1", "A1"]
+    assert output["slope"][0] == pytest.approx(0.5, abs=1e-2)
+
+    with pytest.raises(SystemExit):
+        main(argv + ["--input-time-unit", "minutes"])
+
+
+@pytest.mark.parametrize("unsorted", (False, True))
+def test_main_long_input_streamed(plate, unsorted):
+    data = pandas.read_csv(plate, sep="\t", index_col=0)
+    long = data.reset_index().melt(id_vars="time", var_name="well")
+    if unsorted:
+        long = long.sort_values("time", kind="stable")
+
+    filepath = plate.with_name("long.tsv")
+    long.to_csv(filepath, sep="\t", index=False)
+
+    argv = [str(filepath), "--input-format", "long", "--schedule", "input"]
+    argv += ["--log-level", "WARNING"] + (["--unsorted-input"] if unsorted else [])
+    assert main(argv) == 0
+
+    main([str(plate), "--log-level", "WARNING"])
+    expected = _read_output(plate.with_suffix(".output.tsv"))
+    output = _read_output(filepath.with_suffix(".output.tsv"))
+    pandas.testing.assert_frame_equal(output, expected)
+
+
+def test_main_pipe(plate, monkeypatch, capsys):
+    assert main([str(plate), "--log-level", "WARNING"]) == 0
+    expected = plate.with_suffix(".output.tsv").read_bytes().decode()
+
+    stdin = io.TextIOWrapper(io.BytesIO(gzip.compress(plate.read_bytes())))
+    monkeypatch.setattr(sys, "stdin", stdin)
+    argv = ["-", "--executor", "thread", "--log-level", "WARNING"]
+    assert main(argv) == 0
+    assert capsys.readouterr().out == expected
+
+    with pytest.raises(SystemExit):
+        main(["-", str(plate)])
+
+
+def test_main_pipe_closed(plate):
+    # The reader has gone away before any output is written, as with `| head`
+    read_end, write_end = os.pipe()
+    os.close(read_end)
+    with plate.open("rb") as stdin:
+        process = subprocess.run(
+            [sys.executable, "-m", "croissance.main", "-", "--executor", "thread"],
+            stdin=stdin,
+            stdout=write_end,
+            stderr=subprocess.PIPE,
+            timeout=60,
+            check=False,
+        )
+    os.close(write_end)
+
+    assert process.returncode == 1
+    assert b"Traceback" not in process.stderr
+    assert b"Standard output was closed" in process.stderr
+
+
+def test_main_watch_once(plate):
+    argv = ["watch", str(plate.parent), "--once", "--settle", "0"]
+    argv += ["--executor", "thread", "--log-level", "WARNING"]
+    assert main(argv) == 0
+
+    output = plate.with_suffix(".output.tsv")
+    assert list(_read_output(output)["name"]) == ["A1", "A1", "A2", "A2"]
+    assert plate.with_name(".croissance-watch.json").exists()
+
+    # Processed files are recorded and not processed again
+    output.unlink()
+    assert main(argv) == 0
+    assert not output.exists()
+
+
+def test_main_output_database(plate):
+    database = plate.with_name("results.db")
+    argv = [str(plate), "--output-database", str(database), "--log-level", "WARNING"]
+    assert main(argv) == 0
+    assert main(argv) == 0
+
+    with sqlite3.connect(str(database)) as connection:
+        rows = connection.execute(
+            "SELECT curves.name, status, slope FROM curves JOIN phases USING "
+            "(file_hash, name, params_hash) ORDER BY curves.name"
+        ).fetchall()
+
+    assert [(name, status) for name, status, _ in rows] == [
+        ("A1", "annotated"),
+        ("A2", "annotated"),
+    ]
+    assert rows[1][2] == pytest.approx(0.25, abs=1e-2)
+
+
+def test_main_event_log(plate, caplog):
+    events = plate.with_name("events.jsonl")
+    argv = [str(plate), "--event-log", str(events), "--executor", "thread"]
+    with caplog.at_level("INFO", logger="croissance"):
+        assert main(argv) == 0
+
+    # Individual curves are only logged at the DEBUG level
+    messages = [record.getMessage() for record in caplog.records]
+    assert not any(message.startswith("Annotated curve") for message in messages)
+    assert "Annotated 2 of 2 curves (0 rejected, 0 failed)" in "\n".join(messages)
+
+    data = pandas.read_json(events, lines=True)
+    assert list(data["event"]) == [
+        "started",
+        "curve",
+        "curve",
+        "file",
+        "summary",
+        "finished",
+    ]
+
+    curves = data[data["event"] == "curve"]
+    assert sorted(curves["name"]) == ["A1", "A2"]
+    assert list(curves["status"]) == ["annotated", "annotated"]
+    assert list(curves["phases"]) == [1, 1]
+    assert (curves["seconds"] > 0).all()
+
+
+def test_main_failed_curve_logged(plate, monkeypatch, caplog):
+    def _estimate(curve, *, params, name):
+        raise ValueError("bad curve {}".format(name))
+
+    monkeypatch.setattr("croissance.main.estimate_growth", _estimate)
+    argv = [str(plate), "--executor", "thread"]
+    with caplog.at_level("INFO", logger="croissance"):
+        assert main(argv) == 1
+
+    # One line per failed curve, while tracebacks are only logged at DEBUG level
+    errors = [r.getMessage() for r in caplog.records if r.levelname == "ERROR"]
+    assert errors == [
+        "Failed to annotate 'A1': ValueError: bad curve A1",
+        "Failed to annotate 'A2': ValueError: bad curve A2",
+    ]
+    assert not any("Traceback" in r.getMessage() for r in caplog.records)
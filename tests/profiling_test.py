@@ -0,0 +1,45 @@
+import numpy
+
+from croissance.profiling import MemoryProfiler, null_profiler
+
+
+def test_memory_profiler():
+    with MemoryProfiler(interval=0.01) as profiler, profiler.stage("outer"):
+        with profiler.stage("inner"):
+            data = numpy.ones(2**20)
+
+        with profiler.stage("inner"):
+            data = numpy.ones(2**19)
+
+    assert list(profiler.stages) == ["outer", "inner"]
+
+    outer, inner = profiler.stages["outer"], profiler.stages["inner"]
+    assert (outer.calls, outer.depth) == (1, 0)
+    assert (inner.calls, inner.depth) == (2, 1)
+    assert outer.peak_traced >= data.nbytes * 2
+    assert inner.peak_rss > 0
+
+    report = profiler.report()
+    assert report[1].startswith("outer")
+    assert report[2].startswith("  inner")
+
+
+def test_memory_profiler_outer_peak():
+    with MemoryProfiler(interval=0.01) as profiler, profiler.stage("outer"):
+        # Freed before the nested stage starts
+        data = numpy.ones(2**21)
+        nbytes = data.nbytes
+        del data
+
+        with profiler.stage("inner"):
+            numpy.ones(2**10)
+
+    assert profiler.stages["outer"].peak_traced >= nbytes
+    assert profiler.stages["inner"].peak_traced < nbytes
+
+
+def test_null_profiler():
+    with null_profiler as profiler, profiler.stage("stage") as stats:
+        assert stats is None
+
+    profiler.log_report()
@@ -0,0 +1,31 @@
+import pandas
+import pytest
+
+from croissance.execution import WorkUnit
+from croissance.scheduling import CostScheduler, estimate_cost
+
+
+def test_estimate_cost():
+    short = pandas.Series(index=[i / 4 for i in range(48)], data=1.0)
+    long = pandas.Series(index=[i / 4 for i in range(96)], data=1.0)
+    minutes = pandas.Series(index=[i * 15.0 for i in range(96)], data=1.0)
+
+    assert estimate_cost(short) < estimate_cost(long)
+    assert estimate_cost(minutes, "minutes") == pytest.approx(estimate_cost(long))
+
+
+def test_cost_scheduler():
+    costs = [1.0, 10.0] + [0.1] * 20
+    tasks = [(seq, WorkUnit(seq, cost)) for seq, cost in enumerate(costs)]
+
+    scheduler = CostScheduler(
+        workers=2, cost=lambda unit: unit.payload, min_batch_cost=0.25
+    )
+    batches = scheduler(tasks)
+
+    # Most expensive first, every unit scheduled exactly once
+    assert [seq for seq, _ in batches[0]] == [1]
+    assert sorted(seq for batch in batches for seq, _ in batch) == list(range(22))
+    # Cheap units are batched, but no batch is cheaper than the minimum except the last
+    assert len(batches) < len(tasks)
+    assert all(sum(costs[seq] for seq, _ in b) >= 0.25 for b in batches[:-1])
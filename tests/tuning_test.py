@@ -0,0 +1,70 @@
+import time
+
+from croissance.execution import WorkUnit
+from croissance.tuning import (
+    Overheads,
+    TuningCache,
+    measure_seconds_per_cost,
+    plan_execution,
+    tune,
+)
+
+
+def test_plan_execution_workers():
+    overheads = Overheads(startup_seconds=0.5, dispatch_seconds=0.001)
+
+    # Too little work to pay for starting worker processes
+    plan = plan_execution([1.0] * 10, 0.01, overheads, max_workers=8)
+    assert (plan.workers, plan.executor) == (1, "thread")
+
+    plan = plan_execution([1.0] * 1000, 0.1, overheads, max_workers=8)
+    assert (plan.workers, plan.executor) == (8, "process")
+    assert plan.predicted_seconds < 100
+
+    # Never more workers than curves
+    plan = plan_execution([1.0] * 3, 100.0, overheads, max_workers=8)
+    assert plan.workers == 3
+
+
+def test_plan_execution_batches():
+    overheads = Overheads(startup_seconds=0.5, dispatch_seconds=0.001)
+
+    plan = plan_execution([1.0] * 1000, 0.001, overheads, max_workers=4)
+    assert plan.min_batch_cost * plan.seconds_per_cost >= 0.05
+    assert plan.max_batch_size > 1
+
+    # Curves that take longer than a batch are dispatched one at a time
+    plan = plan_execution([1.0] * 1000, 1.0, overheads, max_workers=4)
+    assert plan.max_batch_size == 1
+
+
+def test_measure_seconds_per_cost_warm_up():
+    calls = []
+
+    def _fn(payload):
+        # e.g. compilation of kernels on first use
+        if not calls:
+            time.sleep(0.5)
+        calls.append(payload)
+
+    units = [WorkUnit(idx, 1.0) for idx in range(20)]
+    assert measure_seconds_per_cost(_fn, units, lambda unit: unit.payload) < 0.05
+    assert len(calls) == 9
+
+
+def test_tune_cache(tmp_path):
+    calls = []
+    units = [WorkUnit(idx, float(idx + 1)) for idx in range(20)]
+    overheads = Overheads(startup_seconds=0.1, dispatch_seconds=0.001)
+
+    cache = TuningCache(tmp_path / "tuning.json")
+    cache.update(overheads, "other", 1.0)
+    plan = tune(calls.append, units, lambda unit: unit.payload, "params", cache=cache)
+    assert 0 < len(calls) <= 9
+
+    # Measurements are reused from the cache by later runs
+    calls.clear()
+    cache = TuningCache(tmp_path / "tuning.json")
+    assert cache.seconds_per_cost("params") == plan.seconds_per_cost
+    tune(calls.append, units, lambda unit: unit.payload, "params", cache=cache)
+    assert not calls
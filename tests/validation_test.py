@@ -0,0 +1,92 @@
+import pytest
+
+from croissance.estimation import AnnotatedGrowthCurve, GrowthPhase
+from croissance.validation import (
+    METRICS,
+    Implementation,
+    Report,
+    compare_curves,
+    main,
+    resolve,
+    run_implementation,
+    synthetic_corpus,
+)
+
+PHASES = [
+    GrowthPhase(1.0, 5.5, 0.5, 0.25, 0.01, 1000.0, 80.0),
+    GrowthPhase(6.0, 9.0, 0.125, 2.0, 0.0, 50.0, 60.0),
+]
+
+TOLERANCES = dict.fromkeys(METRICS, 1e-6)
+
+
+def _curve(phases, rejected=None):
+    return AnnotatedGrowthCurve(None, None, phases, rejected)
+
+
+def test_compare_curves():
+    comparison = compare_curves("A1", _curve(PHASES), _curve(PHASES), TOLERANCES)
+    assert not comparison.exceeded
+    assert not comparison.count_mismatch
+    assert comparison.differences["slope"] == (0.0, 0.0)
+
+    shifted = [PHASES[0]._replace(slope=0.5001), PHASES[1]]
+    comparison = compare_curves("A1", _curve(PHASES), _curve(shifted), TOLERANCES)
+    assert comparison.exceeded == ["slope"]
+    assert comparison.differences["slope"] == pytest.approx((1e-4, 2e-4))
+
+
+def test_compare_curves_mismatches():
+    # Only the best ranked phases are compared if the number of phases differs
+    comparison = compare_curves("A1", _curve(PHASES), _curve(PHASES[:1]), TOLERANCES)
+    assert comparison.count_mismatch
+    assert not comparison.exceeded
+
+    comparison = compare_curves(
+        "A1", _curve([], "no growth"), _curve(PHASES), TOLERANCES
+    )
+    assert comparison.status_mismatch
+    assert comparison.count_mismatch
+
+    comparison = compare_curves("A1", "ValueError: ...", _curve(PHASES), TOLERANCES)
+    assert comparison.status_mismatch
+
+
+def test_time_budget():
+    curves = synthetic_corpus(0, 2)
+    results, _ = run_implementation(Implementation(), curves, time_budget=1e-6)
+    assert results == [None, None]
+
+    report = Report(TOLERANCES)
+    report.add([compare_curves(name, None, None, TOLERANCES) for name, _ in curves])
+    assert report.passed
+    assert report.timed_out == ["S0", "S1"]
+
+    results, _ = run_implementation(Implementation(), curves, time_budget=60.0)
+    assert all(result.rejected is None for result in results)
+
+
+def test_synthetic_corpus_step():
+    names = [name for name, _ in synthetic_corpus(1, 10, step=4)]
+    assert names == ["S1", "S5", "S9"]
+
+
+def test_resolve():
+    assert resolve("croissance.validation:compare_curves") is compare_curves
+    assert resolve("croissance.estimation:GrowthPhase.pick_best") is (
+        GrowthPhase.pick_best
+    )
+
+
+def test_main(capsys):
+    argv = ["--synthetic", "4", "--batch-size", "2"]
+    # Patching a kernel with its plain Python implementation changes nothing
+    patch = "croissance.estimation.find_runs=croissance.estimation.jit:find_runs"
+    assert main(argv + ["--candidate-patch", patch]) == 0
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith("Compared 4 curves")
+    assert [line.split("\t")[2] for line in lines[5:]] == ["0"] * len(METRICS)
+
+    assert main(argv + ["--candidate-param", "dtype='float32'"]) == 1
+    assert capsys.readouterr().out.splitlines()[-1].startswith("Differs: S")
@@ -0,0 +1,69 @@
+import os
+import threading
+import time
+
+import pytest
+
+from croissance.watching import DirectoryWatcher, Inotify, WatchState
+
+
+def _age(filepath, seconds):
+    past = time.time() - seconds
+    os.utime(filepath, (past, past))
+
+
+def test_DirectoryWatcher_polling(tmp_path):
+    (tmp_path / "a.tsv").write_text("time\tA1\n")
+    (tmp_path / "b.tsv").write_text("time\tA1\n")
+    (tmp_path / "a.output.tsv").write_text("")
+    (tmp_path / ".hidden.tsv").write_text("")
+    (tmp_path / "notes.txt").write_text("")
+    _age(tmp_path / "a.tsv", 60)
+
+    with DirectoryWatcher(
+        tmp_path,
+        settle=30,
+        exclude=lambda name: ".output." in name,
+        use_inotify=False,
+    ) as watcher:
+        assert watcher.backend == "polling"
+        # b.tsv was modified too recently to be considered complete
+        assert [path.name for path, _ in watcher.poll(0)] == ["a.tsv"]
+
+        _age(tmp_path / "b.tsv", 60)
+        assert [path.name for path, _ in watcher.poll(0)] == ["a.tsv", "b.tsv"]
+
+
+def test_DirectoryWatcher_inotify(tmp_path):
+    try:
+        Inotify(tmp_path).close()
+    except OSError:
+        pytest.skip("inotify is not available")
+
+    with DirectoryWatcher(tmp_path, settle=3600) as watcher:
+        assert watcher.backend == "inotify"
+
+        def _write():
+            time.sleep(0.1)
+            (tmp_path / "a.tsv").write_text("time\tA1\n")
+
+        writer = threading.Thread(target=_write)
+        writer.start()
+        started = time.monotonic()
+        # Closing the file completes it, despite the long settle time
+        completed = watcher.poll(10)
+        writer.join()
+
+        assert [path.name for path, _ in completed] == ["a.tsv"]
+        assert time.monotonic() - started < 5
+
+
+def test_WatchState(tmp_path):
+    filepath = tmp_path / "state.json"
+    state = WatchState(filepath)
+    state.add(tmp_path / "a.tsv", (10, 123), "done")
+
+    state = WatchState(filepath)
+    assert state.is_processed(tmp_path / "a.tsv", (10, 123))
+    assert not state.is_processed(tmp_path / "a.tsv", (11, 456))
+    assert not state.is_processed(tmp_path / "b.tsv", (10, 123))